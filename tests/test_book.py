@@ -0,0 +1,59 @@
+import random
+import struct
+
+import pytest
+
+from tetris_engine import TetrisEngine, spawn_piece
+from tetris_book import _HEADER, OpeningBook, book_key, book_path, write_book
+
+@pytest.fixture
+def entries():
+    rng = random.Random(1)
+    return {rng.getrandbits(63) + 1: (rng.randrange(4), rng.randrange(-1, 9)) for _ in range(500)}
+
+def test_round_trip(tmp_path, entries):
+    path = str(tmp_path / 'book.bin')
+    slots = write_book(entries, path, cap=1, max_height=3)
+    book = OpeningBook(path)
+    try:
+        assert len(book) == len(entries)
+        assert (book.cap, book.max_height) == (1, 3)
+        for key, move in entries.items():
+            assert book.get(key) == move
+        assert book.get(12345) is None
+    finally:
+        book.close()
+    # Clés petit-boutistes quelle que soit la machine
+    with open(path, 'rb') as f:
+        data = f.read()
+    keys = struct.unpack_from(f'<{slots}Q', data, _HEADER.size)
+    assert set(keys) - {0} == set(entries)
+
+def test_corrupt_file_is_rejected(tmp_path, entries):
+    path = str(tmp_path / 'book.bin')
+    write_book(entries, path)
+    with open(path, 'rb') as f:
+        data = f.read()
+    with open(path, 'wb') as f:
+        f.write(data[:-1])
+    with pytest.raises(ValueError):
+        OpeningBook(path)
+
+def test_lookup_replays_the_move(tmp_path):
+    engine = TetrisEngine('hard', seed=3)
+    engine.current_piece = spawn_piece('T')
+    engine.next_piece = spawn_piece('I')
+    key = book_key(engine.board, 'T', 'I')
+    path = str(tmp_path / 'book.bin')
+    write_book({key: (1, 0)}, path)
+    book = OpeningBook(path)
+    try:
+        placement = book.lookup(engine)
+    finally:
+        book.close()
+    assert placement == book_path(engine.board, engine.current_piece, 0, 1)
+    assert (placement.x, placement.rotation) == (0, 1)
+    for action in placement.actions:
+        assert engine.apply_action(action)
+    assert engine.current_piece.x == 0
+    assert engine.drop_row() == placement.y
@@ -0,0 +1,81 @@
+import os
+
+import numpy as np
+
+from tetris_ai import Heuristic, TetrisAI
+from tetris_engine import PIECE_TYPES, TetrisEngine
+from tetris_dataset import PlacementTap, ShardDataset, ShardWriter, record_batch, unpack_boards
+from tetris_selfplay import SelfPlayConfig, play_batch, worker_state
+
+def play(seed, pieces):
+    # Partie de l'IA relevée par un PlacementTap ; plateaux d'avant chaque pose
+    engine = TetrisEngine('hard', seed=seed)
+    tap = PlacementTap(seed)
+    engine.place_listener = tap
+    boards = []
+    place_piece = engine.place_piece
+    def recorded():
+        boards.append([[engine.board.rows[r] >> c & 1 for c in range(10)] for r in range(20)])
+        return place_piece()
+    engine.place_piece = recorded
+    bot = TetrisAI(Heuristic())
+    while not engine.game_over and engine.pieces_placed < pieces:
+        bot.place(engine)
+    return engine, tap.drain(), np.array(boards, dtype=bool)
+
+def test_tap_records_every_placement():
+    engine, records, boards = play(5, 120)
+    assert len(records) == engine.pieces_placed
+    assert (unpack_boards(records) == boards).all()
+    assert list(records['move']) == list(range(len(records)))
+    assert (records['game'] == 5).all()
+    assert records['lines'].sum() == engine.lines
+    assert records['score'].sum() == engine.score
+    assert set(records['piece']) <= set(range(len(PIECE_TYPES)))
+
+def test_shards_round_trip(tmp_path):
+    folder = str(tmp_path / 'dataset')
+    parts = [play(seed, 150)[1] for seed in (1, 2, 3)]
+    writer = ShardWriter(folder, shard_records=100)
+    for records in parts[:2]:
+        writer.write(records)
+    writer.close()
+    # Un dossier existant est complété
+    writer = ShardWriter(folder, shard_records=100)
+    writer.write(parts[2])
+    writer.close()
+    expected = np.concatenate(parts)
+    dataset = ShardDataset(folder)
+    assert len(dataset) == len(expected)
+    for i in range(0, len(expected), 7):
+        assert dataset[i] == expected[i]
+    assert dataset[-1] == expected[-1]
+    indices = np.random.default_rng(0).permutation(len(expected))
+    assert (dataset.batch(indices) == expected[indices]).all()
+
+def test_unindexed_shard_is_kept(tmp_path):
+    # Session interrompue : fragment écrit mais jamais ajouté à l'index
+    folder = str(tmp_path / 'dataset')
+    _, records, _ = play(4, 60)
+    crashed = ShardWriter(folder, shard_records=100)
+    crashed.write(records[:30])
+    crashed._shard.flush()
+    orphan = os.path.join(folder, crashed._name)
+    with open(orphan, 'rb') as f:
+        content = f.read()
+    writer = ShardWriter(folder, shard_records=100)
+    writer.write(records[30:])
+    writer.close()
+    assert writer.shards[0]['file'] != os.path.basename(orphan)
+    with open(orphan, 'rb') as f:
+        assert f.read() == content
+    dataset = ShardDataset(folder)
+    assert len(dataset) == len(records) - 30
+    assert (dataset.batch(np.arange(len(dataset))) == records[30:]).all()
+
+def test_record_batch_matches_selfplay():
+    config = SelfPlayConfig(max_pieces=40)
+    records = record_batch([5, 6], config)
+    results = play_batch([5, 6], config)
+    assert len(records) == sum(result.pieces for result in results)
+    assert worker_state()[0] is config
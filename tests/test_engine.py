@@ -0,0 +1,176 @@
+import random
+
+import pytest
+
+from tetris_ai import Heuristic, TetrisAI
+from tetris_engine import (ACTIONS, FULL_ROW, GRID_HEIGHT, GRID_WIDTH, KICKS, PIECE_TYPES,
+                           ROTATIONS, SHAPES, Board, Piece, TetrisEngine, column_heights,
+                           zobrist_hash)
+
+def check_board(board):
+    # Plan de couleurs, relief et hash suivent le bitboard
+    for row, colors in zip(board.rows, board.colors):
+        assert 0 <= row < FULL_ROW
+        assert row == sum(1 << j for j, cell in enumerate(colors) if cell)
+    assert board.heights == column_heights(board.rows)
+    assert board.zobrist == zobrist_hash(board.rows)
+
+def naive_drop_row(board, piece):
+    y = piece.y
+    while board.fits(piece.orientation, piece.x, y + 1):
+        y += 1
+    return y
+
+@pytest.mark.parametrize('seed', range(4))
+def test_board_invariants_during_play(seed):
+    engine = TetrisEngine('hard', seed=seed)
+    rng = random.Random(seed)
+    for _ in range(3000):
+        if engine.game_over:
+            engine.reset_game()
+        engine.step(rng.choice(ACTIONS + (None,)))
+        check_board(engine.board)
+        piece = engine.current_piece
+        if engine.fits(piece, piece.x, piece.y):
+            assert engine.drop_row() == naive_drop_row(engine.board, piece)
+
+def test_board_invariants_with_line_clears():
+    engine = TetrisEngine('hard', seed=9)
+    bot = TetrisAI(Heuristic())
+    for _ in range(150):
+        bot.place(engine)
+        check_board(engine.board)
+    assert engine.lines > 0
+
+def test_clear_full_rows_compacts_and_keeps_holes():
+    grid = [[0] * GRID_WIDTH for _ in range(GRID_HEIGHT)]
+    grid[-1] = ['I'] * GRID_WIDTH
+    grid[-2] = ['T'] + [0] * (GRID_WIDTH - 1)
+    grid[-3] = ['L'] * GRID_WIDTH
+    grid[-4] = [0, 'S'] + [0] * (GRID_WIDTH - 2)
+    board = Board.from_grid(grid)
+    assert board.clear_full_rows() == 2
+    assert board.rows[-1] == 1
+    assert board.rows[-2] == 2
+    assert not any(board.rows[:-2])
+    assert board.colors[-2][1] == 'S'
+    check_board(board)
+    assert board.heights[:2] == [1, 2]
+
+def test_copy_is_independent():
+    engine = TetrisEngine(seed=1)
+    for _ in range(5):
+        engine.step('drop')
+    board = engine.board.copy()
+    engine.step('drop')
+    assert board.rows != engine.board.rows
+    check_board(board)
+
+# Ligne d'arrivée depuis les hauteurs de colonnes et les profils bas
+
+def random_rows(rng):
+    # Relief irrégulier avec trous et surplombs, aucune ligne pleine
+    rows = [0] * GRID_HEIGHT
+    for c in range(GRID_WIDTH):
+        for r in range(GRID_HEIGHT - rng.randrange(0, 14), GRID_HEIGHT):
+            if rng.random() < 0.75:
+                rows[r] |= 1 << c
+    return [row if row != FULL_ROW else row & ~(1 << rng.randrange(GRID_WIDTH)) for row in rows]
+
+@pytest.mark.parametrize('seed', range(20))
+def test_drop_row_matches_naive_scan(seed):
+    rng = random.Random(seed)
+    board = Board.from_rows(random_rows(rng))
+    checked = 0
+    for piece_type in PIECE_TYPES:
+        for rotation, orientation in enumerate(ROTATIONS[piece_type]):
+            for x in range(-3, GRID_WIDTH):
+                for y in range(-2, GRID_HEIGHT):
+                    if board.fits(orientation, x, y):
+                        piece = Piece(piece_type, x, y, rotation)
+                        assert board.drop_row(orientation, x, y) == naive_drop_row(board, piece)
+                        checked += 1
+    assert checked > 1000
+
+def test_drop_row_stops_on_overhang():
+    # Colonne 0 libre sous un surplomb en ligne 15 : la chute s'arrête dessus
+    rows = [0] * GRID_HEIGHT
+    rows[15] = 0b11
+    board = Board.from_rows(rows)
+    assert board.heights[:2] == [GRID_HEIGHT - 15] * 2
+    vertical_i = ROTATIONS['I'][1]  # colonne 2 de la boîte
+    assert board.drop_row(vertical_i, -2, 0) == 11
+    # Sous le surplomb, la descente continue jusqu'au fond
+    assert board.drop_row(vertical_i, -2, 16) == GRID_HEIGHT - 4
+
+# Rotations SRS et wall kicks
+
+def rotated(piece_type, x, y, rotation, direction=1, grid=None):
+    engine = TetrisEngine(seed=0)
+    if grid is not None:
+        engine.grid = grid
+    engine.current_piece = Piece(piece_type, x, y, rotation)
+    assert engine.fits(engine.current_piece, x, y)
+    moved = engine.rotate_piece(direction)
+    piece = engine.current_piece
+    return moved, (piece.x, piece.y, piece.rotation)
+
+@pytest.mark.parametrize('piece_type', PIECE_TYPES)
+def test_orientations_turn_clockwise_in_their_box(piece_type):
+    orientations = ROTATIONS[piece_type]
+    size = len(orientations[0].shape)
+    assert size == {'I': 4, 'O': 2}.get(piece_type, 3)
+    assert sum(map(sum, SHAPES[piece_type])) == 4
+    for rotation, orientation in enumerate(orientations):
+        assert len(orientation.cells) == 4
+        turned = {(size - 1 - dy, dx) for dx, dy in orientation.cells}
+        assert turned == set(orientations[(rotation + 1) % 4].cells)
+
+@pytest.mark.parametrize('piece_type', PIECE_TYPES)
+def test_counter_clockwise_kicks_undo_clockwise_kicks(piece_type):
+    kicks = KICKS[piece_type]
+    for rotation in range(4):
+        back = kicks[(rotation + 1) % 4][1]
+        assert [(-dx, -dy) for dx, dy in kicks[rotation][0]] == list(back)
+
+@pytest.mark.parametrize('piece_type', PIECE_TYPES)
+def test_rotation_round_trip_in_open_space(piece_type):
+    for rotation in range(4):
+        for direction in (1, -1):
+            engine = TetrisEngine(seed=0)
+            engine.current_piece = Piece(piece_type, 3, 8, rotation)
+            assert engine.rotate_piece(direction)
+            assert engine.rotate_piece(-direction)
+            piece = engine.current_piece
+            assert (piece.x, piece.y, piece.rotation) == (3, 8, rotation)
+
+def test_t_wall_kicks():
+    # R -> 2 contre le mur gauche : 2e essai (+1, 0)
+    assert rotated('T', -1, 5, 1) == (True, (0, 5, 2))
+    # L -> 2 contre le mur droit : 2e essai (-1, 0)
+    assert rotated('T', GRID_WIDTH - 2, 5, 3, -1) == (True, (GRID_WIDTH - 3, 5, 2))
+
+def test_t_floor_kick():
+    # 0 -> R posé au sol : la pièce remonte d'une ligne, 3e essai (-1, -1)
+    assert rotated('T', 4, GRID_HEIGHT - 2, 0) == (True, (3, GRID_HEIGHT - 3, 1))
+
+def test_i_wall_kicks():
+    # R -> 2 contre le mur gauche : 3e essai (+2, 0)
+    assert rotated('I', -2, 5, 1) == (True, (0, 5, 2))
+    # L -> 0 contre le mur droit : 3e essai (-2, 0)
+    assert rotated('I', GRID_WIDTH - 2, 5, 3) == (True, (GRID_WIDTH - 4, 5, 0))
+
+def test_i_floor_kick():
+    # 0 -> R à plat sur le sol : dernier essai (+1, -2)
+    assert rotated('I', 3, GRID_HEIGHT - 2, 0) == (True, (4, GRID_HEIGHT - 4, 1))
+
+def test_o_does_not_move_on_rotation():
+    assert rotated('O', 4, 10, 0) == (True, (4, 10, 1))
+
+def test_blocked_rotation_leaves_piece_unchanged():
+    # T couché dans un couloir d'une ligne : aucun des cinq essais ne passe
+    grid = [['Z'] * GRID_WIDTH for _ in range(GRID_HEIGHT)]
+    for c in range(3, 6):
+        grid[11][c] = 0
+    grid[10][4] = 0
+    assert rotated('T', 3, 10, 0, grid=grid) == (False, (3, 10, 0))
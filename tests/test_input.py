@@ -0,0 +1,93 @@
+import pytest
+
+from tetris_input import InputHandler, env_seconds
+
+# Délais exacts en binaire : les échéances cumulées restent exactes
+DAS, ARR, SOFT_DROP = 0.25, 0.0625, 0.125
+
+@pytest.fixture
+def handler():
+    return InputHandler(DAS, ARR, SOFT_DROP)
+
+def run(handler, until, fps=64, start=0.0):
+    # Lectures à cadence fixe ; renvoie (date de lecture, action) pour chaque action
+    actions = []
+    frame = 0
+    while start + frame / fps <= until:
+        now = start + frame / fps
+        handler.read(now)
+        actions += [(now, action) for action in handler.poll(now)]
+        frame += 1
+    return actions
+
+def test_das_then_arr(handler):
+    handler.press('right', 0.0)
+    actions = run(handler, 0.5)
+    # Appui, puis rien avant le DAS, puis une répétition toutes les ARR
+    assert actions == [(0.0, 'right'), (0.25, 'right'), (0.3125, 'right'), (0.375, 'right'),
+                       (0.4375, 'right'), (0.5, 'right')]
+
+def test_long_frame_catches_up(handler):
+    handler.press('left', 0.0)
+    run(handler, 0.2, fps=5)
+    # Une frame de 300 ms rattrape toutes les échéances passées
+    handler.read(0.5)
+    assert handler.poll(0.5) == ['left'] * 5
+    handler.displayed(0.5)
+    # Chaque répétition est datée de son échéance ; la borne haute part au plus
+    # tard de la lecture précédente
+    assert list(handler.latencies) == [0.5, 0.25, 0.1875, 0.125, 0.0625, 0.0]
+    assert list(handler.bounds) == [0.5] + [0.3] * 5
+
+def test_release_stops_repeat(handler):
+    handler.press('right', 0.0)
+    run(handler, 0.3)
+    handler.release('right', 0.3)
+    assert run(handler, 1.0, start=0.3) == []
+
+def test_last_direction_wins(handler):
+    handler.press('left', 0.0)
+    assert handler.poll(0.3) == ['left', 'left']
+    handler.press('right', 0.3)
+    # La gauche encore tenue ne se répète plus ; la droite repart de son DAS
+    assert handler.poll(0.5) == ['right']
+    assert handler.poll(0.55) == ['right']
+    handler.release('right', 0.6)
+    # Relâcher la droite rend la main à la gauche, après un nouveau DAS
+    assert handler.poll(0.8) == []
+    assert handler.poll(0.85) == ['left']
+    assert handler.poll(0.9) == []
+    assert handler.poll(0.9125) == ['left']
+
+def test_soft_drop_repeats_without_das(handler):
+    handler.press('down', 0.0)
+    assert run(handler, 0.5) == [(0.0, 'down'), (0.125, 'down'), (0.25, 'down'),
+                                 (0.375, 'down'), (0.5, 'down')]
+
+def test_soft_drop_and_shift_repeat_together(handler):
+    handler.press('down', 0.0)
+    handler.press('left', 0.0)
+    assert handler.poll(0.0) == ['down', 'left']
+    assert sorted(handler.poll(0.3125)) == ['down', 'down'] + ['left'] * 2
+
+def test_zero_arr_moves_to_the_wall():
+    handler = InputHandler(DAS, 0.0, SOFT_DROP)
+    handler.press('right', 0.0)
+    assert handler.poll(0.1) == ['right']
+    moves = handler.poll(0.3)
+    assert len(moves) >= 10 and set(moves) == {'right'}
+    assert handler.poll(1.0) == []
+
+def test_reset_forgets_held_keys(handler):
+    handler.press('left', 0.0)
+    handler.press('down', 0.0)
+    handler.reset()
+    assert handler.poll(1.0) == []
+
+def test_env_seconds(monkeypatch):
+    monkeypatch.setenv('TETRIS_DAS_MS', '120')
+    assert env_seconds('TETRIS_DAS_MS', DAS) == pytest.approx(0.12)
+    monkeypatch.setenv('TETRIS_DAS_MS', 'vite')
+    assert env_seconds('TETRIS_DAS_MS', DAS) == DAS
+    monkeypatch.delenv('TETRIS_DAS_MS')
+    assert env_seconds('TETRIS_DAS_MS', DAS) == DAS
@@ -0,0 +1,105 @@
+import pytest
+
+from tetris_engine import TetrisEngine
+from tetris_loop import MAX_CATCH_UP, FixedTimestep, simulate
+
+# Pas de 1/64 s : les dates et l'accumulateur restent exacts en binaire
+HZ = 64
+DT = 1.0 / HZ
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+def test_one_step_per_frame_at_simulation_rate(clock):
+    timestep = FixedTimestep(HZ, clock=clock)
+    assert timestep.advance() == 0  # premier appel : point de départ
+    for _ in range(10):
+        clock.now += DT
+        assert timestep.advance() == 1
+        assert timestep.alpha == 0.0
+    assert timestep.steps == 10
+
+def test_fast_display_accumulates_partial_steps(clock):
+    timestep = FixedTimestep(HZ, clock=clock)
+    timestep.advance()
+    steps = []
+    alphas = []
+    for _ in range(8):
+        clock.now += DT / 4
+        steps.append(timestep.advance())
+        alphas.append(timestep.alpha)
+    assert steps == [0, 0, 0, 1] * 2
+    assert alphas == [0.25, 0.5, 0.75, 0.0] * 2
+
+def test_slow_display_runs_several_steps(clock):
+    timestep = FixedTimestep(HZ, clock=clock)
+    timestep.advance()
+    clock.now += 2.5 * DT
+    assert timestep.advance() == 2
+    assert timestep.alpha == 0.5
+    clock.now += 1.5 * DT
+    assert timestep.advance() == 2
+    assert timestep.alpha == 0.0
+    assert timestep.dropped == 0
+
+def test_catch_up_is_capped(clock):
+    timestep = FixedTimestep(HZ, clock=clock)
+    timestep.advance()
+    # Une seconde de retard (fenêtre déplacée) : MAX_CATCH_UP pas, le reste abandonné
+    clock.now += 1.0 + DT / 2
+    assert timestep.advance() == MAX_CATCH_UP
+    assert timestep.dropped == HZ - MAX_CATCH_UP
+    # La fraction de pas en cours est gardée pour l'interpolation
+    assert timestep.alpha == 0.5
+    clock.now += DT / 2
+    assert timestep.advance() == 1
+    assert timestep.steps == MAX_CATCH_UP + 1
+
+def test_reset_forgets_time_spent_outside_the_loop(clock):
+    timestep = FixedTimestep(HZ, clock=clock)
+    timestep.advance()
+    clock.now += DT / 2
+    timestep.advance()
+    timestep.reset()
+    clock.now += 10.0
+    assert timestep.advance() == 0
+    assert timestep.alpha == 0.0 and timestep.dropped == 0
+
+def test_run_calls_step_for_each_due_step(clock):
+    timestep = FixedTimestep(HZ, clock=clock)
+    calls = []
+    timestep.run(lambda: calls.append(clock.now))
+    clock.now += 3 * DT
+    assert timestep.run(lambda: calls.append(clock.now)) == 3
+    assert len(calls) == 3
+
+def test_turbo_runs_steps_until_frame_budget(clock):
+    timestep = FixedTimestep(HZ, clock=clock)
+    timestep.turbo = True
+
+    def step():
+        clock.now += timestep.turbo_budget / 8
+
+    assert timestep.run(step) == 8
+    assert timestep.steps == 8
+    # Le temps passé en turbo n'est pas rattrapé au retour au temps réel
+    timestep.turbo = False
+    assert timestep.run(step) == 0
+
+def test_simulate_stops_at_step_count_or_game_over():
+    engine = TetrisEngine('hard', seed=0)
+    controlled = []
+    assert simulate(engine, 120, controlled.append) == 120
+    assert len(controlled) == 120
+    # Sans contrôleur, les pièces tombent en colonne jusqu'à la fin de partie
+    steps = simulate(engine)
+    assert engine.game_over and steps > 0
+    assert simulate(engine, 10) == 0
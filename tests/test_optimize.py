@@ -0,0 +1,77 @@
+import json
+import os
+
+import pytest
+
+from tetris_ai import load_weights
+from tetris_optimize import FEATURES, GeneticOptimizer, save_weights, to_weights
+
+class Done:
+    def __init__(self, value):
+        self._value = value
+
+    def result(self):
+        return self._value
+
+class InlinePool:
+    # Remplace le ProcessPoolExecutor : exécute sur place, compte les lots
+    def __init__(self):
+        self.batches = 0
+
+    def submit(self, fn, *args):
+        self.batches += 1
+        return Done(fn(*args))
+
+def optimizer(tmp_path, **kwargs):
+    settings = dict(population_size=3, difficulty='hard', max_pieces=10, lookahead=False,
+                    checkpoint=str(tmp_path / 'checkpoint.json'))
+    settings.update(kwargs)
+    return GeneticOptimizer([0, 1], **settings)
+
+def test_cache_key_depends_on_game_settings(tmp_path):
+    base = optimizer(tmp_path)
+    vector = [0.5] * len(FEATURES)
+    keys = {optimizer(tmp_path, **change).key(vector)
+            for change in ({}, {'difficulty': 'easy'}, {'max_pieces': 20}, {'lookahead': True})}
+    assert len(keys) == 4
+    assert base.key(vector) in keys
+
+def test_evaluate_replays_only_uncached_candidates(tmp_path):
+    first = optimizer(tmp_path)
+    first.initialize()
+    pool = InlinePool()
+    assert first.evaluate(pool, batch_size=1) == 6
+    assert pool.batches == 6
+    # Mêmes poids, mêmes réglages : tout vient du cache
+    assert first.evaluate(pool) == 0
+    # Autre limite de pièces : les fitness en cache ne valent plus
+    other = optimizer(tmp_path, max_pieces=20)
+    other.population = first.population
+    other.cache = dict(first.cache)
+    assert other.evaluate(pool) == 6
+
+def test_checkpoint_resumes_only_with_same_settings(tmp_path):
+    first = optimizer(tmp_path)
+    first.initialize()
+    first.evaluate(InlinePool())
+    first.next_generation()
+    first.save()
+    assert not os.path.exists(first.checkpoint + '.tmp')
+
+    resumed = optimizer(tmp_path)
+    assert resumed.load()
+    assert resumed.generation == 1
+    assert resumed.population == first.population
+    assert resumed.cache == first.cache
+    for change in ({'difficulty': 'easy'}, {'max_pieces': 20}, {'lookahead': True}):
+        with pytest.raises(ValueError):
+            optimizer(tmp_path, **change).load()
+
+def test_save_weights_is_atomic(tmp_path):
+    path = str(tmp_path / 'weights.json')
+    vector = [0.1 * (i + 1) for i in range(len(FEATURES))]
+    save_weights(vector, path)
+    assert not os.path.exists(path + '.tmp')
+    assert load_weights(path) == to_weights(vector)
+    with open(path, 'r') as f:
+        assert json.load(f) == to_weights(vector)
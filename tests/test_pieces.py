@@ -0,0 +1,52 @@
+import pytest
+
+from tetris_engine import PIECE_TYPES, PieceGenerator, TetrisEngine, generate_sequence
+
+@pytest.mark.parametrize('bag', [False, True])
+def test_same_seed_same_pieces(bag):
+    first = PieceGenerator(42, bag)
+    second = PieceGenerator(42, bag)
+    assert [first.next() for _ in range(200)] == [second.next() for _ in range(200)]
+    other = PieceGenerator(43, bag)
+    assert [other.next() for _ in range(50)] != [first.next() for _ in range(50)]
+
+def test_bag_deals_each_piece_once_per_seven():
+    generator = PieceGenerator(7, bag=True)
+    pieces = [generator.next() for _ in range(70)]
+    for i in range(0, 70, 7):
+        assert sorted(pieces[i:i + 7]) == sorted(PIECE_TYPES)
+
+def test_peek_does_not_consume():
+    generator = PieceGenerator(3)
+    ahead = generator.peek(8)
+    assert tuple(generator.next() for _ in range(8)) == ahead
+
+@pytest.mark.parametrize('bag', [False, True])
+def test_getstate_setstate_resumes_the_stream(bag):
+    generator = PieceGenerator(5, bag)
+    for _ in range(11):
+        generator.next()
+    generator.peek(3)
+    state = generator.getstate()
+    expected = [generator.next() for _ in range(30)]
+    other = PieceGenerator(0, bag)
+    other.setstate(state)
+    assert [other.next() for _ in range(30)] == expected
+
+@pytest.mark.parametrize('bag', [False, True])
+def test_generated_sequence_replays_the_generator(bag):
+    sequence = generate_sequence(9, 100, bag)
+    generator = PieceGenerator(9, bag, previews=0)
+    assert [PIECE_TYPES[code] for code in sequence] == [generator.next() for _ in range(100)]
+    # Après la séquence, le tirage reprend avec la graine
+    replay = PieceGenerator(1, bag, sequence=sequence[:10])
+    fresh = PieceGenerator(1, bag)
+    assert [replay.next() for _ in range(20)] == \
+           [PIECE_TYPES[c] for c in sequence[:10]] + [fresh.next() for _ in range(10)]
+
+def test_engine_reseed_repeats_the_game():
+    engine = TetrisEngine(seed=12)
+    first = [engine.current_piece.type, engine.next_piece.type] + list(engine.previews)
+    engine.pieces.seed(12)
+    engine.reset_game()
+    assert [engine.current_piece.type, engine.next_piece.type] + list(engine.previews) == first
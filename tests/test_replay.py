@@ -0,0 +1,79 @@
+import copy
+
+import pytest
+
+from tetris_ai import Heuristic, TetrisAI
+from tetris_engine import TetrisEngine
+from tetris_replay import Replay, ReplayPlayer, ReplayRecorder
+
+DT = 1 / 60
+
+class RecordingEngine(TetrisEngine):
+    # Comme le frontend (tetris_game.Tetris) : toute action acceptée entre dans le replay
+    recorder = None
+
+    def apply_action(self, action):
+        if self.recorder and not self.paused and not self.game_over:
+            self.recorder.record(action)
+        return super().apply_action(action)
+
+    def tick(self):
+        if self.recorder and not self.paused and not self.game_over:
+            self.recorder.record('tick')
+        return super().tick()
+
+def state(engine):
+    return copy.deepcopy((engine.board.rows, engine.grid, engine.current_piece, engine.next_piece,
+            engine.pieces.getstate(), engine.score, engine.lines, engine.level,
+            engine.pieces_placed, engine.game_over))
+
+@pytest.fixture(scope='module')
+def recording():
+    # Partie de l'IA sur 3000 frames ; état attendu toutes les 250 frames
+    engine = RecordingEngine('easy', seed=11, bag=True)
+    recorder = engine.recorder = ReplayRecorder(engine, keyframe_interval=600)
+    bot = TetrisAI(Heuristic())
+    states = {}
+    for frame in range(3000):
+        if frame % 4 == 0:
+            bot.play(engine)
+        engine.update(DT)
+        recorder.next_frame(engine)
+        if frame % 250 == 0:
+            states[frame] = state(engine)
+    return recorder.finish(engine), states, state(engine)
+
+def test_bytes_round_trip(recording):
+    data, _, _ = recording
+    replay = Replay.from_bytes(data)
+    assert replay.to_bytes() == data
+    assert replay.frames == 3000
+    assert len(replay.keyframes) == 4
+    assert replay.events
+
+def test_playback_verifies(recording):
+    data, _, final = recording
+    player = ReplayPlayer(data)
+    assert player.verify()
+    assert state(player.engine) == final
+
+def test_seek_matches_recorded_states(recording):
+    data, states, _ = recording
+    player = ReplayPlayer(data)
+    # En avant, puis en arrière (keyframes et retour au début)
+    for frame in sorted(states) + sorted(states, reverse=True):
+        assert state(player.seek(frame)) == states[frame], frame
+
+def test_tampered_replay_fails_verification(recording):
+    data, _, _ = recording
+    replay = Replay.from_bytes(data)
+    replay.score += 1
+    assert not ReplayPlayer(replay).verify()
+
+def test_rejects_other_files():
+    with pytest.raises(ValueError):
+        Replay.from_bytes(b'TBK1' + bytes(10))
+    data = bytearray(ReplayRecorder(TetrisEngine(seed=1)).finish(TetrisEngine(seed=1)))
+    data[4] = 99
+    with pytest.raises(ValueError):
+        Replay.from_bytes(bytes(data))
@@ -0,0 +1,81 @@
+import json
+import os
+import threading
+
+import pytest
+
+import tetris_save
+from tetris_save import SaveManager, load_save, write_atomic
+
+@pytest.fixture
+def writes(monkeypatch):
+    # Chemins réellement écrits par le thread de fond
+    written = []
+    def counting(file_path, payload):
+        written.append(file_path)
+        write_atomic(file_path, payload)
+    monkeypatch.setattr(tetris_save, 'write_atomic', counting)
+    return written
+
+def test_rapid_saves_are_coalesced(tmp_path, writes):
+    manager = SaveManager(debounce=60)
+    path = str(tmp_path / 'game_save.bin')
+    results = []
+    def callback(*args):
+        results.append(args)
+    for i in range(10):
+        manager.save(path, bytes([i]), callback)
+    assert writes == []  # rien avant l'échéance
+    assert manager.flush(timeout=5)
+    manager.close()
+    assert writes == [path]
+    with open(path, 'rb') as f:
+        assert f.read() == bytes([9])
+    # Même callback enregistré une seule fois
+    assert results == [(path, None)]
+
+def test_identical_payload_is_not_rewritten(tmp_path, writes):
+    manager = SaveManager(debounce=0)
+    path = str(tmp_path / 'scores.json')
+    for _ in range(3):
+        manager.save(path, {'score': 100})
+        assert manager.flush(timeout=5)
+    manager.save(path, {'score': 200})
+    assert manager.flush(timeout=5)
+    manager.close()
+    assert writes == [path, path]
+    with open(path, 'r') as f:
+        assert json.load(f) == {'score': 200}
+
+def test_errors_reach_the_callback(tmp_path):
+    manager = SaveManager(debounce=0)
+    blocker = tmp_path / 'fichier'
+    blocker.write_text('')
+    path = str(blocker / 'game_save.bin')  # dossier impossible à créer
+    done = threading.Event()
+    errors = []
+    def callback(file_path, error):
+        errors.append(error)
+        done.set()
+    manager.save(path, b'x', callback)
+    assert done.wait(5)
+    manager.close()
+    assert isinstance(errors[0], OSError)
+    assert not os.path.exists(path)
+
+def test_close_writes_pending_saves(tmp_path):
+    manager = SaveManager(debounce=60)
+    path = str(tmp_path / 'last_replay.bin')
+    manager.save(path, b'replay')
+    manager.close()
+    with open(path, 'rb') as f:
+        assert f.read() == b'replay'
+
+def test_load_save_falls_back_to_json(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    binary = str(tmp_path / 'saves' / 'game_save.bin')
+    assert load_save(binary) is None
+    write_atomic(str(tmp_path / 'saves' / 'game_save.json'), json.dumps({'score': 5}))
+    assert load_save(binary) == {'score': 5}
+    write_atomic(binary, b'\x02snapshot')
+    assert load_save(binary) == b'\x02snapshot'
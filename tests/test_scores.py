@@ -0,0 +1,89 @@
+import getpass
+import json
+import sqlite3
+
+import pytest
+
+from tetris_scores import DEFAULT_PLAYER, ScoreStore, player_name
+
+USERS = [
+    {'username': 'alice', 'scores': [1200, {'score': 300, 'lines': 3, 'level': 2,
+                                            'difficulty': 'hard', 'date': 1000.0}]},
+    {'username': 'bob', 'scores': [800]},
+    {'username': 'carol', 'scores': []}
+]
+
+@pytest.fixture
+def paths(tmp_path):
+    users_file = tmp_path / 'users.json'
+    users_file.write_text(json.dumps(USERS))
+    return str(tmp_path / 'scores.db'), str(users_file)
+
+def fail_game_inserts(db):
+    conn = sqlite3.connect(db)
+    conn.execute("CREATE TRIGGER fail BEFORE INSERT ON games "
+                 "BEGIN SELECT RAISE(ABORT, 'disque plein'); END")
+    conn.commit()
+    conn.close()
+
+def test_migration_runs_once(paths):
+    db, users_file = paths
+    store = ScoreStore(db, users_file)
+    assert [row[:2] for row in store.top(10)] == [('alice', 1200), ('bob', 800), ('alice', 300)]
+    assert store.rank('alice') == (1, 1200, 2)
+    assert store.rank('alice', 'hard') == (1, 300, 1)
+    store.close()
+    store = ScoreStore(db, users_file)
+    assert len(store.top(10)) == 3
+    store.close()
+
+def test_failed_migration_is_retried(paths):
+    db, users_file = paths
+    ScoreStore(db, users_file=None).close()
+    fail_game_inserts(db)
+    with pytest.raises(sqlite3.Error):
+        ScoreStore(db, users_file)
+    conn = sqlite3.connect(db)
+    assert conn.execute("SELECT COUNT(*) FROM meta").fetchone()[0] == 0
+    assert conn.execute("SELECT COUNT(*) FROM users").fetchone()[0] == 0
+    conn.execute('DROP TRIGGER fail')
+    conn.commit()
+    conn.close()
+    store = ScoreStore(db, users_file)
+    assert len(store.top(10)) == 3
+    store.close()
+
+def test_failed_flush_keeps_pending_games(paths):
+    db, _ = paths
+    store = ScoreStore(db, users_file=None)
+    store.record('dave', 500, difficulty='easy')
+    store.flush()
+    fail_game_inserts(db)
+    store.record('erin', 900, difficulty='easy')
+    with pytest.raises(sqlite3.Error):
+        store.flush()
+    store.conn.execute('DROP TRIGGER fail')
+    assert store.flush() == 1
+    assert [row[:2] for row in store.top(10, 'easy')] == [('erin', 900), ('dave', 500)]
+    assert store.rank('dave', 'easy') == (2, 500, 2)
+    store.close()
+
+def test_batches_are_written_when_full(tmp_path):
+    store = ScoreStore(str(tmp_path / 'scores.db'), users_file=None, batch_size=4)
+    for score in range(10):
+        store.record('frank', score)
+    assert len(store._pending) == 2
+    assert store.rank('frank') == (1, 9, 1)
+    store.close()
+
+def test_player_name_falls_back(monkeypatch):
+    monkeypatch.setenv('TETRIS_USER', 'alice')
+    assert player_name() == 'alice'
+    monkeypatch.delenv('TETRIS_USER')
+    monkeypatch.setattr(getpass, 'getuser', lambda: 'bob')
+    assert player_name() == 'bob'
+    for error in (KeyError('uid'), OSError('No username set in the environment')):
+        def getuser(error=error):
+            raise error
+        monkeypatch.setattr(getpass, 'getuser', getuser)
+        assert player_name() == DEFAULT_PLAYER
@@ -0,0 +1,94 @@
+import time
+
+import pytest
+
+from tetris_ai import TABLE_SIZE, Heuristic, TetrisAI, apply_placement, enumerate_placements
+from tetris_engine import TetrisEngine
+from tetris_search import _ROWS, ParallelSearchAI, init_worker, search_roots
+
+def midgame(seed=3, pieces=12):
+    # Partie avancée par l'IA à deux pièces : plateau non vide
+    engine = TetrisEngine('hard', seed=seed)
+    bot = TetrisAI(Heuristic())
+    for _ in range(pieces):
+        bot.place(engine)
+    assert not engine.game_over
+    return engine
+
+def assert_legal(engine, placement):
+    piece = engine.current_piece
+    reachable = {(p.x, p.y, p.rotation)
+                 for p in enumerate_placements(engine.board, piece.type, piece.x, piece.y,
+                                               piece.rotation)}
+    assert (placement.x, placement.y, placement.rotation) in reachable
+    # Le chemin rendu amène la pièce à la pose annoncée
+    for action in placement.actions:
+        assert engine.apply_action(action)
+    assert (piece.x, piece.y, piece.rotation) == (placement.x, placement.y, placement.rotation)
+
+@pytest.fixture
+def search():
+    bots = []
+    def make(**kwargs):
+        bot = ParallelSearchAI(Heuristic(), workers=1, **kwargs).start()
+        bots.append(bot)
+        return bot
+    yield make
+    for bot in bots:
+        bot.close()
+
+def test_deepening_returns_legal_placement(search):
+    engine = midgame()
+    bot = search(max_depth=3, time_budget=30.0)
+    placement = bot.choose_move(engine)
+    report = bot.last_report
+    assert report.depth == 3 and not report.timed_out
+    assert report.nodes > report.roots
+    assert_legal(engine, placement)
+
+def test_deadline_is_respected(search):
+    engine = midgame()
+    budget = 0.05
+    bot = search(max_depth=5, time_budget=budget)
+    for _ in range(3):
+        placement = bot.choose_move(engine)
+        report = bot.last_report
+        # La profondeur 5 ne tient pas dans 50 ms : la recherche s'arrête à l'échéance
+        assert report.timed_out and report.depth < 5
+        assert report.elapsed < budget + 0.1
+        assert_legal(engine, placement)
+        engine.apply_action('drop')
+
+def test_play_does_not_block(search):
+    engine = midgame()
+    bot = search(max_depth=4, time_budget=2.0)
+    pieces = engine.pieces_placed
+    start = time.monotonic()
+    assert bot.play(engine) is None  # profondeur 1 faite, la suite tourne dans le pool
+    assert bot.searching
+    assert time.monotonic() - start < 1.0
+    while engine.pieces_placed == pieces:
+        bot.play(engine)
+        time.sleep(0.005)  # une frame : le processus de travail avance
+        assert time.monotonic() - start < 10.0
+    assert not bot.searching
+    assert bot.last_report.depth >= 2
+
+@pytest.mark.parametrize('seed', [3, 8])
+def test_subtree_cache_matches_fresh_search(seed):
+    engine = midgame(seed, pieces=20)
+    piece = engine.current_piece
+    rows = engine.board.rows
+    roots = [(i, p.x, p.y, p.rotation)
+             for i, p in enumerate(enumerate_placements(engine.board, piece.type, piece.x,
+                                                        piece.y, piece.rotation))
+             if apply_placement(rows, p)[0] is not None]
+    pieces = [engine.next_piece.type, engine.previews[0]]
+    results = []
+    for subtrees in (True, False):
+        init_worker(Heuristic(), TABLE_SIZE, subtrees)
+        results.append(search_roots(_ROWS.pack(*rows), piece.type, roots, pieces, float('inf')))
+    (cached, cached_nodes, complete), (fresh, fresh_nodes, _) = results
+    assert complete
+    assert cached == fresh
+    assert cached_nodes < fresh_nodes
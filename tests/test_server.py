@@ -0,0 +1,210 @@
+import asyncio
+import json
+import random
+
+from tetris_ai import Heuristic, TetrisAI
+from tetris_engine import ACTIONS, GRID_HEIGHT, GRID_WIDTH, TetrisEngine
+from tetris_server import TetrisServer, TimerWheel
+
+# Roue temporelle
+
+def test_wheel_fires_items_at_their_frame():
+    wheel = TimerWheel(size=8)
+    due = {wheel.schedule('a', 1): 'a', wheel.schedule('b', 5): 'b', wheel.schedule('c', 7): 'c'}
+    fired = {}
+    for _ in range(20):
+        for item in wheel.advance():
+            fired[item] = wheel.frame
+    assert fired == {item: frame for frame, item in due.items()}
+    assert fired == {'a': 1, 'b': 5, 'c': 7}
+
+def test_wheel_clamps_delays_and_wraps():
+    wheel = TimerWheel(size=8)
+    for _ in range(6):
+        wheel.advance()
+    assert wheel.schedule('now', 0) == 7  # au plus tôt la frame suivante
+    assert wheel.schedule('far', 100) == 13  # au plus tard un tour moins une frame
+    assert wheel.schedule('wrap', 4) == 10
+    fired = []
+    for _ in range(8):
+        fired += [(item, wheel.frame) for item in wheel.advance()]
+    assert fired == [('now', 7), ('wrap', 10), ('far', 13)]
+
+def test_wheel_keeps_several_items_per_slot():
+    wheel = TimerWheel(size=4)
+    for item in range(5):
+        wheel.schedule(item, 2)
+    assert wheel.advance() == []
+    assert list(wheel.advance()) == [0, 1, 2, 3, 4]
+    assert wheel.advance() == []
+
+# Gravité par session
+
+def test_gravity_matches_engine_ticks():
+    server = TetrisServer()
+    sessions = [server.open_session(difficulty, seed=i)
+                for i, difficulty in enumerate(['easy', 'medium', 'hard'] * 3)]
+    references = [TetrisEngine(session.engine.difficulty, seed=i)
+                  for i, session in enumerate(sessions)]
+    # Premier pas décalé selon l'id, puis un pas toutes les fall_speed × hz frames
+    due = [1 + session.id % max(1, round(reference.fall_speed * server.hz))
+           for session, reference in zip(sessions, references)]
+    for frame in range(1, 3000):
+        server.tick()
+        for i, (session, reference) in enumerate(zip(sessions, references)):
+            if frame == due[i] and not reference.game_over:
+                reference.tick()
+                due[i] = frame + max(1, round(reference.fall_speed * server.hz))
+            assert session.engine.board.rows == reference.board.rows
+            assert session.engine.current_piece == reference.current_piece
+    assert all(reference.pieces_placed for reference in references)
+
+def test_closed_and_restarted_sessions_drop_stale_entries():
+    server = TetrisServer()
+    closed = server.open_session('hard', seed=1)
+    restarted = server.open_session('hard', seed=2)
+    delay = server._gravity_delay(restarted)
+    stale = restarted.due
+    assert stale == 1 + restarted.id % delay
+    server.close_session(closed)
+    y = closed.engine.current_piece.y
+    server.tick()
+    server.restart_session(restarted)
+    assert restarted.due == server.wheel.frame + delay
+    start = restarted.engine.current_piece.y
+    while server.wheel.frame < restarted.due - 1:
+        server.tick()
+    # L'échéance d'avant le redémarrage est passée sans faire tomber la pièce
+    assert server.wheel.frame > stale
+    assert restarted.engine.current_piece.y == start
+    server.tick()
+    assert restarted.engine.current_piece.y == start + 1
+    assert closed.engine.current_piece.y == y
+
+# Deltas
+
+class Client:
+    # État reconstruit par un client à partir des deltas reçus
+    def __init__(self):
+        self.rows = ['.' * GRID_WIDTH] * GRID_HEIGHT
+        self.piece = self.next = self.counters = None
+        self.over = False
+
+    def apply(self, message):
+        for r, row in message.get('r', {}).items():
+            self.rows[int(r)] = row
+        if 'p' in message:
+            self.piece = tuple(message['p'])
+        if 'n' in message:
+            self.next = message['n']
+        if 's' in message:
+            self.counters = (message['s'], message['l'], message['v'])
+        self.over = bool(message.get('o'))
+
+class Writer:
+    # Remplace asyncio.StreamWriter : garde les messages envoyés
+    class transport:
+        def get_write_buffer_size():
+            return 0
+
+    def __init__(self):
+        self.messages = []
+
+    def write(self, payload):
+        self.messages.append(json.loads(payload))
+
+def engine_view(engine):
+    piece = engine.current_piece
+    return ([''.join(cell or '.' for cell in row) for row in engine.board.colors],
+            (piece.type, piece.x, piece.y, piece.rotation), engine.next_piece.type,
+            (engine.score, engine.lines, engine.level), engine.game_over)
+
+def client_view(client):
+    return client.rows, client.piece, client.next, client.counters, client.over
+
+def test_first_delta_is_full_state_then_only_changes():
+    server = TetrisServer()
+    session = server.open_session('medium', seed=4)
+    message = session.delta(0)
+    assert set(message) == {'id', 'f', 'r', 'p', 'n', 's', 'l', 'v'}
+    assert len(message['r']) == GRID_HEIGHT
+    assert session.delta(1) == {'id': session.id, 'f': 1}
+    session.engine.apply_action('left')
+    message = session.delta(2)
+    assert set(message) == {'id', 'f', 'p'}
+
+def test_deltas_rebuild_engine_state():
+    server = TetrisServer()
+    writer = Writer()
+    sessions = [server.open_session('hard', seed=i, writer=writer) for i in range(4)]
+    clients = {session.id: Client() for session in sessions}
+    rng = random.Random(0)
+    # La première session suit l'IA (effacements de lignes), les autres jouent au hasard
+    bot = TetrisAI(Heuristic())
+    planned = []
+    for _ in range(3000):
+        for session in sessions:
+            if session.engine.game_over:
+                server.restart_session(session)
+            elif session is sessions[0]:
+                if not planned:
+                    placement = bot.choose_move(session.engine)
+                    planned = (list(placement.actions) if placement else []) + ['drop']
+                server.handle_action(session, planned.pop(0))
+            elif rng.random() < 0.3:
+                server.handle_action(session, rng.choice(ACTIONS))
+        server.tick()
+        for message in writer.messages:
+            assert message['f'] == server.frame
+            clients[message['id']].apply(message)
+        writer.messages.clear()
+        for session in sessions:
+            assert client_view(clients[session.id]) == engine_view(session.engine)
+    assert sessions[0].engine.lines > 0
+
+def test_game_over_is_reported():
+    server = TetrisServer()
+    session = server.open_session('hard', seed=0)
+    while not session.engine.game_over:
+        server.handle_action(session, 'drop')
+    message = session.delta(server.frame)
+    assert message['o'] == 1
+    assert not server.handle_action(session, 'left')
+
+def test_client_protocol_over_tcp():
+    async def scenario():
+        server = TetrisServer()
+        listener = await asyncio.start_server(server.handle_client, '127.0.0.1', 0)
+        port = listener.sockets[0].getsockname()[1]
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+
+        async def send(message):
+            writer.write((json.dumps(message) + '\n').encode())
+            await writer.drain()
+            for _ in range(50):
+                await asyncio.sleep(0.005)
+                if server.sessions:
+                    break
+
+        async def receive():
+            server.tick()
+            return json.loads(await asyncio.wait_for(reader.readline(), 5))
+
+        await send({'type': 'new', 'difficulty': 'hard', 'seed': 3})
+        first = await receive()
+        session = server.sessions[first['id']]
+        assert len(first['r']) == GRID_HEIGHT
+        assert tuple(first['p']) == engine_view(session.engine)[1]
+        await send({'type': 'action', 'action': 'drop'})
+        second = await receive()
+        assert 'r' in second
+        assert tuple(second['p']) == engine_view(session.engine)[1]
+        await send({'type': 'bogus'})
+        assert 'error' in json.loads(await asyncio.wait_for(reader.readline(), 5))
+        await send({'type': 'close'})
+        assert await asyncio.wait_for(reader.read(), 5) == b''
+        assert not server.sessions
+        writer.close()
+        listener.close()
+        await listener.wait_closed()
+    asyncio.run(scenario())
@@ -0,0 +1,99 @@
+import json
+import os
+
+import pytest
+
+from tetris_engine import GRID_HEIGHT, GRID_WIDTH, PIECE_TYPES, Piece, ROTATIONS, TetrisEngine
+from tetris_snapshot import (SNAPSHOT_VERSION, decode_snapshot, encode_snapshot,
+                             restore_snapshot, snapshot_from_json)
+
+# Ancienne sauvegarde JSON livrée à la racine du dépôt
+SAVE_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                         'game_save.json')
+
+def state(engine):
+    return (engine.difficulty, engine.board.rows, engine.grid, engine.current_piece,
+            engine.next_piece, engine.pieces.getstate(), engine.pieces.bag, engine.score,
+            engine.lines, engine.level, engine.pieces_placed, engine.game_over,
+            engine.fall_speed)
+
+def clear_with_vertical_i(engine, lines):
+    # `lines` lignes pleines sauf la colonne 0, comblées par un I vertical
+    grid = [[0] * GRID_WIDTH for _ in range(GRID_HEIGHT)]
+    for r in range(GRID_HEIGHT - lines, GRID_HEIGHT):
+        grid[r] = [0] + ['O'] * (GRID_WIDTH - 1)
+    engine.grid = grid
+    x = -min(dx for dx, _ in ROTATIONS['I'][1].cells)
+    engine.current_piece = Piece('I', x, 0, 1)
+    return engine.hard_drop()
+
+@pytest.mark.parametrize('difficulty', ['easy', 'medium', 'hard'])
+@pytest.mark.parametrize('bag', [False, True])
+def test_round_trip_after_play(difficulty, bag):
+    engine = TetrisEngine(difficulty, seed=7, bag=bag)
+    for i in range(300):
+        engine.step(('left', 'rotate', 'right', 'drop', None)[i % 5])
+    data = encode_snapshot(engine)
+    assert data[0] == SNAPSHOT_VERSION
+    restored = restore_snapshot(TetrisEngine(seed=1), data)
+    assert state(restored)[:-1] == state(engine)[:-1]
+    assert restored.fall_speed == pytest.approx(engine.fall_speed)
+    # Même suite de pièces après la restauration
+    assert [restored.new_piece().type for _ in range(20)] == \
+           [engine.new_piece().type for _ in range(20)]
+
+def test_multi_level_jump_keeps_fall_speed():
+    # Deux lignes d'un coup en facile : niveau 1 -> 3, une seule baisse de vitesse
+    engine = TetrisEngine('easy', seed=3)
+    assert clear_with_vertical_i(engine, 2) == 2
+    assert engine.level == 3
+    assert engine.fall_speed == pytest.approx(0.4)
+    restored = restore_snapshot(TetrisEngine('easy'), encode_snapshot(engine))
+    assert restored.level == 3
+    assert restored.fall_speed == pytest.approx(engine.fall_speed)
+
+def test_gravity_after_restore_matches_live_play():
+    engine = TetrisEngine('easy', seed=5)
+    clear_with_vertical_i(engine, 2)
+    engine.fall_time = 0.0
+    restored = restore_snapshot(TetrisEngine('easy'), encode_snapshot(engine))
+    for _ in range(600):
+        engine.update(1 / 60)
+        restored.update(1 / 60)
+    assert state(restored)[:-1] == state(engine)[:-1]
+
+def test_tall_stack_size():
+    # Pire cas : 20 lignes à 9 cases, sept couleurs, gros compteurs
+    engine = TetrisEngine('hard', seed=2, bag=True)
+    engine.grid = [[PIECE_TYPES[(r * 9 + c) % 7] if c != r % GRID_WIDTH else 0
+                    for c in range(GRID_WIDTH)] for r in range(GRID_HEIGHT)]
+    engine.score, engine.lines, engine.level, engine.pieces_placed = 10 ** 7, 5000, 501, 10 ** 5
+    data = encode_snapshot(engine)
+    # Lignes sur 10 bits et couleurs sur 3 bits : 25 + 68 octets de plateau
+    assert len(data) <= 130
+    assert restore_snapshot(TetrisEngine(), data).grid == engine.grid
+
+def test_json_import():
+    grid = [[0] * GRID_WIDTH for _ in range(GRID_HEIGHT)]
+    grid[-1] = ['T'] * 5 + [0] * 5
+    engine = restore_snapshot(TetrisEngine(), snapshot_from_json(
+        {'difficulty': 'easy', 'grid': grid, 'score': 300, 'level': 2, 'lines': 1}, seed=4))
+    assert engine.grid == grid
+    assert (engine.score, engine.level, engine.lines) == (300, 2, 1)
+    assert engine.fall_speed == pytest.approx(0.4)
+
+def test_json_import_keeps_saved_fall_speed():
+    with open(SAVE_FILE, 'r') as f:
+        save_data = json.load(f)
+    assert save_data['fall_speed'] == 0.7
+    engine = restore_snapshot(TetrisEngine(), snapshot_from_json(save_data, seed=4))
+    assert engine.fall_speed == pytest.approx(0.7)
+    save_data['level'] = 4
+    engine = restore_snapshot(TetrisEngine(), snapshot_from_json(save_data, seed=4))
+    assert engine.fall_speed == pytest.approx(0.7)
+
+def test_unknown_version_is_rejected():
+    data = bytearray(encode_snapshot(TetrisEngine(seed=1)))
+    data[0] = 99
+    with pytest.raises(ValueError):
+        decode_snapshot(bytes(data))
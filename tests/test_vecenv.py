@@ -0,0 +1,119 @@
+import numpy as np
+
+from tetris_ai import Heuristic, TetrisAI
+from tetris_engine import ACTIONS, PIECE_TYPES, Piece, TetrisEngine
+from tetris_vecenv import NOOP, NUM_ACTIONS, VectorTetrisEnv
+
+def engine_state(engine):
+    piece = engine.current_piece
+    return (list(engine.board.rows), PIECE_TYPES.index(piece.type),
+            PIECE_TYPES.index(engine.next_piece.type), piece.x, piece.y, piece.rotation,
+            engine.score, engine.lines, engine.level, engine.pieces_placed)
+
+def env_state(env, i):
+    return ([int(row) for row in env.rows[i]], int(env.piece[i]), int(env.next[i]),
+            int(env.x[i]), int(env.y[i]), int(env.rotation[i]), int(env.score[i]),
+            int(env.lines[i]), int(env.level[i]), int(env.pieces_placed[i]))
+
+def random_actions(seed):
+    # Beaucoup de chutes directes : des parties entières, game over compris
+    rng = np.random.default_rng(seed)
+    weights = np.ones(NUM_ACTIONS)
+    weights[ACTIONS.index('drop')] = 3
+    weights /= weights.sum()
+    return lambda engines: rng.choice(NUM_ACTIONS, size=len(engines), p=weights)
+
+def ai_actions():
+    # Actions du plan de TetrisAI pour chaque moteur : des lignes effacées
+    bot = TetrisAI(Heuristic())
+    plans = {}
+    def choose(engines):
+        actions = []
+        for i, engine in enumerate(engines):
+            plan = plans.get(i)
+            if not plan or plan[0] != engine.pieces_placed:
+                placement = bot.choose_move(engine)
+                moves = list(placement.actions) if placement else []
+                plan = plans[i] = (engine.pieces_placed, moves + ['drop'])
+            actions.append(ACTIONS.index(plan[1].pop(0)) if plan[1] else NOOP)
+        return np.array(actions)
+    return choose
+
+def run_parity(env, engines, steps, choose):
+    games_over = 0
+    for _ in range(steps):
+        actions = choose(engines)
+        _, rewards, dones, infos = env.step(actions)
+        for i, engine in enumerate(engines):
+            score_before = engine.score
+            engine.step(None if actions[i] == NOOP else ACTIONS[actions[i]])
+            assert rewards[i] == engine.score - score_before
+            assert bool(dones[i]) == engine.game_over
+            if engine.game_over:
+                games_over += 1
+                assert infos['final_score'][i] == engine.score
+                assert infos['final_lines'][i] == engine.lines
+                assert infos['final_pieces'][i] == engine.pieces_placed
+                engine.reset_game()
+            assert env_state(env, i) == engine_state(engine)
+    return games_over
+
+def test_reset_matches_engine():
+    env = VectorTetrisEnv(16, seed=40)
+    for i in range(16):
+        assert env_state(env, i) == engine_state(TetrisEngine(seed=40 + i))
+
+def test_step_parity_with_engine():
+    env = VectorTetrisEnv(32, seed=7)
+    engines = [TetrisEngine(seed=7 + i) for i in range(32)]
+    assert run_parity(env, engines, 400, random_actions(1)) > 0
+
+def test_line_clear_parity():
+    # Parties de l'IA : effacements, score et montées de niveau
+    env = VectorTetrisEnv(4, seed=20)
+    engines = [TetrisEngine(seed=20 + i) for i in range(4)]
+    run_parity(env, engines, 300, ai_actions())
+    assert min(engine.lines for engine in engines) > 0
+    assert max(engine.level for engine in engines) > 1
+
+def test_shared_slice_parity():
+    env = VectorTetrisEnv(8, seed=100, shared=True)
+    try:
+        part = VectorTetrisEnv.attach(env.shm_name, 8, 4, 8)
+        engines = [TetrisEngine(seed=104 + i) for i in range(4)]
+        run_parity(part, engines, 150, random_actions(2))
+        # La tranche avance dans la mémoire du propriétaire
+        for i in range(4):
+            assert env_state(env, 4 + i) == engine_state(engines[i])
+        part.close()
+    finally:
+        env.close()
+
+def test_noop_is_a_gravity_step():
+    env = VectorTetrisEnv(2, seed=3)
+    engines = [TetrisEngine(seed=3 + i) for i in range(2)]
+    env.step(np.array([NOOP, NOOP]))
+    for i, engine in enumerate(engines):
+        engine.step(None)
+        assert env_state(env, i) == engine_state(engine)
+
+def test_lock_above_the_grid():
+    # Pièces verrouillées en partie ou entièrement au-dessus de la grille, sur
+    # un plateau dont le bas est rempli (un indice négatif y écrirait)
+    positions = [('I', 3, -1, 0), ('T', 4, -2, 0), ('I', 4, -4, 1), ('O', 4, -6, 0),
+                 ('I', 2, -9, 1), ('J', 5, -40, 2)]
+    env = VectorTetrisEnv(len(positions), seed=60)
+    engines = [TetrisEngine(seed=60 + i) for i in range(len(positions))]
+    for i, (piece_type, x, y, rotation) in enumerate(positions):
+        engine = engines[i]
+        engine.board.rows[-4:] = [0b0111111111, 0b1111111110, 0b1011111111, 0b1111101111]
+        engine.board.refresh()
+        env.rows[i] = engine.board.rows
+        engine.current_piece = Piece(piece_type, x, y, rotation)
+        env.piece[i] = PIECE_TYPES.index(piece_type)
+        env.x[i], env.y[i], env.rotation[i] = x, y, rotation
+    env._lock(np.arange(len(positions)))
+    for i, engine in enumerate(engines):
+        engine.place_piece()
+        assert engine.game_over and env.game_over[i]
+        assert env_state(env, i) == engine_state(engine)
@@ -0,0 +1,447 @@
+import json
+import os
+import random
+from dataclasses import dataclass
+from typing import Tuple
+
+from tetris_engine import (GRID_WIDTH, GRID_HEIGHT, FULL_ROW, X_MARGIN, ROTATIONS,
+                           DEFAULT_PREVIEWS, KICKS, SPAWN_X, SPAWN_Y, ZOBRIST_ROWS, Board,
+                           zobrist_hash)
+
+try:
+    import tetris_features
+except ImportError:  # NumPy absent : évaluation plateau par plateau en Python
+    tetris_features = None
+
+# IA : énumération des poses atteignables et choix du coup par heuristique.
+# Tout travaille sur le bitboard du moteur (Board.fits), sans pygame.
+
+# Poids par défaut (heuristique classique hauteur / lignes / trous / bosses)
+DEFAULT_WEIGHTS = {
+    'aggregate_height': -0.510066,
+    'lines': 0.760666,
+    'holes': -0.35663,
+    'bumpiness': -0.184483
+}
+
+# Poids optimisés (tetris_optimize.py) chargés par le joueur IA du jeu
+WEIGHTS_FILE = 'ai_weights.json'
+
+def load_weights(file_path=WEIGHTS_FILE):
+    if os.path.exists(file_path):
+        try:
+            with open(file_path, 'r') as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"Erreur lors du chargement des poids de l'IA : {e}")
+    return dict(DEFAULT_WEIGHTS)
+
+# Espace des états (x, y, rotation) de la recherche, encodés en un seul int
+_X_SPAN = GRID_WIDTH + 2 * X_MARGIN
+_Y_MIN = -4
+_Y_SPAN = GRID_HEIGHT - _Y_MIN
+_STATES = 4 * _Y_SPAN * _X_SPAN
+
+# Codes des mouvements mémorisés pour reconstruire le chemin
+_MOVE_NAMES = (None, 'left', 'right', 'down', 'rotate', 'rotate_ccw', 'sonic_drop')
+
+@dataclass
+class Placement:
+    piece_type: str
+    x: int
+    y: int
+    rotation: int
+    actions: Tuple[str, ...]  # chemin depuis la position de départ (sans le 'drop' final)
+
+def _encode(x, y, rotation):
+    return (rotation * _Y_SPAN + y - _Y_MIN) * _X_SPAN + x + X_MARGIN
+
+def _decode(state):
+    rest, xi = divmod(state, _X_SPAN)
+    rotation, yi = divmod(rest, _Y_SPAN)
+    return xi - X_MARGIN, yi + _Y_MIN, rotation
+
+def enumerate_placements(board, piece_type, x=None, y=None, rotation=0):
+    # BFS sur les états (x, y, rotation) depuis la position de départ : couvre
+    # toutes les colonnes et rotations, les glissades sous un surplomb et les spins.
+    # La chute jusqu'au contact ('sonic_drop') compte pour un seul mouvement.
+    # Une pose finale est un état qui ne peut plus descendre.
+    if x is None:
+        x = SPAWN_X[piece_type]
+    if y is None:
+        y = SPAWN_Y[piece_type]
+    orientations = ROTATIONS[piece_type]
+    kicks = KICKS[piece_type]
+    fits = board.fits
+    drop_row = board.drop_row
+    if not fits(orientations[rotation], x, y):
+        return []
+
+    # Au-dessus de `free_y` la boîte de la pièce ne touche aucune ligne occupée :
+    # on y descend en un seul nœud au lieu d'explorer chaque hauteur
+    rows = board.rows
+    top = 0
+    while top < GRID_HEIGHT and not rows[top]:
+        top += 1
+    free_y = top - 4
+
+    start = _encode(x, y, rotation)
+    visited = bytearray(_STATES)
+    parent = [0] * _STATES
+    move = bytearray(_STATES)
+    visited[start] = 1
+    queue = [start]
+    finals = {}
+
+    def push(state, from_state, code):
+        if not visited[state]:
+            visited[state] = 1
+            parent[state] = from_state
+            move[state] = code
+            queue.append(state)
+
+    head = 0
+    while head < len(queue):
+        state = queue[head]
+        head += 1
+        x, y, rotation = _decode(state)
+        orientation = orientations[rotation]
+
+        # Déplacements latéraux et rotations d'abord : à longueur égale, le chemin
+        # retenu tourne et se décale avant de descendre
+        if fits(orientation, x - 1, y):
+            push(state - 1, state, 1)
+        if fits(orientation, x + 1, y):
+            push(state + 1, state, 2)
+        for turn, code in ((0, 4), (1, 5)):
+            new_rotation = (rotation + (1 if turn == 0 else -1)) % 4
+            new_orientation = orientations[new_rotation]
+            for dx, dy in kicks[rotation][turn]:
+                if fits(new_orientation, x + dx, y + dy):
+                    if y + dy >= _Y_MIN:
+                        push(_encode(x + dx, y + dy, new_rotation), state, code)
+                    break
+        if fits(orientation, x, y + 1):
+            landing = drop_row(orientation, x, y + 1)
+            push(state + (landing - y) * _X_SPAN, state, 6)
+            step = free_y - y if y + 1 < free_y else 1
+            push(state + step * _X_SPAN, state, 3)
+        else:
+            # Deux orientations qui couvrent les mêmes cases donnent la même pose
+            placed = orientation.placed[x + X_MARGIN]
+            key = (y + placed[0][0], tuple(mask for _, mask in placed))
+            if key not in finals:
+                finals[key] = state
+
+    placements = []
+    for state in finals.values():
+        path = []
+        node = state
+        while node != start:
+            code = move[node]
+            if code == 3:
+                # Un nœud 'down' peut couvrir plusieurs lignes de la zone libre
+                path.extend(['down'] * ((node - parent[node]) // _X_SPAN))
+            else:
+                path.append(_MOVE_NAMES[code])
+            node = parent[node]
+        path.reverse()
+        x, y, rotation = _decode(state)
+        placements.append(Placement(piece_type, x, y, rotation, tuple(path)))
+    return placements
+
+def drop_placements(board, piece_type):
+    # Poses obtenues par simple chute (rotation puis colonne puis hard drop) :
+    # plus rapide que le BFS, utilisé pour l'anticipation de la pièce suivante
+    rows = board.rows
+    top = 0
+    while top < GRID_HEIGHT and not rows[top]:
+        top += 1
+    y_start = max(SPAWN_Y[piece_type], top - 4)
+    fits = board.fits
+    drop_row = board.drop_row
+    seen = set()
+    placements = []
+    for rotation, orientation in enumerate(ROTATIONS[piece_type]):
+        if orientation.masks in seen:
+            continue
+        seen.add(orientation.masks)
+        for x in range(-X_MARGIN + 1, GRID_WIDTH):
+            if orientation.placed[x + X_MARGIN] is None or not fits(orientation, x, y_start):
+                continue
+            placements.append(Placement(piece_type, x, drop_row(orientation, x, y_start),
+                                        rotation, ()))
+    return placements
+
+def apply_placement(rows, placement):
+    # Bitboard après la pose et lignes effacées ; None si la pièce dépasse le haut
+    placed = ROTATIONS[placement.piece_type][placement.rotation].placed[placement.x + X_MARGIN]
+    new_rows = rows[:]
+    y = placement.y
+    for i, mask in placed:
+        if y + i < 0:
+            return None, 0
+        new_rows[y + i] |= mask
+    kept = [row for row in new_rows if row != FULL_ROW]
+    cleared = GRID_HEIGHT - len(kept)
+    if cleared:
+        new_rows = [0] * cleared + kept
+    return new_rows, cleared
+
+def placement_zobrist(zobrist, rows, placement):
+    # Hash de Zobrist du plateau après la pose, calculé depuis celui d'avant sans
+    # construire le plateau ; None si la pose complète une ligne (les lignes
+    # au-dessus changent toutes d'indice) ou dépasse le haut de la grille
+    placed = ROTATIONS[placement.piece_type][placement.rotation].placed[placement.x + X_MARGIN]
+    y = placement.y
+    for i, mask in placed:
+        r = y + i
+        if r < 0:
+            return None
+        row = rows[r]
+        new_row = row | mask
+        if new_row == FULL_ROW:
+            return None
+        keys = ZOBRIST_ROWS[r]
+        zobrist ^= keys[row] ^ keys[new_row]
+    return zobrist
+
+def board_features(rows):
+    # Hauteurs de colonnes, trous (cases vides sous un bloc) et bosses
+    heights = [0] * GRID_WIDTH
+    holes = 0
+    seen = 0
+    r = 0
+    while r < GRID_HEIGHT and not rows[r]:
+        r += 1
+    while r < GRID_HEIGHT:
+        row = rows[r]
+        if seen:
+            holes += (seen & ~row).bit_count()
+        new = row & ~seen
+        while new:
+            low = new & -new
+            heights[low.bit_length() - 1] = GRID_HEIGHT - r
+            new ^= low
+        seen |= row
+        r += 1
+    bumpiness = 0
+    previous = heights[0]
+    for height in heights[1:]:
+        bumpiness += abs(height - previous)
+        previous = height
+    return sum(heights), holes, bumpiness
+
+class Heuristic:
+    # Heuristique linéaire ; toute fonction (rows, lignes) -> score peut la remplacer.
+    # Les poids des caractéristiques supplémentaires de tetris_features (puits,
+    # transitions...) ne sont pris en compte que par l'évaluation par lots.
+    def __init__(self, weights=None):
+        self.weights = dict(DEFAULT_WEIGHTS if weights is None else weights)
+
+    def __call__(self, rows, lines_cleared):
+        aggregate_height, holes, bumpiness = board_features(rows)
+        w = self.weights
+        return (w.get('aggregate_height', 0.0) * aggregate_height +
+                w.get('lines', 0.0) * lines_cleared +
+                w.get('holes', 0.0) * holes +
+                w.get('bumpiness', 0.0) * bumpiness)
+
+    def score_batch(self, rows_batch, lines):
+        if tetris_features is None:
+            return [self(rows, cleared) for rows, cleared in zip(rows_batch, lines)]
+        return tetris_features.BatchEvaluator(self.weights).scores(rows_batch, lines).tolist()
+
+# Table de transposition : scores des plateaux feuilles déjà évalués, gardés
+# d'un coup à l'autre. Les feuilles ne se répètent presque pas entre deux coups
+# et, avec la notation par lots, leur génération coûte plus que leur note : la
+# table ralentit l'IA à deux pièces (bench ai_choose_move_table) et n'est pas
+# activée par défaut. Les doublons d'un même coup sont écartés sans elle.
+TABLE_SIZE = 1 << 15
+# Clés mêlées au hash du plateau pour le nombre de lignes effacées (le score en dépend),
+# jusqu'à 4 lignes par pièce pour une recherche sur toute la file d'aperçus
+_line_rng = random.Random(0x11E5)
+LINE_KEYS = [0] + [_line_rng.getrandbits(64) for _ in range(4 * (DEFAULT_PREVIEWS + 2))]
+
+class TranspositionTable:
+    # Cache borné hash -> score, LRU approché à deux générations : les entrées
+    # vont dans `recent` ; plein, il devient `older` et l'ancien `older` est
+    # jeté d'un bloc. Une entrée relue dans `older` remonte dans `recent`.
+    # Pas de réordonnancement à chaque accès : la table reste dans le budget
+    # d'une feuille.
+    def __init__(self, capacity=TABLE_SIZE):
+        self.capacity = capacity
+        self.recent = {}
+        self.older = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.recent) + len(self.older)
+
+    def get(self, key):
+        score = self.recent.get(key)
+        if score is None:
+            score = self.older.get(key)
+            if score is None:
+                self.misses += 1
+                return None
+            self.put(key, score)
+        self.hits += 1
+        return score
+
+    def put(self, key, score):
+        recent = self.recent
+        recent[key] = score
+        if len(recent) >= self.capacity // 2:
+            self.evictions += len(self.older)
+            self.older = recent
+            self.recent = {}
+
+    def clear(self):
+        self.recent = {}
+        self.older = {}
+        self.hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else 0.0
+        }
+
+class TetrisAI:
+    def __init__(self, heuristic=None, lookahead=True, table_size=0, book=None):
+        self.heuristic = heuristic or Heuristic()
+        self.lookahead = lookahead
+        # table_size=0 : pas de table, chaque feuille distincte d'un coup est notée
+        self.table = TranspositionTable(table_size) if table_size else None
+        # Livre d'ouvertures (tetris_book.OpeningBook) consulté avant la recherche
+        self.book = book
+        self._plan = []
+        self._plan_piece = None
+
+    def best_placement(self, board, piece, next_type=None):
+        # Le hash de chaque plateau feuille est calculé avant le plateau lui-même :
+        # une feuille déjà dans la table de transposition n'est ni construite ni
+        # notée. Les autres sont notées en un seul lot puis rangées dans la table.
+        table = self.table
+        candidates = []
+        best_scores = []
+        pending = {}  # clé -> candidats dont c'est une feuille
+        pending_rows, pending_lines = [], []
+
+        def lookup(key, owner):
+            # True si le score de la feuille est connu ou déjà en attente
+            owners = pending.get(key)
+            if owners is not None:
+                owners.append(owner)
+                if table is not None:
+                    table.hits += 1
+                return True
+            if table is None:
+                return False
+            score = table.get(key)
+            if score is None:
+                return False
+            if score > best_scores[owner]:
+                best_scores[owner] = score
+            return True
+
+        def add(key, rows, lines, owner):
+            pending[key] = [owner]
+            pending_rows.append(rows)
+            pending_lines.append(lines)
+
+        root_rows = board.rows
+        for placement in enumerate_placements(board, piece.type, piece.x, piece.y,
+                                              piece.rotation):
+            rows, cleared = apply_placement(root_rows, placement)
+            if rows is None:
+                continue
+            zobrist = placement_zobrist(board.zobrist, root_rows, placement)
+            if zobrist is None:
+                zobrist = zobrist_hash(rows)
+            owner = len(candidates)
+            candidates.append(placement)
+            best_scores.append(float('-inf'))
+            if next_type is None:
+                key = zobrist ^ LINE_KEYS[cleared]
+                if not lookup(key, owner):
+                    add(key, rows, cleared, owner)
+                continue
+            for next_placement in drop_placements(Board.from_rows(rows, zobrist), next_type):
+                next_zobrist = placement_zobrist(zobrist, rows, next_placement)
+                if next_zobrist is not None and lookup(next_zobrist ^ LINE_KEYS[cleared], owner):
+                    continue
+                next_rows, next_cleared = apply_placement(rows, next_placement)
+                if next_rows is None:
+                    continue
+                lines = cleared + next_cleared
+                if next_zobrist is None:
+                    # Lignes effacées : hash recalculé sur le plateau compacté
+                    key = zobrist_hash(next_rows) ^ LINE_KEYS[lines]
+                    if lookup(key, owner):
+                        continue
+                else:
+                    key = next_zobrist ^ LINE_KEYS[lines]
+                add(key, next_rows, lines, owner)
+        if not candidates:
+            return None
+
+        if pending_rows:
+            heuristic = self.heuristic
+            if hasattr(heuristic, 'score_batch'):
+                scores = heuristic.score_batch(pending_rows, pending_lines)
+            else:
+                scores = [heuristic(rows, cleared)
+                          for rows, cleared in zip(pending_rows, pending_lines)]
+            for (key, owners), score in zip(pending.items(), scores):
+                if table is not None:
+                    table.put(key, score)
+                for owner in owners:
+                    if score > best_scores[owner]:
+                        best_scores[owner] = score
+        best = max(range(len(candidates)), key=best_scores.__getitem__)
+        return candidates[best]
+
+    def choose_move(self, engine):
+        if self.book is not None:
+            placement = self.book.lookup(engine)
+            if placement is not None:
+                return placement
+        next_type = engine.next_piece.type if self.lookahead else None
+        board = engine.board
+        return self.best_placement(Board.from_rows(board.rows, board.zobrist, board.heights),
+                                   engine.current_piece, next_type)
+
+    def place(self, engine):
+        # Choisit et joue immédiatement la pose complète (parties headless)
+        placement = self.choose_move(engine)
+        if placement is not None:
+            for action in placement.actions:
+                engine.apply_action(action)
+        engine.apply_action('drop')
+        return placement
+
+    def close(self):
+        # Rien à libérer ici ; ParallelSearchAI arrête son pool de processus
+        pass
+
+    def play(self, engine):
+        # Joue une action du plan ; on replanifie à chaque nouvelle pièce
+        # ou dès qu'une action échoue (la gravité a pu déplacer la pièce)
+        if engine.paused or engine.game_over:
+            return None
+        if engine.pieces_placed != self._plan_piece or not self._plan:
+            placement = self.choose_move(engine)
+            self._plan = ['drop'] + list(reversed(placement.actions)) if placement else ['drop']
+            self._plan_piece = engine.pieces_placed
+        action = self._plan.pop()
+        if not engine.apply_action(action):
+            self._plan = []
+        return action
@@ -0,0 +1,124 @@
+import os
+import threading
+
+import pygame
+
+# Ressources chargées à la demande : rien n'est initialisé à l'import. Les
+# sons sont décodés sur un thread de fond pendant l'écran de sélection, puis
+# gardés en cache. Sans périphérique audio, un mixer muet (no-op) les remplace.
+
+SOUNDS_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'sounds')
+SOUND_FILES = {
+    'clear': 'clear.wav',
+    'drop': 'drop.wav',
+    'lateral_move': 'lateralmove.wav',
+    'level_up': 'levelup.wav',
+    'rotate': 'rotate.wav',
+    'select': 'select.wav',
+    'start': 'start.wav',
+    'tetris': 'tetris.wav',
+    'game_over': 'gameover.wav'
+}
+MUSIC_FILE = 'background_music.mp3'
+MUSIC_VOLUME = 0.5
+
+class SilentSound:
+    # Même interface que pygame.mixer.Sound, sans effet
+    def play(self, *args, **kwargs):
+        return None
+
+    def stop(self):
+        pass
+
+    def set_volume(self, volume):
+        pass
+
+SILENT = SilentSound()
+
+class AssetManager:
+    def __init__(self, folder=SOUNDS_FOLDER):
+        self.folder = folder
+        self.audio = None  # None : pas encore essayé ; puis True / False
+        self._display = False
+        self._sounds = {}  # nom -> Sound décodé (ou SILENT)
+        self._lock = threading.RLock()
+        self._loader = None
+
+    def init_display(self):
+        # Affichage et polices seulement : le mixer reste à part
+        if not self._display:
+            pygame.display.init()
+            pygame.font.init()
+            self._display = True
+
+    def init_audio(self):
+        with self._lock:
+            if self.audio is None:
+                try:
+                    pygame.mixer.init()
+                    self.audio = True
+                except pygame.error as e:
+                    print(f"Audio indisponible, sons désactivés : {e}")
+                    self.audio = False
+            return self.audio
+
+    def preload(self, music=True):
+        # Lance le chargement de fond (mixer, musique, sons) ; sans effet s'il est déjà lancé
+        with self._lock:
+            if self._loader is None:
+                self._loader = threading.Thread(target=self._load_all, args=(music,),
+                                                name='tetris-assets', daemon=True)
+                self._loader.start()
+
+    def _load_all(self, music):
+        if not self.init_audio():
+            return
+        if music:
+            self.start_music()
+        for name in SOUND_FILES:
+            self.sound(name)
+
+    @property
+    def loading(self):
+        return self._loader is not None and self._loader.is_alive()
+
+    def wait(self, timeout=None):
+        if self._loader is not None:
+            self._loader.join(timeout)
+
+    def sound(self, name):
+        # Son décodé depuis le cache, chargé à la première demande
+        sound = self._sounds.get(name)
+        if sound is not None:
+            return sound
+        with self._lock:
+            sound = self._sounds.get(name)
+            if sound is None:
+                sound = SILENT
+                if self.init_audio():
+                    try:
+                        sound = pygame.mixer.Sound(os.path.join(self.folder, SOUND_FILES[name]))
+                    except (pygame.error, FileNotFoundError) as e:
+                        print(f"Erreur lors du chargement du son {name} : {e}")
+                self._sounds[name] = sound
+        return sound
+
+    def play(self, name):
+        # Pendant le chargement de fond, un son pas encore prêt est sauté
+        # plutôt que de bloquer la frame
+        sound = self._sounds.get(name)
+        if sound is None:
+            if self.loading:
+                return
+            sound = self.sound(name)
+        sound.play()
+
+    def start_music(self):
+        if not self.init_audio():
+            return
+        try:
+            pygame.mixer.music.load(os.path.join(self.folder, MUSIC_FILE))
+            pygame.mixer.music.set_volume(MUSIC_VOLUME)
+            pygame.mixer.music.play(-1)  # -1 pour jouer en boucle infinie
+        except pygame.error as e:
+            print(f"Erreur lors du chargement de la musique : {e}")
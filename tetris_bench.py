@@ -0,0 +1,335 @@
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from dataclasses import dataclass, asdict, field
+
+from tetris_engine import FULL_ROW, GRID_HEIGHT, GRID_WIDTH, TetrisEngine
+from tetris_ai import TABLE_SIZE, TetrisAI, apply_placement, enumerate_placements
+from tetris_search import _ROWS, init_worker, search_roots
+from tetris_selfplay import SelfPlayConfig, play_game
+from tetris_snapshot import decode_snapshot, encode_snapshot, restore_snapshot
+
+# Le benchmark d'affichage tourne sur une surface hors écran
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+try:
+    import tetris_game
+except Exception:  # pygame absent ou sans affichage : pas de benchmark d'affichage
+    tetris_game = None
+
+# Benchmarks des chemins critiques du moteur sur des plateaux réalistes
+# générés avec une graine, d'une partie headless complète et du rendu.
+# Les résultats sont écrits en JSON et comparés à une référence : code de
+# sortie non nul si un benchmark régresse au-delà du seuil.
+
+RESULTS_FILE = 'bench_results.json'
+BASELINE_FILE = 'bench_baseline.json'
+DEFAULT_THRESHOLD = 0.2  # régression tolérée (+20 % de temps, -20 % de débit)
+
+@dataclass
+class BenchResult:
+    name: str
+    value: float  # médiane des lots
+    unit: str
+    higher_is_better: bool = False
+    samples: list = field(default_factory=list)
+
+BENCHMARKS = {}
+
+def benchmark(name, unit='us/op', higher_is_better=False):
+    def register(function):
+        BENCHMARKS[name] = (function, unit, higher_is_better)
+        return function
+    return register
+
+def realistic_states(count, seed=0):
+    # Instantanés de milieu de partie : l'IA joue un nombre aléatoire de pièces,
+    # puis quelques chutes au hasard salissent le plateau (trous, bosses)
+    states = []
+    bot = TetrisAI(lookahead=False)
+    for i in range(count):
+        rng = random.Random(seed + i)
+        engine = TetrisEngine('medium', seed=seed + i)
+        for _ in range(rng.randrange(10, 150)):
+            bot.place(engine)
+        for _ in range(rng.randrange(0, 12)):
+            snapshot = encode_snapshot(engine)
+            for _ in range(rng.randrange(4)):
+                engine.apply_action('rotate')
+            for _ in range(rng.randrange(6)):
+                engine.apply_action(rng.choice(('left', 'right')))
+            engine.apply_action('drop')
+            if engine.game_over:
+                restore_snapshot(engine, snapshot)
+                break
+        states.append(encode_snapshot(engine))
+    return states
+
+def engines_from(states):
+    return [restore_snapshot(TetrisEngine(), state) for state in states]
+
+def _timed(run, ops):
+    # Temps par opération (µs) d'un lot de `ops` opérations
+    start = time.perf_counter()
+    run()
+    return (time.perf_counter() - start) / ops * 1e6
+
+# Chemins critiques du moteur
+
+@benchmark('is_valid_move')
+def bench_is_valid_move(states, batches):
+    # Forme de la pièce courante testée sur toute la largeur, à plusieurs hauteurs
+    calls = [(engine, engine.current_piece.shape, x, y)
+             for engine in engines_from(states)
+             for x in range(-1, GRID_WIDTH)
+             for y in range(0, GRID_HEIGHT, 3)]
+    def run():
+        for engine, shape, x, y in calls:
+            engine.is_valid_move(shape, x, y)
+    return [_timed(run, len(calls)) for _ in range(batches)]
+
+@benchmark('rotate_piece')
+def bench_rotate_piece(states, batches):
+    engines = engines_from(states)
+    def run():
+        for engine in engines:
+            for _ in range(4):
+                engine.rotate_piece()
+            for _ in range(4):
+                engine.rotate_piece(-1)
+    return [_timed(run, 8 * len(engines)) for _ in range(batches)]
+
+@benchmark('place_piece')
+def bench_place_piece(states, batches):
+    # Verrouillage, lignes, pièce suivante et test de fin de partie
+    samples = []
+    for _ in range(batches):
+        engines = engines_from(states)
+        for engine in engines:
+            engine.sonic_drop()
+        def run():
+            for engine in engines:
+                engine.place_piece()
+        samples.append(_timed(run, len(engines)))
+    return samples
+
+@benchmark('clear_lines')
+def bench_clear_lines(states, batches):
+    # Plateaux réalistes dont 1 à 4 lignes du bas sont complétées
+    samples = []
+    for _ in range(batches):
+        engines = engines_from(states)
+        for i, engine in enumerate(engines):
+            for r in range(GRID_HEIGHT - 1 - i % 4, GRID_HEIGHT):
+                engine.board.rows[r] = FULL_ROW
+                engine.board.colors[r] = ['I'] * GRID_WIDTH
+        def run():
+            for engine in engines:
+                engine.clear_lines()
+        samples.append(_timed(run, len(engines)))
+    return samples
+
+@benchmark('new_piece')
+def bench_new_piece(states, batches):
+    engine = TetrisEngine(seed=0)
+    def run():
+        for _ in range(1000):
+            engine.new_piece()
+    return [_timed(run, 1000) for _ in range(batches)]
+
+@benchmark('snapshot_roundtrip')
+def bench_snapshot(states, batches):
+    engines = engines_from(states)
+    def run():
+        for engine in engines:
+            decode_snapshot(encode_snapshot(engine))
+    return [_timed(run, len(engines)) for _ in range(batches)]
+
+# IA et parties complètes
+
+@benchmark('enumerate_placements')
+def bench_enumerate(states, batches):
+    engines = engines_from(states)
+    def run():
+        for engine in engines:
+            piece = engine.current_piece
+            enumerate_placements(engine.board, piece.type, piece.x, piece.y, piece.rotation)
+    return [_timed(run, len(engines)) for _ in range(batches)]
+
+@benchmark('ai_choose_move')
+def bench_choose_move(states, batches):
+    engines = engines_from(states)
+    bot = TetrisAI()
+    def run():
+        for engine in engines:
+            bot.choose_move(engine)
+    return [_timed(run, len(engines)) for _ in range(batches)]
+
+@benchmark('ai_choose_move_table')
+def bench_choose_move_table(states, batches):
+    # Avec table de transposition, vidée à chaque lot : recherches à froid
+    engines = engines_from(states)
+    bot = TetrisAI(table_size=TABLE_SIZE)
+    def run():
+        for engine in engines:
+            bot.choose_move(engine)
+    samples = []
+    for _ in range(batches):
+        bot.table.clear()
+        samples.append(_timed(run, len(engines)))
+    return samples
+
+SEARCH_STATES = 5  # plateaux de la recherche à trois pièces (~150 ms chacun)
+
+def _search_times(states, batches, subtrees):
+    # Recherche à trois pièces de tetris_search sur place, sans pool, avec ou
+    # sans le cache des nœuds de profondeur 1
+    searches = []
+    for engine in engines_from(states[:SEARCH_STATES]):
+        rows = engine.board.rows
+        piece = engine.current_piece
+        roots = [(i, p.x, p.y, p.rotation)
+                 for i, p in enumerate(enumerate_placements(engine.board, piece.type, piece.x,
+                                                            piece.y, piece.rotation))
+                 if apply_placement(rows, p)[0] is not None]
+        searches.append((_ROWS.pack(*rows), piece.type, roots,
+                         [engine.next_piece.type, engine.previews[0]]))
+    samples = []
+    for _ in range(batches):
+        init_worker(TetrisAI().heuristic, 0, subtrees)
+        def run():
+            for snapshot, piece_type, roots, pieces in searches:
+                search_roots(snapshot, piece_type, roots, pieces, float('inf'))
+        samples.append(_timed(run, len(searches)) / 1000)
+    return samples
+
+@benchmark('search_depth3', unit='ms/move')
+def bench_search(states, batches):
+    return _search_times(states, batches, True)
+
+@benchmark('search_depth3_nocache', unit='ms/move')
+def bench_search_nocache(states, batches):
+    return _search_times(states, batches, False)
+
+@benchmark('game_pieces_per_sec', unit='pieces/s', higher_is_better=True)
+def bench_game(states, batches):
+    config = SelfPlayConfig(max_pieces=200)
+    engine = TetrisEngine(config.difficulty, bag=config.bag)
+    bot = config.make_bot()
+    samples = []
+    for seed in range(batches):
+        result = play_game(engine, bot, seed, config.max_pieces)
+        samples.append(result.pieces / result.elapsed)
+    return samples
+
+# Affichage
+
+def _frame_times(full_redraw, frames):
+    game = tetris_game.Tetris('medium')
+    game.on_event = lambda name: None
+    game.pieces.seed(0)
+    game.reset_game()
+    game.ai = TetrisAI(lookahead=False)
+    game.ui.draw()
+    samples = []
+    for frame in range(frames):
+        game.simulate_step()
+        if game.game_over:
+            game.reset_game()
+        if full_redraw:
+            game.ui.invalidate()
+        start = time.perf_counter()
+        game.ui.draw((frame % 4) * game.timestep.dt / 4)
+        samples.append((time.perf_counter() - start) * 1e6)
+    return samples
+
+@benchmark('frame_draw', unit='us/frame')
+def bench_frame(states, batches):
+    # Frame typique : rendu incrémental par rectangles sales
+    return _frame_times(False, 60 * batches)
+
+@benchmark('frame_draw_full', unit='us/frame')
+def bench_frame_full(states, batches):
+    return _frame_times(True, 20 * batches)
+
+def percentile(samples, p):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))]
+
+def run_benchmarks(names=None, states=40, batches=10, seed=0):
+    results = {}
+    state_list = realistic_states(states, seed)
+    for name, (function, unit, higher_is_better) in BENCHMARKS.items():
+        if names and name not in names:
+            continue
+        if name.startswith('frame') and tetris_game is None:
+            print(f"{name} : ignoré (pygame indisponible)")
+            continue
+        samples = function(state_list, batches)
+        result = BenchResult(name, statistics.median(samples), unit, higher_is_better,
+                             [round(sample, 3) for sample in samples])
+        results[name] = result
+        print(f"{name:<22} {result.value:>12.2f} {unit:<9} "
+              f"(p95 {percentile(samples, 95):.2f}, min {min(samples):.2f})")
+    return results
+
+def compare(results, baseline, threshold=DEFAULT_THRESHOLD):
+    # Liste des (nom, référence, mesure, variation) au-delà du seuil
+    regressions = []
+    for name, result in results.items():
+        reference = baseline.get(name)
+        if not reference or not reference['value']:
+            continue
+        change = result.value / reference['value'] - 1
+        if result.higher_is_better:
+            change = -change
+        if change > threshold:
+            regressions.append((name, reference['value'], result.value, change))
+    return regressions
+
+def save_results(results, file_path):
+    with open(file_path, 'w') as f:
+        json.dump({name: asdict(result) for name, result in results.items()}, f, indent=4)
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks du moteur, de l\'IA et du rendu')
+    parser.add_argument('names', nargs='*', help=f"benchmarks à lancer (défaut : tous) : {', '.join(BENCHMARKS)}")
+    parser.add_argument('--states', type=int, default=40, help='plateaux réalistes générés')
+    parser.add_argument('--batches', type=int, default=10, help='lots mesurés par benchmark')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default=RESULTS_FILE)
+    parser.add_argument('--baseline', default=BASELINE_FILE)
+    parser.add_argument('--save-baseline', action='store_true',
+                        help='enregistrer ces résultats comme nouvelle référence')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD)
+    args = parser.parse_args()
+
+    unknown = set(args.names) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"benchmarks inconnus : {', '.join(sorted(unknown))}")
+    results = run_benchmarks(args.names, args.states, args.batches, args.seed)
+    save_results(results, args.output)
+    print(f"Résultats écrits dans {args.output}")
+
+    if args.save_baseline:
+        save_results(results, args.baseline)
+        print(f"Référence enregistrée dans {args.baseline}")
+        return
+    if not os.path.exists(args.baseline):
+        print(f"Pas de référence ({args.baseline}) : comparaison ignorée")
+        return
+    with open(args.baseline, 'r') as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.threshold)
+    for name, reference, value, change in regressions:
+        print(f"RÉGRESSION {name} : {reference:.2f} -> {value:.2f} ({change:+.0%})")
+    if regressions:
+        sys.exit(1)
+    print(f"Aucune régression au-delà de {args.threshold:.0%}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,310 @@
+import argparse
+import mmap
+import os
+import struct
+import sys
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from itertools import product
+
+from tetris_engine import (DIFFICULTIES, GRID_HEIGHT, GRID_WIDTH, KICKS, PIECE_TYPES, ROTATIONS,
+                           X_MARGIN, Board, TetrisEngine, spawn_piece)
+from tetris_ai import Heuristic, Placement, TetrisAI, load_weights
+from tetris_save import write_atomic
+
+# Livre d'ouvertures : coups précalculés pour les plateaux bas et sans trou,
+# ceux du début de partie et d'après les gros effacements. Sans trou, le
+# plateau est entièrement décrit par son relief (la colonne la plus basse est
+# vide, les lignes pleines étant effacées) ; la clé est faite des écarts de
+# hauteur entre colonnes voisines, bornés à ±BOOK_CAP, et des types de la
+# pièce courante et de la suivante. Le livre est construit hors ligne sur tous
+# les reliefs dans ces bornes, qui suffisent à rendre leur nombre raisonnable ;
+# au-delà, l'IA fait sa recherche habituelle.
+#
+# Le fichier est une table de hachage à adressage ouvert (sondage linéaire)
+# projetée en mémoire : rien n'est lu à l'ouverture, une recherche touche une
+# ou deux cases. Le coup du livre est rejoué sur le vrai plateau (rotations
+# avec wall kicks, décalages, chute) avant d'être rendu.
+#
+# Format (petit-boutiste) :
+#   en-tête    'TBK1', version, plafond, hauteur max, nombre de cases (puissance
+#              de 2), nombre d'entrées
+#   clés       une clé sur 64 bits par case (0 : case vide), petit-boutiste
+#              quelle que soit la machine
+#   coups      un octet par case : rotation << 5 | (x + X_MARGIN)
+
+BOOK_FILE = 'opening_book.bin'
+BOOK_VERSION = 1
+BOOK_CAP = 1  # écart de hauteur maximal entre colonnes voisines
+BOOK_MAX_HEIGHT = 4  # 17 479 reliefs, soit 856 471 positions
+
+_HEADER = struct.Struct('<4sBBBxII')
+_KEY = struct.Struct('<Q')
+_MAGIC = b'TBK1'
+_TYPE_CODES = {piece_type: i for i, piece_type in enumerate(PIECE_TYPES)}
+_FIBONACCI = 0x9E3779B97F4A7C15
+_U64 = (1 << 64) - 1
+
+def book_key(board, piece_type, next_type, cap=BOOK_CAP, max_height=BOOK_MAX_HEIGHT):
+    # Clé du plateau pour le livre, ou None s'il est trop haut, trop accidenté
+    # ou a un trou
+    heights = board.heights
+    if max(heights) > max_height:
+        return None
+    if sum(heights) != sum(row.bit_count() for row in board.rows):
+        return None  # une case vide sous le relief
+    base = 2 * cap + 1
+    key = 0
+    previous = heights[0]
+    for height in heights[1:]:
+        delta = height - previous
+        if not -cap <= delta <= cap:
+            return None  # relief trop accidenté pour le livre
+        key = key * base + delta + cap
+        previous = height
+    return (key * len(PIECE_TYPES) + _TYPE_CODES[piece_type]) * len(PIECE_TYPES) + \
+        _TYPE_CODES[next_type] + 1
+
+def book_path(board, piece, x, rotation):
+    # Pose obtenue depuis la pièce courante par rotations (wall kicks comme
+    # TetrisEngine.rotate_piece), décalages puis chute ; None si un mouvement bloque
+    orientations = ROTATIONS[piece.type]
+    fits = board.fits
+    px, py, current = piece.x, piece.y, piece.rotation
+    if not fits(orientations[current], px, py):
+        return None
+    actions = []
+    turns = (rotation - current) % 4
+    direction = -1 if turns == 3 else 1
+    for _ in range(1 if turns == 3 else turns):
+        target = (current + direction) % 4
+        for dx, dy in KICKS[piece.type][current][0 if direction > 0 else 1]:
+            if fits(orientations[target], px + dx, py + dy):
+                px, py, current = px + dx, py + dy, target
+                break
+        else:
+            return None
+        actions.append('rotate' if direction > 0 else 'rotate_ccw')
+    orientation = orientations[current]
+    step = 1 if x > px else -1
+    while px != x:
+        if not fits(orientation, px + step, py):
+            return None
+        px += step
+        actions.append('right' if step > 0 else 'left')
+    return Placement(piece.type, px, board.drop_row(orientation, px, py), current, tuple(actions))
+
+class OpeningBook:
+    def __init__(self, path=BOOK_FILE):
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, version, self.cap, self.max_height, slots, self.entries = \
+                _HEADER.unpack_from(self._mm, 0)
+            if magic != _MAGIC or version != BOOK_VERSION:
+                raise ValueError(f"{path} n'est pas un livre d'ouvertures (version {BOOK_VERSION})")
+            if slots & (slots - 1) or len(self._mm) != _HEADER.size + 9 * slots:
+                raise ValueError(f"{path} : taille incohérente")
+        except Exception:
+            self._file.close()
+            raise
+        self.moves = memoryview(self._mm)[_HEADER.size + 8 * slots:]
+        self.mask = slots - 1
+        self.shift = 64 - (slots.bit_length() - 1)
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return self.entries
+
+    def close(self):
+        self.moves.release()
+        self._mm.close()
+        self._file.close()
+
+    def get(self, key):
+        # Coup (rotation, x) rangé sous `key`, ou None
+        read = _KEY.unpack_from
+        mm = self._mm
+        i = ((key * _FIBONACCI) & _U64) >> self.shift
+        while True:
+            stored, = read(mm, _HEADER.size + 8 * i)
+            if stored == key:
+                move = self.moves[i]
+                return move >> 5, (move & 31) - X_MARGIN
+            if not stored:
+                return None
+            i = (i + 1) & self.mask
+
+    def lookup(self, engine):
+        # Pose du livre pour la position de `engine`, jouable telle quelle, ou None
+        board = engine.board
+        piece = engine.current_piece
+        key = book_key(board, piece.type, engine.next_piece.type, self.cap, self.max_height)
+        move = None if key is None else self.get(key)
+        if move is None:
+            self.misses += 1
+            return None
+        rotation, x = move
+        placement = book_path(board, piece, x, rotation)
+        if placement is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return placement
+
+def write_book(entries, path=BOOK_FILE, cap=BOOK_CAP, max_height=BOOK_MAX_HEIGHT):
+    # entries : {clé: (rotation, x)} ; table remplie au plus à moitié
+    slots = 16
+    while slots < 2 * len(entries):
+        slots *= 2
+    shift = 64 - (slots.bit_length() - 1)
+    keys = array('Q', bytes(8 * slots))
+    moves = bytearray(slots)
+    for key, (rotation, x) in entries.items():
+        i = ((key * _FIBONACCI) & _U64) >> shift
+        while keys[i]:
+            i = (i + 1) & (slots - 1)
+        keys[i] = key
+        moves[i] = rotation << 5 | (x + X_MARGIN)
+    if sys.byteorder == 'big':
+        keys.byteswap()
+    header = _HEADER.pack(_MAGIC, BOOK_VERSION, cap, max_height, slots, len(entries))
+    write_atomic(path, header + keys.tobytes() + bytes(moves))
+    return slots
+
+def skyline_profiles(cap=BOOK_CAP, max_height=BOOK_MAX_HEIGHT):
+    # Tous les reliefs couverts par le livre : écarts dans ±cap, colonne la plus
+    # basse vide, hauteur au plus max_height
+    profiles = []
+    for deltas in product(range(-cap, cap + 1), repeat=GRID_WIDTH - 1):
+        heights = [0]
+        for delta in deltas:
+            heights.append(heights[-1] + delta)
+        low = min(heights)
+        if max(heights) - low <= max_height:
+            profiles.append([height - low for height in heights])
+    return profiles
+
+def profile_rows(heights):
+    # Bitboard sans trou de relief `heights`
+    return [sum(1 << j for j, height in enumerate(heights) if height >= GRID_HEIGHT - r)
+            for r in range(GRID_HEIGHT)]
+
+# État propre à chaque processus de construction
+_worker = {}
+
+def init_worker(weights):
+    _worker['bot'] = TetrisAI(Heuristic(weights))
+    _worker['engine'] = TetrisEngine()
+
+def solve_profiles(profiles, cap=BOOK_CAP, max_height=BOOK_MAX_HEIGHT):
+    # Exécuté dans un processus de construction : coup de l'IA (recherche avec
+    # la pièce suivante) pour chaque relief et chaque paire de pièces, gardé
+    # s'il se rejoue par le chemin simple du livre
+    bot = _worker['bot']
+    engine = _worker['engine']
+    entries = {}
+    for heights in profiles:
+        engine.board = Board.from_rows(profile_rows(heights))
+        for piece_type in PIECE_TYPES:
+            for next_type in PIECE_TYPES:
+                engine.current_piece = piece = spawn_piece(piece_type)
+                engine.next_piece = spawn_piece(next_type)
+                placement = bot.choose_move(engine)
+                if placement is None or \
+                        book_path(engine.board, piece, placement.x, placement.rotation) is None:
+                    continue
+                key = book_key(engine.board, piece_type, next_type, cap, max_height)
+                entries[key] = (placement.rotation, placement.x)
+    return entries
+
+def build_book(cap=BOOK_CAP, max_height=BOOK_MAX_HEIGHT, weights=None, workers=None,
+               chunk_size=64):
+    # Hors ligne, sur tous les cœurs : les reliefs sont répartis par lots
+    profiles = skyline_profiles(cap, max_height)
+    chunks = [profiles[i:i + chunk_size] for i in range(0, len(profiles), chunk_size)]
+    entries = {}
+    done = 0
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count(), initializer=init_worker,
+                             initargs=(weights or load_weights(),)) as pool:
+        futures = [pool.submit(solve_profiles, chunk, cap, max_height) for chunk in chunks]
+        for future in as_completed(futures):
+            entries.update(future.result())
+            done += 1
+            if done % 20 == 0 or done == len(chunks):
+                print(f"{done}/{len(chunks)} lots, {len(entries)} positions")
+    return entries, len(profiles)
+
+# Livre partagé par tout le processus, ouvert au premier usage
+_BOOKS = {}
+
+def load_book(path=BOOK_FILE):
+    # OpeningBook, ou None si le fichier manque ou est illisible
+    if path not in _BOOKS:
+        book = None
+        if os.path.exists(path):
+            try:
+                book = OpeningBook(path)
+            except (OSError, ValueError) as e:
+                print(f"Erreur lors du chargement du livre d'ouvertures : {e}")
+        _BOOKS[path] = book
+    return _BOOKS[path]
+
+def benchmark(book, games, seed, difficulty='hard', max_pieces=500):
+    # Parties IA : part des coups servis par le livre et temps d'une
+    # consultation comparé à une recherche
+    bot = TetrisAI(Heuristic(load_weights()))
+    lookups = searches = 0
+    lookup_time = search_time = 0.0
+    for game in range(games):
+        engine = TetrisEngine(difficulty, seed=seed + game)
+        while not engine.game_over and engine.pieces_placed < max_pieces:
+            start = time.perf_counter()
+            placement = book.lookup(engine)
+            lookup_time += time.perf_counter() - start
+            lookups += 1
+            if placement is None:
+                start = time.perf_counter()
+                placement = bot.choose_move(engine)
+                search_time += time.perf_counter() - start
+                searches += 1
+            if placement is not None:
+                for action in placement.actions:
+                    engine.apply_action(action)
+            engine.apply_action('drop')
+    print(f"{lookups} coups : {book.hits} depuis le livre ({book.hits / max(lookups, 1):.0%}), "
+          f"consultation {lookup_time / max(lookups, 1) * 1e6:.1f} µs, "
+          f"recherche {search_time / max(searches, 1) * 1000:.2f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description="Livre d'ouvertures de l'IA")
+    parser.add_argument('command', choices=('build', 'bench'))
+    parser.add_argument('--book', default=BOOK_FILE)
+    parser.add_argument('--cap', type=int, default=BOOK_CAP, help='écart de hauteur maximal (build)')
+    parser.add_argument('--max-height', type=int, default=BOOK_MAX_HEIGHT,
+                        help='hauteur maximale du relief (build)')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--games', type=int, default=20, help='parties jouées (bench)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--difficulty', choices=sorted(DIFFICULTIES), default='hard')
+    parser.add_argument('--max-pieces', type=int, default=500)
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        start = time.perf_counter()
+        entries, profiles = build_book(args.cap, args.max_height, workers=args.workers)
+        slots = write_book(entries, args.book, args.cap, args.max_height)
+        print(f"{profiles} reliefs, {len(entries)} positions en {time.perf_counter() - start:.0f} s ; "
+              f"{args.book} : {slots} cases, {os.path.getsize(args.book)} octets")
+    else:
+        book = OpeningBook(args.book)
+        print(f"{args.book} : {len(book)} positions, écarts ±{book.cap}, "
+              f"hauteur max {book.max_height}")
+        benchmark(book, args.games, args.seed, args.difficulty, args.max_pieces)
+        book.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,279 @@
+import argparse
+import bisect
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from tetris_engine import DIFFICULTIES, GRID_HEIGHT, GRID_WIDTH, PIECE_TYPES
+from tetris_save import write_atomic
+from tetris_selfplay import (DEFAULT_MAX_PIECES, SelfPlayConfig, init_worker, play_game,
+                             worker_state)
+
+# Données d'apprentissage tirées des parties : une entrée par pose (joueur ou
+# IA), relevée par TetrisEngine.place_listener. Chaque entrée a une taille
+# fixe : plateau d'avant la pose sur 200 bits (25 octets), pièces, pose
+# choisie, lignes et points gagnés. Les entrées sont écrites à la suite dans
+# des fragments .npy de SHARD_RECORDS entrées, projetés en mémoire ; un
+# fragment plein est fermé et le suivant ouvert. `index.json` liste les
+# fragments terminés et leur nombre d'entrées : un lecteur y accède par
+# np.load(mmap_mode='r'), sans copie (ShardDataset). Un fragment resté hors
+# de l'index (session interrompue) n'est jamais écrasé : le suivant prend un
+# autre nom.
+#
+# En self-play, chaque processus de travail joue ses parties et renvoie un
+# tableau d'entrées par lot ; le processus principal ne fait que les recopier
+# dans le fragment courant.
+
+SHARD_RECORDS = 1 << 20  # ~42 Mo par fragment
+GAME_SHARD_RECORDS = 1 << 12  # ~170 Ko : fragment d'une session de jeu
+INDEX_FILE = 'index.json'
+DATASET_FOLDER = 'dataset'
+BOARD_BYTES = (GRID_HEIGHT * GRID_WIDTH + 7) // 8
+
+RECORD_DTYPE = np.dtype([
+    ('board', np.uint8, (BOARD_BYTES,)),  # ligne par ligne, colonne 0 en premier (np.packbits)
+    ('piece', np.uint8),  # indice dans PIECE_TYPES
+    ('next', np.uint8),
+    ('x', np.int8),  # pose choisie (position de verrouillage)
+    ('y', np.int8),
+    ('rotation', np.uint8),
+    ('lines', np.uint8),  # lignes effacées par la pose
+    ('game_over', np.uint8),
+    ('score', np.uint32),  # points gagnés par la pose
+    ('game', np.uint32),  # graine ou identifiant de la partie
+    ('move', np.uint16)  # numéro de la pose dans la partie
+])
+_DTYPE_DESCR = str(RECORD_DTYPE.descr)  # vérifié à la réouverture d'un dossier
+_META_FIELDS = ('game', 'move', 'piece', 'next', 'x', 'y', 'rotation', 'lines', 'game_over',
+                'score')
+_TYPE_CODES = {piece_type: i for i, piece_type in enumerate(PIECE_TYPES)}
+_COLUMN_BITS = np.arange(GRID_WIDTH, dtype=np.uint16)
+
+def pack_records(rows, meta):
+    # rows : bitboards (listes de GRID_HEIGHT entiers) ; meta : tuples dans l'ordre _META_FIELDS
+    records = np.zeros(len(rows), RECORD_DTYPE)
+    if not len(records):
+        return records
+    bits = (np.array(rows, dtype=np.uint16)[:, :, None] >> _COLUMN_BITS) & 1
+    records['board'] = np.packbits(bits.astype(np.uint8).reshape(len(rows), -1), axis=1)
+    columns = np.array(meta, dtype=np.int64)
+    for i, name in enumerate(_META_FIELDS):
+        records[name] = columns[:, i]
+    return records
+
+def unpack_boards(records):
+    # Plateaux (N, 20, 10) de booléens, case [ligne, colonne]
+    bits = np.unpackbits(records['board'], axis=-1, count=GRID_HEIGHT * GRID_WIDTH)
+    return bits.reshape(records.shape + (GRID_HEIGHT, GRID_WIDTH)).astype(bool)
+
+class PlacementTap:
+    # TetrisEngine.place_listener : garde les poses en listes Python (quelques
+    # µs par pose) et ne les convertit en tableau qu'à la demande
+    def __init__(self, game=0):
+        self.game = game
+        self._rows = []
+        self._meta = []
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __call__(self, engine, rows, piece, next_type, score_before, lines):
+        self._rows.append(rows)
+        self._meta.append((self.game, engine.pieces_placed - 1, _TYPE_CODES[piece.type],
+                           _TYPE_CODES[next_type], piece.x, piece.y, piece.rotation, lines,
+                           engine.game_over, engine.score - score_before))
+
+    def drain(self):
+        # Tableau des poses relevées depuis le dernier appel
+        records = pack_records(self._rows, self._meta)
+        self._rows, self._meta = [], []
+        return records
+
+class ShardWriter:
+    # Écriture en flux dans des fragments projetés en mémoire. Un dossier
+    # existant est complété : les nouveaux fragments suivent les anciens.
+    def __init__(self, folder=DATASET_FOLDER, shard_records=SHARD_RECORDS):
+        os.makedirs(folder, exist_ok=True)
+        self.folder = folder
+        self.shard_records = shard_records
+        self.index_path = os.path.join(folder, INDEX_FILE)
+        self.shards = []
+        if os.path.exists(self.index_path):
+            with open(self.index_path, 'r') as f:
+                index = json.load(f)
+            if index['dtype'] != _DTYPE_DESCR:
+                raise ValueError(f"{folder} : format d'entrée différent ({index['dtype']})")
+            self.shards = index['shards']
+        self.records = sum(shard['count'] for shard in self.shards)
+        self._shard = None
+        self._count = 0
+
+    def write(self, records):
+        # Recopie par tranches dans le fragment courant ; renvoie le nombre d'entrées
+        offset = 0
+        while offset < len(records):
+            if self._shard is None:
+                self._open_shard()
+            count = min(len(records) - offset, self.shard_records - self._count)
+            self._shard[self._count:self._count + count] = records[offset:offset + count]
+            self._count += count
+            offset += count
+            if self._count == self.shard_records:
+                self._close_shard()
+        self.records += len(records)
+        return len(records)
+
+    def _open_shard(self):
+        number = len(self.shards)
+        while os.path.exists(os.path.join(self.folder, f'shard-{number:05d}.npy')):
+            number += 1
+        name = f'shard-{number:05d}.npy'
+        self._name = name
+        self._shard = np.lib.format.open_memmap(os.path.join(self.folder, name), mode='w+',
+                                                dtype=RECORD_DTYPE, shape=(self.shard_records,))
+        self._count = 0
+
+    def _close_shard(self):
+        path = os.path.join(self.folder, self._name)
+        if self._count < self.shard_records:
+            # Dernier fragment incomplet : réécrit à sa taille réelle (une seule copie)
+            tmp_path = path + '.tmp'
+            with open(tmp_path, 'wb') as f:
+                np.lib.format.write_array(f, np.asarray(self._shard[:self._count]))
+            del self._shard
+            os.replace(tmp_path, path)
+        else:
+            self._shard.flush()
+            del self._shard
+        self._shard = None
+        self.shards.append({'file': self._name, 'count': self._count})
+        self._write_index()
+
+    def _write_index(self):
+        write_atomic(self.index_path, json.dumps({
+            'dtype': _DTYPE_DESCR,
+            'record_size': RECORD_DTYPE.itemsize,
+            'shard_records': self.shard_records,
+            'records': sum(shard['count'] for shard in self.shards),
+            'shards': self.shards
+        }, indent=1))
+
+    def close(self):
+        if self._shard is not None:
+            if self._count:
+                self._close_shard()
+            else:
+                del self._shard
+                self._shard = None
+                os.remove(os.path.join(self.folder, self._name))
+
+class ShardDataset:
+    # Lecture aléatoire des entrées de tous les fragments de l'index ; chaque
+    # fragment n'est projeté en mémoire qu'au premier accès
+    def __init__(self, folder=DATASET_FOLDER):
+        with open(os.path.join(folder, INDEX_FILE), 'r') as f:
+            index = json.load(f)
+        if index['dtype'] != _DTYPE_DESCR:
+            raise ValueError(f"{folder} : format d'entrée différent ({index['dtype']})")
+        self.folder = folder
+        self.files = [shard['file'] for shard in index['shards']]
+        self.starts = [0]
+        for shard in index['shards']:
+            self.starts.append(self.starts[-1] + shard['count'])
+        self._shards = [None] * len(self.files)
+
+    def __len__(self):
+        return self.starts[-1]
+
+    def shard(self, i):
+        array = self._shards[i]
+        if array is None:
+            array = self._shards[i] = np.load(os.path.join(self.folder, self.files[i]),
+                                              mmap_mode='r')
+        return array
+
+    def __getitem__(self, index):
+        # Une entrée (vue sur le fichier, sans copie)
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        i = bisect.bisect_right(self.starts, index) - 1
+        return self.shard(i)[index - self.starts[i]]
+
+    def batch(self, indices):
+        # Entrées d'indices quelconques, regroupées par fragment (copie)
+        indices = np.asarray(indices)
+        out = np.empty(len(indices), RECORD_DTYPE)
+        shard_ids = np.searchsorted(self.starts, indices, side='right') - 1
+        for i in np.unique(shard_ids):
+            mask = shard_ids == i
+            out[mask] = self.shard(i)[indices[mask] - self.starts[i]]
+        return out
+
+def record_batch(seeds, config=None):
+    # Exécuté dans un processus de travail (tetris_selfplay.init_worker) :
+    # parties complètes, renvoyées en un seul tableau d'entrées
+    config, engine, bot = worker_state(config)
+    tap = PlacementTap()
+    engine.place_listener = tap
+    try:
+        for seed in seeds:
+            tap.game = seed
+            play_game(engine, bot, seed, config.max_pieces)
+    finally:
+        engine.place_listener = None
+    return tap.drain()
+
+def stream_records(seeds, config=None, workers=None, batch_size=4):
+    # Générateur : tableaux d'entrées par lot de parties, dans l'ordre où ils terminent
+    config = config or SelfPlayConfig()
+    seeds = list(seeds)
+    batches = [seeds[i:i + batch_size] for i in range(0, len(seeds), batch_size)]
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count(),
+                             initializer=init_worker, initargs=(config,)) as pool:
+        futures = [pool.submit(record_batch, batch) for batch in batches]
+        for future in as_completed(futures):
+            yield future.result()
+
+def export(records_stream, writer):
+    # Consomme un flux de tableaux d'entrées ; renvoie (entrées, temps d'écriture)
+    count = 0
+    writing = 0.0
+    for records in records_stream:
+        start = time.perf_counter()
+        count += writer.write(records)
+        writing += time.perf_counter() - start
+    start = time.perf_counter()
+    writer.close()
+    writing += time.perf_counter() - start
+    return count, writing
+
+def main():
+    parser = argparse.ArgumentParser(description="Export de parties IA en données d'apprentissage")
+    parser.add_argument('--out', default=DATASET_FOLDER)
+    parser.add_argument('--games', type=int, default=100)
+    parser.add_argument('--seed', type=int, default=0, help='graine de la première partie')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--batch-size', type=int, default=4)
+    parser.add_argument('--difficulty', choices=sorted(DIFFICULTIES), default='hard')
+    parser.add_argument('--max-pieces', type=int, default=DEFAULT_MAX_PIECES)
+    parser.add_argument('--shard-records', type=int, default=SHARD_RECORDS)
+    args = parser.parse_args()
+
+    config = SelfPlayConfig(difficulty=args.difficulty, max_pieces=args.max_pieces)
+    writer = ShardWriter(args.out, args.shard_records)
+    start = time.perf_counter()
+    seeds = range(args.seed, args.seed + args.games)
+    count, writing = export(stream_records(seeds, config, args.workers, args.batch_size), writer)
+    elapsed = time.perf_counter() - start
+    print(f"{count} poses de {args.games} parties en {elapsed:.1f} s ({count / elapsed:.0f}/s) ; "
+          f"écriture {writing:.3f} s ({writing / elapsed:.2%} du temps, "
+          f"{count / max(writing, 1e-9):.0f} entrées/s) ; "
+          f"{len(writer.shards)} fragments, {writer.records} entrées dans {args.out}")
+
+if __name__ == '__main__':
+    main()
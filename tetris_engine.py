@@ -0,0 +1,578 @@
+import random
+from collections import deque
+from dataclasses import dataclass
+from typing import Tuple
+
+# Moteur de jeu sans pygame : les règles seules, utilisables par les bots,
+# les serveurs et les tests sans écran ni carte son.
+
+# Game Constants
+GRID_WIDTH = 10
+GRID_HEIGHT = 20
+
+# Piece Shapes
+SHAPES = {
+    'I': [[1, 1, 1, 1]],
+    'O': [[1, 1], [1, 1]],
+    'T': [[0, 1, 0], [1, 1, 1]],
+    'S': [[0, 1, 1], [1, 1, 0]],
+    'Z': [[1, 1, 0], [0, 1, 1]],
+    'J': [[1, 0, 0], [1, 1, 1]],
+    'L': [[0, 0, 1], [1, 1, 1]]
+}
+
+# Difficulty Levels
+DIFFICULTIES = {
+    'easy': {'fall_speed': 0.7, 'speed_increase': 0.3},
+    'medium': {'fall_speed': 0.4, 'speed_increase': 0.35},
+    'hard': {'fall_speed': 0.1, 'speed_increase': 0.45}
+}
+
+# Ordre fixe des pièces : l'index sert de code sur un octet dans les séquences
+PIECE_TYPES = tuple(SHAPES)
+
+# Nombre d'aperçus tenus prêts au-delà de `next_piece`
+DEFAULT_PREVIEWS = 5
+
+# Une ligne du bitboard est pleine quand ses 10 bits sont à 1 (0x3FF)
+FULL_ROW = (1 << GRID_WIDTH) - 1
+
+# Actions acceptées par TetrisEngine.apply_action / step
+ACTIONS = ('left', 'right', 'down', 'rotate', 'rotate_ccw', 'sonic_drop', 'drop')
+
+# Marge (en colonnes) des tables de masques précalculés de chaque côté de la grille
+X_MARGIN = GRID_WIDTH
+
+def shape_masks(shape) -> Tuple[int, ...]:
+    # Une forme en masques de lignes : bit j = colonne j de la forme
+    return tuple(sum(1 << j for j, cell in enumerate(row) if cell) for row in shape)
+
+def place_masks(masks, x):
+    # Masques décalés à la colonne x, en (ligne, masque) pour les lignes non vides ;
+    # None si la forme sort de la grille
+    placed = []
+    for i, mask in enumerate(masks):
+        if not mask:
+            continue
+        if x >= 0:
+            mask <<= x
+            if mask > FULL_ROW:  # sort par la droite
+                return None
+        else:
+            if mask & ((1 << -x) - 1):  # sort par la gauche
+                return None
+            mask >>= -x
+        placed.append((i, mask))
+    return tuple(placed)
+
+@dataclass(frozen=True)
+class Orientation:
+    shape: Tuple[Tuple[int, ...], ...]
+    cells: Tuple[Tuple[int, int], ...]  # (dx, dy) des cases occupées
+    masks: Tuple[int, ...]
+    placed: tuple  # place_masks(masks, x) pour x dans [-X_MARGIN, GRID_WIDTH + X_MARGIN)
+    bottom: Tuple[Tuple[int, int], ...]  # (dx, dy de la case la plus basse) par colonne occupée
+
+def _build_orientations(shape):
+    # Chaque forme est placée dans sa boîte SRS (4x4 pour I, 2x2 pour O, 3x3 sinon)
+    # puis tournée dans le sens horaire : états 0, R, 2, L
+    size = max(len(shape[0]), len(shape))
+    box = [[0] * size for _ in range(size)]
+    top = 1 if size == 4 else 0  # la barre I occupe la 2e ligne de sa boîte
+    for i, row in enumerate(shape):
+        for j, cell in enumerate(row):
+            box[top + i][j] = cell
+    orientations = []
+    for _ in range(4):
+        box_shape = tuple(tuple(row) for row in box)
+        masks = shape_masks(box_shape)
+        orientations.append(Orientation(
+            shape=box_shape,
+            cells=tuple((j, i) for i, row in enumerate(box_shape)
+                        for j, cell in enumerate(row) if cell),
+            masks=masks,
+            placed=tuple(place_masks(masks, x)
+                         for x in range(-X_MARGIN, GRID_WIDTH + X_MARGIN)),
+            bottom=tuple((j, max(i for i in range(size) if box_shape[i][j]))
+                         for j in range(size) if any(row[j] for row in box_shape))
+        ))
+        box = [list(row) for row in zip(*box[::-1])]
+    return tuple(orientations)
+
+# Toutes les orientations de chaque pièce, calculées une seule fois à l'import
+ROTATIONS = {piece_type: _build_orientations(shape) for piece_type, shape in SHAPES.items()}
+
+# Position d'apparition : même colonne que l'ancien `new_piece`, la pièce collée en haut
+SPAWN_X = {piece_type: GRID_WIDTH // 2 - len(ROTATIONS[piece_type][0].shape) // 2
+           for piece_type in SHAPES}
+SPAWN_Y = {piece_type: -min(dy for _, dy in ROTATIONS[piece_type][0].cells)
+           for piece_type in SHAPES}
+
+# Wall kicks SRS, en (dx, dy) avec y vers le bas, pour chaque rotation de départ :
+# [sens horaire, sens anti-horaire]
+_KICKS_JLSTZ = (
+    (((0, 0), (-1, 0), (-1, -1), (0, 2), (-1, 2)),    # 0 -> R
+     ((0, 0), (1, 0), (1, -1), (0, 2), (1, 2))),      # 0 -> L
+    (((0, 0), (1, 0), (1, 1), (0, -2), (1, -2)),      # R -> 2
+     ((0, 0), (1, 0), (1, 1), (0, -2), (1, -2))),     # R -> 0
+    (((0, 0), (1, 0), (1, -1), (0, 2), (1, 2)),       # 2 -> L
+     ((0, 0), (-1, 0), (-1, -1), (0, 2), (-1, 2))),   # 2 -> R
+    (((0, 0), (-1, 0), (-1, 1), (0, -2), (-1, -2)),   # L -> 0
+     ((0, 0), (-1, 0), (-1, 1), (0, -2), (-1, -2))),  # L -> 2
+)
+_KICKS_I = (
+    (((0, 0), (-2, 0), (1, 0), (-2, 1), (1, -2)),     # 0 -> R
+     ((0, 0), (-1, 0), (2, 0), (-1, -2), (2, 1))),    # 0 -> L
+    (((0, 0), (-1, 0), (2, 0), (-1, -2), (2, 1)),     # R -> 2
+     ((0, 0), (2, 0), (-1, 0), (2, -1), (-1, 2))),    # R -> 0
+    (((0, 0), (2, 0), (-1, 0), (2, -1), (-1, 2)),     # 2 -> L
+     ((0, 0), (1, 0), (-2, 0), (1, 2), (-2, -1))),    # 2 -> R
+    (((0, 0), (1, 0), (-2, 0), (1, 2), (-2, -1)),     # L -> 0
+     ((0, 0), (-2, 0), (1, 0), (-2, 1), (1, -2))),    # L -> 2
+)
+_KICKS_O = ((((0, 0),), ((0, 0),)),) * 4
+KICKS = {piece_type: _KICKS_I if piece_type == 'I' else
+         _KICKS_O if piece_type == 'O' else _KICKS_JLSTZ
+         for piece_type in SHAPES}
+
+@dataclass
+class Piece:
+    type: str
+    x: int
+    y: int
+    rotation: int = 0
+
+    @property
+    def orientation(self) -> Orientation:
+        return ROTATIONS[self.type][self.rotation]
+
+    @property
+    def shape(self):
+        return ROTATIONS[self.type][self.rotation].shape
+
+def spawn_piece(piece_type) -> Piece:
+    return Piece(type=piece_type, x=SPAWN_X[piece_type], y=SPAWN_Y[piece_type])
+
+# Hash de Zobrist du bitboard : une clé aléatoire par (ligne, contenu de la
+# ligne), le hash d'un plateau est le XOR des clés de ses lignes (ligne vide : 0).
+# Tenu à jour par Board.lock et Board.clear_full_rows ; sert de clé au cache de l'IA.
+_zobrist_rng = random.Random(0x5EED)
+ZOBRIST_ROWS = [[0] + [_zobrist_rng.getrandbits(64) for _ in range(FULL_ROW)]
+                for _ in range(GRID_HEIGHT)]
+
+def zobrist_hash(rows):
+    h = 0
+    for keys, row in zip(ZOBRIST_ROWS, rows):
+        if row:
+            h ^= keys[row]
+    return h
+
+def column_heights(rows):
+    # Hauteur de chaque colonne (0 : vide) : ligne par ligne depuis le haut,
+    # chaque colonne prend la hauteur de la première ligne où elle est occupée
+    heights = [0] * GRID_WIDTH
+    seen = 0
+    for r, row in enumerate(rows):
+        new = row & ~seen
+        if new:
+            height = GRID_HEIGHT - r
+            while new:
+                low = new & -new
+                heights[low.bit_length() - 1] = height
+                new ^= low
+            seen |= row
+            if seen == FULL_ROW:
+                break
+    return heights
+
+class Board:
+    # Bitboard : un int par ligne (bit j = colonne j) pour les collisions,
+    # plus un plan de couleurs (type de pièce ou 0) pour l'affichage.
+    # `heights` (relief des colonnes) et `zobrist` suivent le bitboard.
+    def __init__(self):
+        self.rows = [0] * GRID_HEIGHT
+        self.colors = [[0 for _ in range(GRID_WIDTH)] for _ in range(GRID_HEIGHT)]
+        self.heights = [0] * GRID_WIDTH
+        self.zobrist = 0
+
+    @classmethod
+    def from_grid(cls, grid):
+        board = cls()
+        for i, row in enumerate(grid):
+            board.colors[i] = list(row)
+            board.rows[i] = sum(1 << j for j, cell in enumerate(row) if cell)
+        board.refresh()
+        return board
+
+    @classmethod
+    def from_rows(cls, rows, zobrist=None, heights=None):
+        # Plateau réduit au bitboard, sans plan de couleurs (recherche IA)
+        board = cls.__new__(cls)
+        board.rows = rows
+        board.colors = None
+        board.heights = column_heights(rows) if heights is None else heights
+        board.zobrist = zobrist_hash(rows) if zobrist is None else zobrist
+        return board
+
+    def copy(self):
+        board = Board.__new__(Board)
+        board.rows = self.rows[:]
+        board.colors = None if self.colors is None else [row[:] for row in self.colors]
+        board.heights = self.heights[:]
+        board.zobrist = self.zobrist
+        return board
+
+    def refresh(self):
+        # Après une modification directe de `rows`
+        self.heights = column_heights(self.rows)
+        self.zobrist = zobrist_hash(self.rows)
+
+    def collides(self, placed, y):
+        # `placed` vient de place_masks / Orientation.placed
+        if placed is None:
+            return True
+        rows = self.rows
+        for i, mask in placed:
+            r = y + i
+            if r >= GRID_HEIGHT:
+                return True
+            if r >= 0 and rows[r] & mask:
+                return True
+        return False
+
+    def fits(self, orientation, x, y):
+        # Même test que collides, déroulé ici car c'est la boucle interne de l'IA
+        if not -X_MARGIN <= x < GRID_WIDTH + X_MARGIN:
+            return False
+        placed = orientation.placed[x + X_MARGIN]
+        if placed is None:
+            return False
+        rows = self.rows
+        for i, mask in placed:
+            r = y + i
+            if r >= GRID_HEIGHT:
+                return False
+            if r >= 0 and rows[r] & mask:
+                return False
+        return True
+
+    def drop_row(self, orientation, x, y):
+        # Ligne d'arrivée d'une chute depuis (x, y), position libre. Si la pièce
+        # est au-dessus du relief dans chacune de ses colonnes, le contact se lit
+        # sur les hauteurs et le profil bas de l'orientation : O(largeur de la pièce).
+        # Sous un surplomb, descente ligne par ligne.
+        heights = self.heights
+        landing = GRID_HEIGHT
+        for dx, dy in orientation.bottom:
+            top = GRID_HEIGHT - heights[x + dx]  # première ligne occupée de la colonne
+            if y + dy >= top:
+                while self.fits(orientation, x, y + 1):
+                    y += 1
+                return y
+            if top - 1 - dy < landing:
+                landing = top - 1 - dy
+        return landing
+
+    def lock(self, piece):
+        # Renvoie False si une partie de la pièce dépasse le haut de la grille
+        inside = True
+        rows, colors, heights = self.rows, self.colors, self.heights
+        zobrist = self.zobrist
+        x, y = piece.x, piece.y
+        for dx, dy in ROTATIONS[piece.type][piece.rotation].cells:
+            r = y + dy
+            if r < 0:
+                inside = False
+                continue
+            keys = ZOBRIST_ROWS[r]
+            zobrist ^= keys[rows[r]]
+            rows[r] |= 1 << (x + dx)
+            zobrist ^= keys[rows[r]]
+            colors[r][x + dx] = piece.type
+            if GRID_HEIGHT - r > heights[x + dx]:
+                heights[x + dx] = GRID_HEIGHT - r
+        self.zobrist = zobrist
+        return inside
+
+    def clear_full_rows(self):
+        # Compaction : on garde les lignes non pleines et on complète par le haut
+        rows = self.rows
+        kept = [i for i in range(GRID_HEIGHT) if rows[i] != FULL_ROW]
+        cleared = GRID_HEIGHT - len(kept)
+        if cleared:
+            colors = self.colors
+            self.rows[:] = [0] * cleared + [rows[i] for i in kept]
+            self.colors[:] = ([[0 for _ in range(GRID_WIDTH)] for _ in range(cleared)] +
+                              [colors[i] for i in kept])
+            # Toutes les lignes au-dessus ont changé d'indice ; une colonne dont le
+            # sommet est effacé peut descendre de plus que `cleared` (trous)
+            self.refresh()
+        return cleared
+
+# Générateur pseudo-aléatoire xorshift64* : tout son état tient dans un entier
+# de 64 bits, ce qui permet des instantanés de partie de quelques octets
+MASK64 = (1 << 64) - 1
+
+def seed_state(seed=None):
+    # État initial (jamais nul) dérivé de la graine par splitmix64
+    if seed is None:
+        seed = random.getrandbits(64)
+    z = (seed + 0x9E3779B97F4A7C15) & MASK64
+    z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & MASK64
+    z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & MASK64
+    return (z ^ (z >> 31)) or 1
+
+class PieceGenerator:
+    # Source de pièces déterministe : graine explicite, tirage uniforme ou sac
+    # de 7, file d'aperçus, et lecture d'une séquence pré-générée en octets
+    # (une fois la séquence épuisée, le tirage reprend avec la graine)
+    def __init__(self, seed=None, bag=False, previews=DEFAULT_PREVIEWS, sequence=None):
+        self.bag = bag
+        self.previews = previews
+        self.sequence = sequence
+        self.seed(seed)
+
+    def seed(self, seed):
+        self.state = seed_state(seed)
+        self.position = 0
+        self._bag = []
+        self._queue = deque()
+
+    def _randrange(self, n):
+        state = self.state
+        state ^= state >> 12
+        state ^= (state << 25) & MASK64
+        state ^= state >> 27
+        self.state = state
+        return ((((state * 0x2545F4914F6CDD1D) & MASK64) >> 32) * n) >> 32
+
+    def _draw(self):
+        if self.sequence is not None and self.position < len(self.sequence):
+            code = self.sequence[self.position]
+            self.position += 1
+            return code
+        if self.bag:
+            if not self._bag:
+                # Mélange de Fisher-Yates
+                bag = list(range(len(PIECE_TYPES)))
+                for i in range(len(bag) - 1, 0, -1):
+                    j = self._randrange(i + 1)
+                    bag[i], bag[j] = bag[j], bag[i]
+                self._bag = bag
+            return self._bag.pop()
+        return self._randrange(len(PIECE_TYPES))
+
+    def next(self) -> str:
+        queue = self._queue
+        while len(queue) <= self.previews:
+            queue.append(self._draw())
+        return PIECE_TYPES[queue.popleft()]
+
+    def peek(self, count=None):
+        # Les `count` pièces suivantes, sans les consommer
+        count = self.previews if count is None else count
+        queue = self._queue
+        while len(queue) < count:
+            queue.append(self._draw())
+        return tuple(PIECE_TYPES[queue[i]] for i in range(count))
+
+    def getstate(self):
+        return (self.state, self.position, tuple(self._bag), tuple(self._queue))
+
+    def setstate(self, state):
+        self.state, self.position, bag, queue = state
+        self._bag = list(bag)
+        self._queue = deque(queue)
+
+def generate_sequence(seed, count, bag=False) -> bytes:
+    # La suite des `count` premières pièces d'un PieceGenerator(seed, bag), un octet par pièce
+    generator = PieceGenerator(seed, bag, previews=0)
+    return bytes(generator._draw() for _ in range(count))
+
+class TetrisEngine:
+    def __init__(self, difficulty='medium', seed=None, bag=False):
+        self.difficulty = difficulty
+        self.pieces = PieceGenerator(seed, bag)
+        # listener(engine, rows, pièce, type suivant, score avant, lignes) après chaque
+        # pose, avec le bitboard d'avant la pose (export de données, tetris_dataset.py)
+        self.place_listener = None
+        self.reset_game()
+
+    @property
+    def grid(self):
+        return self.board.colors
+
+    @grid.setter
+    def grid(self, grid):
+        self.board = Board.from_grid(grid)
+
+    def reset_game(self):
+        self.board = Board()
+        self.current_piece = self.new_piece()
+        self.next_piece = self.new_piece()
+        self.score = 0
+        self.level = 1
+        self.lines = 0
+        self.pieces_placed = 0
+        self.game_over = False
+        self.paused = False
+        self.fall_speed = DIFFICULTIES[self.difficulty]['fall_speed']
+        self.fall_time = 0.0  # temps de simulation écoulé depuis le dernier pas de gravité
+
+    def on_event(self, name):
+        # Point d'accroche pour le frontend (sons, effets) ; rien en headless
+        pass
+
+    def new_piece(self) -> Piece:
+        return spawn_piece(self.pieces.next())
+
+    @property
+    def previews(self):
+        # Pièces à venir après `next_piece`
+        return self.pieces.peek()
+
+    def rotate_piece(self, direction=1):
+        # Rotation SRS : nouvel index d'orientation puis essai des wall kicks
+        piece = self.current_piece
+        rotation = (piece.rotation + direction) % 4
+        orientation = ROTATIONS[piece.type][rotation]
+        for dx, dy in KICKS[piece.type][piece.rotation][0 if direction > 0 else 1]:
+            if self.board.fits(orientation, piece.x + dx, piece.y + dy):
+                piece.x += dx
+                piece.y += dy
+                piece.rotation = rotation
+                return True
+        return False
+
+    def is_valid_move(self, shape, x, y):
+        return not self.board.collides(place_masks(shape_masks(shape), x), y)
+
+    def fits(self, piece, x, y):
+        return self.board.fits(ROTATIONS[piece.type][piece.rotation], x, y)
+
+    def move_piece(self, dx, dy):
+        piece = self.current_piece
+        if self.fits(piece, piece.x + dx, piece.y + dy):
+            piece.x += dx
+            piece.y += dy
+            return True
+        return False
+
+    def drop_row(self, piece=None):
+        # Ligne où la pièce (la courante par défaut) se poserait : sert aussi à la pièce fantôme
+        piece = piece or self.current_piece
+        return self.board.drop_row(ROTATIONS[piece.type][piece.rotation], piece.x, piece.y)
+
+    def sonic_drop(self):
+        # Descend la pièce jusqu'au contact sans la verrouiller
+        piece = self.current_piece
+        if not self.fits(piece, piece.x, piece.y):
+            return False
+        landing = self.drop_row(piece)
+        moved = landing > piece.y
+        piece.y = landing
+        return moved
+
+    def hard_drop(self):
+        self.sonic_drop()
+        return self.place_piece()
+
+    def place_piece(self):
+        listener = self.place_listener
+        if listener is not None:
+            before = (self.board.rows[:], self.current_piece, self.next_piece.type, self.score)
+        # Une pièce verrouillée hors de la grille termine la partie
+        if not self.board.lock(self.current_piece):
+            self.game_over = True
+
+        lines_cleared = self.clear_lines()
+        self.pieces_placed += 1
+        self.current_piece = self.next_piece
+        self.next_piece = self.new_piece()
+
+        piece = self.current_piece
+        if not self.fits(piece, piece.x, piece.y):
+            self.game_over = True
+        if listener is not None:
+            listener(self, *before, lines_cleared)
+        return lines_cleared
+
+    def clear_lines(self):
+        lines_cleared = self.board.clear_full_rows()
+
+        if lines_cleared:
+            self.lines += lines_cleared
+            self.score += lines_cleared * 100 * self.level
+
+            # Augmenter le niveau et réduire `fall_speed`
+            new_level = self.lines // 1 + 1  # Nouveau niveau après chaque 1 lignes
+            if new_level > self.level:
+                self.level = new_level
+                speed_increase = DIFFICULTIES[self.difficulty]['speed_increase']
+                self.fall_speed = max(0.1, self.fall_speed - speed_increase)
+                self.on_event('level_up')
+        return lines_cleared
+
+    def apply_action(self, action):
+        # Applique une action joueur ; renvoie True si elle a eu un effet
+        if self.paused or self.game_over:
+            return False
+        if action == 'left':
+            moved = self.move_piece(-1, 0)
+            if moved:
+                self.on_event('lateral_move')
+        elif action == 'right':
+            moved = self.move_piece(1, 0)
+            if moved:
+                self.on_event('lateral_move')
+        elif action == 'down':
+            moved = self.move_piece(0, 1)
+            if moved:
+                self.on_event('drop')
+        elif action == 'rotate':
+            moved = self.rotate_piece()
+            self.on_event('rotate')
+        elif action == 'rotate_ccw':
+            moved = self.rotate_piece(-1)
+            self.on_event('rotate')
+        elif action == 'sonic_drop':
+            moved = self.sonic_drop()
+        elif action == 'drop':
+            self.hard_drop()
+            self.on_event('drop')
+            moved = True
+        else:
+            raise ValueError(f"Action inconnue : {action}")
+        return moved
+
+    def tick(self):
+        # Un pas de gravité ; renvoie True si la pièce a été verrouillée
+        if self.paused or self.game_over:
+            return False
+        if self.move_piece(0, 1):
+            return False
+        self.place_piece()
+        return True
+
+    def update(self, dt):
+        # Avance l'horloge de gravité de `dt` secondes de simulation ; un pas de
+        # gravité tombe dès que `fall_speed` est atteint (tolérance sur la somme
+        # des pas flottants). Renvoie True si la pièce a été verrouillée.
+        if self.paused or self.game_over:
+            return False
+        self.fall_time += dt
+        if self.fall_time + 1e-9 < self.fall_speed:
+            return False
+        self.fall_time = 0.0
+        return self.tick()
+
+    def step(self, action=None):
+        # Action optionnelle suivie d'un pas de gravité ; renvoie les lignes effacées
+        lines_before = self.lines
+        placed_before = self.pieces_placed
+        if action is not None:
+            self.apply_action(action)
+        # Pas de gravité si l'action vient déjà de verrouiller la pièce
+        if not self.game_over and self.pieces_placed == placed_before:
+            self.tick()
+        return self.lines - lines_before
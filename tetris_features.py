@@ -0,0 +1,86 @@
+import numpy as np
+
+from tetris_engine import GRID_WIDTH, GRID_HEIGHT
+
+# Évaluation vectorisée de lots de plateaux avec NumPy : un seul appel pour
+# N plateaux candidats, sans boucle Python par plateau.
+
+FEATURE_NAMES = (
+    'aggregate_height',
+    'holes',
+    'bumpiness',
+    'lines',
+    'max_height',
+    'wells',
+    'row_transitions',
+    'column_transitions'
+)
+
+_BITS = np.arange(GRID_WIDTH, dtype=np.uint16)
+_FULL_ROW = (1 << GRID_WIDTH) - 1
+# Nombre de bits à 1 de chaque valeur sur 12 bits (ligne + deux murs)
+_POPCOUNT = np.array([bin(i).count('1') for i in range(1 << (GRID_WIDTH + 2))], dtype=np.int64)
+
+def to_rows(boards):
+    # Bitboards (N, 20) uint16 depuis un lot de bitboards ou de grilles (N, 20, 10)
+    boards = np.asarray(boards)
+    if boards.ndim == 3:
+        return (boards.astype(bool).astype(np.uint16) << _BITS).sum(axis=2).astype(np.uint16)
+    return boards.astype(np.uint16)
+
+def to_cells(boards):
+    # (N, 20, 10) booléen depuis un lot de bitboards ou de grilles
+    rows = to_rows(boards)
+    return ((rows[:, :, None] >> _BITS) & 1).astype(bool)
+
+def batch_features(boards, lines=None):
+    # Matrice (N, F) dans l'ordre de FEATURE_NAMES ; tout est calculé sur les
+    # bitboards, une table de popcount remplaçant les boucles sur les cases
+    rows = to_rows(boards)
+    n = rows.shape[0]
+
+    # Un bit est « couvert » dès qu'un bloc se trouve au-dessus ou dessus
+    covered = np.bitwise_or.accumulate(rows, axis=1)
+    heights = ((covered[:, :, None] >> _BITS) & 1).sum(axis=1).astype(np.int64)
+
+    # Trou : case vide avec un bloc au-dessus dans la même colonne
+    holes = _POPCOUNT[covered & ~rows & _FULL_ROW].sum(axis=1)
+
+    bumpiness = np.abs(np.diff(heights, axis=1)).sum(axis=1)
+
+    # Puits : colonne plus basse que ses deux voisines (les murs comptent comme pleins)
+    walls = np.full((n, 1), GRID_HEIGHT)
+    padded = np.concatenate([walls, heights, walls], axis=1)
+    neighbours = np.minimum(padded[:, :-2], padded[:, 2:])
+    wells = np.clip(neighbours - heights, 0, None).sum(axis=1)
+
+    # Transitions plein/vide le long des lignes (murs pleins) et des colonnes (sol plein)
+    walled = (rows.astype(np.int64) << 1) | 1 | (1 << (GRID_WIDTH + 1))
+    row_transitions = _POPCOUNT[(walled ^ (walled >> 1)) & ((1 << (GRID_WIDTH + 1)) - 1)].sum(axis=1)
+    column_transitions = (_POPCOUNT[rows[:, 1:] ^ rows[:, :-1]].sum(axis=1) +
+                          _POPCOUNT[rows[:, -1] ^ _FULL_ROW])
+
+    if lines is None:
+        lines = np.zeros(n)
+    return np.stack([
+        heights.sum(axis=1),
+        holes,
+        bumpiness,
+        np.asarray(lines),
+        heights.max(axis=1),
+        wells,
+        row_transitions,
+        column_transitions
+    ], axis=1).astype(np.float64)
+
+class BatchEvaluator:
+    # Mêmes poids que Heuristic ; les caractéristiques absentes valent 0
+    def __init__(self, weights):
+        self.weights = np.array([weights.get(name, 0.0) for name in FEATURE_NAMES])
+
+    def evaluate(self, boards, lines=None):
+        features = batch_features(boards, lines)
+        return features, features @ self.weights
+
+    def scores(self, boards, lines=None):
+        return self.evaluate(boards, lines)[1]
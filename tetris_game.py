@@ -1,39 +1,31 @@
 import pygame
-import random
-from dataclasses import dataclass
-from typing import List, Tuple
-import json
 import os
-# Pygame Initialization
-pygame.init()
-pygame.font.init()
-pygame.mixer.init()
+import queue
+import time
+from tetris_engine import GRID_WIDTH, GRID_HEIGHT, Board, TetrisEngine
+from tetris_ai import Heuristic, TetrisAI, load_weights
+from tetris_book import load_book
+from tetris_search import ParallelSearchAI
+from tetris_input import ARR, DAS, InputHandler, env_seconds
+from tetris_save import REPLAY_FILE, SAVE_FOLDER, SaveManager, load_save
+from tetris_replay import ReplayRecorder
+from tetris_loop import FixedTimestep
+from tetris_profiler import METRICS_FILE, FrameProfiler
+from tetris_snapshot import encode_snapshot, restore_snapshot, snapshot_from_json
+from tetris_assets import AssetManager
+from tetris_scores import ScoreStore, player_name
 
 # Game Constants
 BLOCK_SIZE = 40
-GRID_WIDTH = 10
-GRID_HEIGHT = 20
 SCREEN_WIDTH = GRID_WIDTH * BLOCK_SIZE + 300
 SCREEN_HEIGHT = GRID_HEIGHT * BLOCK_SIZE
+# Cadence maximale de l'affichage ; la simulation avance à SIM_HZ (tetris_loop.py)
+RENDER_FPS = 144
+# Durée d'affichage du résultat d'une sauvegarde (s)
+SAVE_STATUS_SECONDS = 3
 
-# Chargement des sons
-SOUNDS = {
-    'clear': pygame.mixer.Sound('sounds/clear.wav'),
-    'drop': pygame.mixer.Sound('sounds/drop.wav'),
-    'lateral_move': pygame.mixer.Sound('sounds/lateralmove.wav'),
-    'level_up': pygame.mixer.Sound('sounds/levelup.wav'),
-    'rotate': pygame.mixer.Sound('sounds/rotate.wav'),
-    'select': pygame.mixer.Sound('sounds/select.wav'),
-    'start': pygame.mixer.Sound('sounds/start.wav'),
-    'tetris': pygame.mixer.Sound('sounds/tetris.wav'),
-    'game_over': pygame.mixer.Sound('sounds/gameover.wav')
-}
-
-# Musique de fond
-# pygame.mixer.music.load('sounds/tetrismusic.wav')
-pygame.mixer.music.load('sounds/background_music.mp3') 
-pygame.mixer.music.set_volume(0.5)  # Réglez le volume (0.0 à 1.0)
-pygame.mixer.music.play(-1)  # -1 pour jouer en boucle infinie
+# Sons et musique chargés à la demande (pygame n'est pas initialisé à l'import)
+ASSETS = AssetManager()
 
 # Colors
 COLORS = {
@@ -58,44 +50,78 @@ COLORS = {
     }
 }
 
-# Piece Shapes
-SHAPES = {
-    'I': [[1, 1, 1, 1]],
-    'O': [[1, 1], [1, 1]],
-    'T': [[0, 1, 0], [1, 1, 1]],
-    'S': [[0, 1, 1], [1, 1, 0]],
-    'Z': [[1, 1, 0], [0, 1, 1]],
-    'J': [[1, 0, 0], [1, 1, 1]],
-    'L': [[0, 0, 1], [1, 1, 1]]
+# Sauvegardes asynchrones (thread de fond, écritures regroupées)
+SAVES = SaveManager()
+
+# Classement SQLite (tetris_scores.py), ouvert à la première fin de partie
+SCORES = None
+LEADERBOARD_SIZE = 5
+
+def get_scores():
+    global SCORES
+    if SCORES is None:
+        SCORES = ScoreStore()
+    return SCORES
+
+# Poses des parties exportées en données d'apprentissage (tetris_dataset.py)
+# si TETRIS_DATASET donne un dossier ; NumPy n'est importé que dans ce cas
+DATASET_FOLDER = os.environ.get('TETRIS_DATASET')
+DATASET = None
+
+def get_dataset():
+    global DATASET
+    if DATASET is None:
+        from tetris_dataset import GAME_SHARD_RECORDS, ShardWriter
+        DATASET = ShardWriter(DATASET_FOLDER, GAME_SHARD_RECORDS)
+    return DATASET
+
+def make_ai(difficulty):
+    # Jeu automatique (touche A) : en difficile, la recherche parallèle décide
+    # dans 0,8 × fall_speed sans bloquer les frames (relevée à chaque
+    # simulate_step) ; sinon l'IA à deux pièces, sur un seul cœur
+    heuristic = Heuristic(load_weights())
+    if difficulty == 'hard':
+        return ParallelSearchAI(heuristic, book=load_book()).start()
+    return TetrisAI(heuristic, book=load_book())
+
+def make_tap():
+    if not DATASET_FOLDER:
+        return None
+    from tetris_dataset import PlacementTap
+    return PlacementTap(int(time.time()))
+
+# Touches clavier -> actions du moteur
+KEY_ACTIONS = {
+    pygame.K_LEFT: 'left',
+    pygame.K_RIGHT: 'right',
+    pygame.K_DOWN: 'down',
+    pygame.K_UP: 'rotate',
+    pygame.K_z: 'rotate_ccw',
+    pygame.K_SPACE: 'drop'
 }
 
-# Difficulty Levels
-# DIFFICULTIES = {
-#     'easy': {'fall_speed': 0.7, 'speed_increase': 0.3},
-#     'medium': {'fall_speed': 0.4, 'speed_increase': 0.25},
-#     'hard': {'fall_speed': 0.1, 'speed_increase': 0.35}
-# }
-
-DIFFICULTIES = {
-    'easy': {'fall_speed': 0.7, 'speed_increase': 0.3},
-    'medium': {'fall_speed': 0.4, 'speed_increase': 0.35},
-    'hard': {'fall_speed': 0.1, 'speed_increase': 0.45}
-}
+# Seuls événements lus par la boucle de jeu ; les autres ne sont pas mis en file
+GAME_EVENTS = [pygame.QUIT, pygame.KEYDOWN, pygame.KEYUP, pygame.MOUSEMOTION,
+               pygame.MOUSEBUTTONDOWN, pygame.VIDEOEXPOSE, pygame.WINDOWFOCUSLOST]
+
+# Polices chargées une seule fois par taille
+FONTS = {}
 
-@dataclass
-class Piece:
-    shape: List[List[int]]
-    x: int
-    y: int
-    type: str
+def get_font(size):
+    font = FONTS.get(size)
+    if font is None:
+        ASSETS.init_display()
+        font = FONTS[size] = pygame.font.Font(None, size)
+    return font
 
 class Button:
     def __init__(self, x, y, width, height, text, color=None, font_size=24):
         self.rect = pygame.Rect(x, y, width, height)
         self.text = text
-        self.font = pygame.font.Font(None, font_size)
+        self.font = get_font(font_size)
         self.hovered = False
         self.color = color or COLORS['button_normal']
+        self._label = (None, None)  # (texte, surface) du dernier rendu
 
     def draw(self, screen):
         color = (min(255, self.color[0] + 30), 
@@ -103,7 +129,10 @@ class Button:
                  min(255, self.color[2] + 30)) if self.hovered else self.color
         
         pygame.draw.rect(screen, color, self.rect)
-        text_surface = self.font.render(self.text, True, COLORS['text'])
+        text, text_surface = self._label
+        if text != self.text:
+            text_surface = self.font.render(self.text, True, COLORS['text'])
+            self._label = (self.text, text_surface)
         text_rect = text_surface.get_rect(center=self.rect.center)
         screen.blit(text_surface, text_rect)
 
@@ -113,6 +142,7 @@ class Button:
 
 class DifficultySelect:
     def __init__(self):
+        ASSETS.init_display()
         self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
         pygame.display.set_caption('Tetris - Select Difficulty')
         
@@ -133,8 +163,8 @@ class DifficultySelect:
             self.screen.fill(COLORS['background'])
             
             # Title and Subtitle
-            font_title = pygame.font.Font(None, 72)
-            font_subtitle = pygame.font.Font(None, 36)
+            font_title = get_font(72)
+            font_subtitle = get_font(36)
             
             title = font_title.render('Tetris', True, COLORS['text'])
             subtitle = font_subtitle.render('Select Difficulty', True, COLORS['text'])
@@ -168,8 +198,12 @@ class DifficultySelect:
         return None
 
 class TetrisUI:
+    # Rendu par rectangles sales : le fond statique (grille, panneau) est
+    # pré-rendu, seules les cases et zones qui ont changé depuis la frame
+    # précédente sont redessinées puis envoyées avec display.update(rects)
     def __init__(self, game):
         self.game = game
+        ASSETS.init_display()
         self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
         pygame.display.set_caption('Tetris')
         
@@ -184,59 +218,197 @@ class TetrisUI:
             'load': Button(button_x, 640, button_width, 50, 'Load Game')
         }
 
-    def draw(self):
-        self.screen.fill(COLORS['background'])
+        self.background = self._build_background()
+        self.next_area = pygame.Rect(GRID_WIDTH * BLOCK_SIZE + 50, 100, 250, 3 * BLOCK_SIZE)
+        self.stats_area = pygame.Rect(GRID_WIDTH * BLOCK_SIZE + 50, 250, 250, 150)
+        self.overlay_area = pygame.Rect(GRID_WIDTH * BLOCK_SIZE + 10, 694, 290, 106)
+        self.invalidate()
+
+    def invalidate(self):
+        # Force un rendu complet à la prochaine frame (premier affichage, fenêtre exposée)
+        self._full_redraw = True
+        self._cells = None  # couleurs des cases affichées à la frame précédente
+        self._next_state = None
+        self._stats_state = None
+        self._button_states = {}
+        self._message = None  # (texte, surface, rect) du message affiché sur la grille
+        self._piece = None  # (couleur, rects des cases, rect englobant) de la pièce interpolée
+        self._overlay = None  # prochain rafraîchissement de l'overlay du profileur
+        self._texts = {}
+
+    def _build_background(self):
+        background = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+        background.fill(COLORS['background'])
+        for x in range(0, GRID_WIDTH * BLOCK_SIZE, BLOCK_SIZE):
+            pygame.draw.line(background, COLORS['grid_lines'], 
+                             (x, 0), (x, GRID_HEIGHT * BLOCK_SIZE))
+        for y in range(0, GRID_HEIGHT * BLOCK_SIZE, BLOCK_SIZE):
+            pygame.draw.line(background, COLORS['grid_lines'], 
+                             (0, y), (GRID_WIDTH * BLOCK_SIZE, y))
+        next_text = get_font(36).render('Next:', True, COLORS['text'])
+        background.blit(next_text, (GRID_WIDTH * BLOCK_SIZE + 50, 50))
+        return background
+
+    def _text(self, text, size):
+        # Surfaces de texte gardées tant que leur contenu ne change pas
+        key = (text, size)
+        surface = self._texts.get(key)
+        if surface is None:
+            if len(self._texts) > 64:
+                self._texts.clear()
+            surface = self._texts[key] = get_font(size).render(text, True, COLORS['text'])
+        return surface
+
+    def draw(self, lag=0.0):
+        # `lag` : temps réel pas encore simulé (s), pour interpoler la chute
+        self._dirty = []
+        if self._full_redraw:
+            self.screen.blit(self.background, (0, 0))
         
         # Draw Game Grid
-        self._draw_grid()
-        self._draw_current_piece()
+        cells = [row[:] for row in self.game.grid]
+        self._draw_ghost_piece(cells)
+        previous_piece = self._piece
+        self._piece = self._falling_piece(lag)
+        if self._piece is None:
+            self._draw_current_piece(cells)
+        self._draw_grid(cells)
+        if previous_piece is not None or self._piece is not None:
+            self._draw_falling_piece(previous_piece)
         self._draw_next_piece()
         self._draw_stats()
         
         # Draw Control Buttons
-        for button in self.buttons.values():
-            button.draw(self.screen)
+        for name, button in self.buttons.items():
+            if self._button_states.get(name) != button.hovered:
+                self._button_states[name] = button.hovered
+                button.draw(self.screen)
+                self._dirty.append(button.rect)
         
         # Draw Game State Messages
         self._draw_game_messages()
+        self._draw_overlay()
         
-        pygame.display.flip()
+        if self._full_redraw:
+            self._full_redraw = False
+            pygame.display.flip()
+        elif self._dirty:
+            pygame.display.update(self._dirty)
 
-    def _draw_grid(self):
-        # Grid background and lines
+    def _cell_rect(self, i, j):
+        return pygame.Rect(j * BLOCK_SIZE, i * BLOCK_SIZE, BLOCK_SIZE, BLOCK_SIZE)
+
+    def _paint_cell(self, i, j, color):
+        # Case pleine, ou contour pour la pièce fantôme (type en minuscule)
+        if color.isupper():
+            pygame.draw.rect(self.screen, COLORS['pieces'][color],
+                             (j * BLOCK_SIZE, i * BLOCK_SIZE, BLOCK_SIZE - 1, BLOCK_SIZE - 1))
+        else:
+            pygame.draw.rect(self.screen, COLORS['pieces'][color.upper()],
+                             (j * BLOCK_SIZE, i * BLOCK_SIZE, BLOCK_SIZE - 1, BLOCK_SIZE - 1), 2)
+
+    def _draw_cell(self, i, j, color):
+        rect = self._cell_rect(i, j)
+        self.screen.blit(self.background, rect, rect)
+        if color:
+            self._paint_cell(i, j, color)
+        return rect
+
+    def _draw_grid(self, cells):
+        # Seules les cases dont la couleur a changé sont redessinées
+        previous = self._cells
+        self._grid_dirty = []
         for i in range(GRID_HEIGHT):
+            row = cells[i]
+            if previous is not None and previous[i] == row:
+                continue
             for j in range(GRID_WIDTH):
-                if self.game.grid[i][j]:
-                    pygame.draw.rect(self.screen, 
-                                     COLORS['pieces'][self.game.grid[i][j]],
-                                     (j * BLOCK_SIZE, 
-                                      i * BLOCK_SIZE, 
-                                      BLOCK_SIZE - 1, 
-                                      BLOCK_SIZE - 1))
-        
-        for x in range(0, GRID_WIDTH * BLOCK_SIZE, BLOCK_SIZE):
-            pygame.draw.line(self.screen, COLORS['grid_lines'], 
-                             (x, 0), (x, GRID_HEIGHT * BLOCK_SIZE))
-        for y in range(0, GRID_HEIGHT * BLOCK_SIZE, BLOCK_SIZE):
-            pygame.draw.line(self.screen, COLORS['grid_lines'], 
-                             (0, y), (GRID_WIDTH * BLOCK_SIZE, y))
-
-    def _draw_current_piece(self):
+                if previous is None or previous[i][j] != row[j]:
+                    self._grid_dirty.append(self._draw_cell(i, j, row[j]))
+        self._cells = cells
+        self._dirty.extend(self._grid_dirty)
+
+    def _restore_grid_area(self, rect):
+        # Remet le fond et les cases sous un message qui disparaît ou doit être réaffiché
+        rect = rect.clip(pygame.Rect(0, 0, GRID_WIDTH * BLOCK_SIZE, GRID_HEIGHT * BLOCK_SIZE))
+        self.screen.blit(self.background, rect, rect)
+        for i in range(rect.top // BLOCK_SIZE, (rect.bottom - 1) // BLOCK_SIZE + 1):
+            for j in range(rect.left // BLOCK_SIZE, (rect.right - 1) // BLOCK_SIZE + 1):
+                if self._cells[i][j]:
+                    self._paint_cell(i, j, self._cells[i][j])
+        if self._piece is not None and self._piece[2].colliderect(rect):
+            self.screen.set_clip(rect)
+            self._blit_piece(self._piece)
+            self.screen.set_clip(None)
+        self._dirty.append(rect)
+
+    def _falling_piece(self, lag):
+        # Entre deux pas de gravité, la pièce est dessinée au pixel près à la
+        # hauteur correspondant au temps écoulé ; None si elle est posée sur la grille
+        game = self.game
+        if game.paused or game.game_over:
+            return None
+        piece = game.current_piece
+        if not game.fits(piece, piece.x, piece.y + 1):
+            return None
+        progress = (game.fall_time + lag) / game.fall_speed
+        offset = min(int(progress * BLOCK_SIZE), BLOCK_SIZE - 1)
+        if offset <= 0:
+            return None
+        rects = [pygame.Rect((piece.x + dx) * BLOCK_SIZE, (piece.y + dy) * BLOCK_SIZE + offset,
+                             BLOCK_SIZE - 1, BLOCK_SIZE - 1)
+                 for dx, dy in piece.orientation.cells if piece.y + dy >= -1]
+        if not rects:
+            return None
+        bounds = rects[0].unionall(rects[1:]).clip(
+            pygame.Rect(0, 0, GRID_WIDTH * BLOCK_SIZE, GRID_HEIGHT * BLOCK_SIZE))
+        return COLORS['pieces'][piece.type], rects, bounds
+
+    def _blit_piece(self, piece):
+        color, rects, _ = piece
+        for rect in rects:
+            pygame.draw.rect(self.screen, color, rect)
+
+    def _draw_falling_piece(self, previous):
+        # Efface la pièce interpolée de la frame précédente, puis dessine la nouvelle
+        if previous is not None:
+            self._restore_grid_area(previous[2])
+            self._grid_dirty.append(previous[2])
+        if self._piece is not None:
+            self._blit_piece(self._piece)
+            self._dirty.append(self._piece[2])
+            self._grid_dirty.append(self._piece[2])
+
+    def _draw_ghost_piece(self, cells):
+        # Position d'arrivée de la pièce courante (hauteurs de colonnes du moteur),
+        # fusionnée dans les cases affichées : seules ses cases qui bougent sont redessinées
+        game = self.game
+        if game.paused or game.game_over:
+            return
+        piece = game.current_piece
+        if not game.fits(piece, piece.x, piece.y):
+            return
+        y = game.drop_row(piece)
+        ghost = piece.type.lower()
+        for dx, dy in piece.orientation.cells:
+            if 0 <= y + dy < GRID_HEIGHT and not cells[y + dy][piece.x + dx]:
+                cells[y + dy][piece.x + dx] = ghost
+
+    def _draw_current_piece(self, cells):
+        # La pièce courante est fusionnée dans les cases affichées
         if not self.game.paused and not self.game.game_over:
-            for i, row in enumerate(self.game.current_piece.shape):
+            piece = self.game.current_piece
+            for i, row in enumerate(piece.shape):
                 for j, cell in enumerate(row):
-                    if cell:
-                        pygame.draw.rect(self.screen,
-                                       COLORS['pieces'][self.game.current_piece.type],
-                                       ((self.game.current_piece.x + j) * BLOCK_SIZE,
-                                        (self.game.current_piece.y + i) * BLOCK_SIZE,
-                                        BLOCK_SIZE - 1,
-                                        BLOCK_SIZE - 1))
+                    if cell and 0 <= piece.y + i < GRID_HEIGHT:
+                        cells[piece.y + i][piece.x + j] = piece.type
 
     def _draw_next_piece(self):
-        font = pygame.font.Font(None, 36)
-        next_text = font.render('Next:', True, COLORS['text'])
-        self.screen.blit(next_text, (GRID_WIDTH * BLOCK_SIZE + 50, 50))
+        state = (self.game.next_piece.type, self.game.paused)
+        if state == self._next_state:
+            return
+        self._next_state = state
+        self.screen.blit(self.background, self.next_area, self.next_area)
         
         if not self.game.paused:
             for i, row in enumerate(self.game.next_piece.shape):
@@ -248,142 +420,179 @@ class TetrisUI:
                                         100 + i * BLOCK_SIZE,
                                         BLOCK_SIZE - 1,
                                         BLOCK_SIZE - 1))
+        self._dirty.append(self.next_area)
 
     def _draw_stats(self):
-        font = pygame.font.Font(None, 36)
-        
-        stats = [
+        stats = (
             f'Score: {self.game.score}',
             f'Level: {self.game.level}',
             f'Lines: {self.game.lines}'
-        ]
+        )
+        save_status = self.game.save_status
+        state = (stats, save_status and save_status[0])
+        if state == self._stats_state:
+            return
+        self._stats_state = state
+        self.screen.blit(self.background, self.stats_area, self.stats_area)
         
         for i, stat in enumerate(stats):
-            stat_text = font.render(stat, True, COLORS['text'])
+            stat_text = self._text(stat, 36)
             self.screen.blit(stat_text, (GRID_WIDTH * BLOCK_SIZE + 50, 250 + i * 50))
+        if save_status is not None:
+            # Résultat de la dernière sauvegarde, sous les compteurs
+            self.screen.blit(self._text(save_status[0], 24), (GRID_WIDTH * BLOCK_SIZE + 50, 375))
+        self._dirty.append(self.stats_area)
 
     def _draw_game_messages(self):
-        font = pygame.font.Font(None, 48)
-        
         if self.game.paused:
-            pause_text = font.render('PAUSE', True, COLORS['text'])
-            text_rect = pause_text.get_rect(
-                center=(GRID_WIDTH * BLOCK_SIZE // 2, 
-                        GRID_HEIGHT * BLOCK_SIZE // 2)
-            )
-            self.screen.blit(pause_text, text_rect)
-        
-        if self.game.game_over:
-            game_over_text = font.render('GAME OVER', True, COLORS['text'])
-            text_rect = game_over_text.get_rect(
-                center=(GRID_WIDTH * BLOCK_SIZE // 2, 
-                        GRID_HEIGHT * BLOCK_SIZE // 2)
-            )
-            self.screen.blit(game_over_text, text_rect)
-
-        if not self.game.game_over and not self.game.paused:
-            # font = pygame.font.Font(None, 48)
-            level_text = font.render(f'Level {self.game.level}', True, COLORS['text'])
-            text_rect = level_text.get_rect(center=(GRID_WIDTH * BLOCK_SIZE // 2, 50))
-            self.screen.blit(level_text, text_rect)
-
-class Tetris:
+            text, center = 'PAUSE', (GRID_WIDTH * BLOCK_SIZE // 2, GRID_HEIGHT * BLOCK_SIZE // 2)
+        elif self.game.game_over:
+            text, center = 'GAME OVER', (GRID_WIDTH * BLOCK_SIZE // 2, GRID_HEIGHT * BLOCK_SIZE // 2)
+        else:
+            text, center = f'Level {self.game.level}', (GRID_WIDTH * BLOCK_SIZE // 2, 50)
+
+        previous = self._message
+        if previous is not None and previous[0] == text:
+            # Même message : on ne le redessine que si des cases ont changé dessous
+            rect = previous[2]
+            if rect.collidelist(self._grid_dirty) == -1:
+                return
+            self._restore_grid_area(rect)
+        elif previous is not None:
+            self._restore_grid_area(previous[2])
+
+        surface = self._text(text, 48)
+        rect = surface.get_rect(center=center)
+        self.screen.blit(surface, rect)
+        self._message = (text, surface, rect)
+        self._dirty.append(rect)
+
+    def _draw_overlay(self):
+        # Mesures du profileur (F3), rafraîchies quatre fois par seconde
+        if not self.game.profiler.enabled:
+            if self._overlay is not None:
+                self._overlay = None
+                self.screen.blit(self.background, self.overlay_area, self.overlay_area)
+                self._dirty.append(self.overlay_area)
+            return
+        now = time.perf_counter()
+        if self._overlay is not None and now < self._overlay:
+            return
+        self._overlay = now + 0.25
+        self.screen.blit(self.background, self.overlay_area, self.overlay_area)
+        self.screen.set_clip(self.overlay_area)
+        font = get_font(20)
+        lines = self.game.profiler.summary_lines()
+        lines.insert(1, self.game.input.summary_line())
+        for i, line in enumerate(lines):
+            self.screen.blit(font.render(line, True, COLORS['text']),
+                             (self.overlay_area.x, self.overlay_area.y + i * 15))
+        self.screen.set_clip(None)
+        self._dirty.append(self.overlay_area)
+
+class Tetris(TetrisEngine):
     def __init__(self, difficulty='medium'):
         self.clock = pygame.time.Clock()
-        self.difficulty = difficulty
-        self.reset_game()
+        # Répétition des touches réglable en ms (TETRIS_DAS_MS, TETRIS_ARR_MS)
+        self.input = InputHandler(env_seconds('TETRIS_DAS_MS', DAS),
+                                  env_seconds('TETRIS_ARR_MS', ARR))
+        # Sauvegardes terminées (thread de fond) -> boucle de jeu
+        self._save_results = queue.SimpleQueue()
+        super().__init__(difficulty)
+        self.place_listener = make_tap()
         self.ui = TetrisUI(self)
+        self.ai = None  # make_ai(difficulté) quand le jeu automatique est activé (touche A)
+        self.timestep = FixedTimestep()
+        self.profiler = PROFILER
 
     def reset_game(self):
-        self.grid = [[0 for _ in range(GRID_WIDTH)] for _ in range(GRID_HEIGHT)]
-        self.current_piece = self.new_piece()
-        self.next_piece = self.new_piece()
-        self.score = 0
-        self.level = 1
-        self.lines = 0
-        self.game_over = False
-        self.paused = False
-        self.save_folder = 'saves'
-        self.fall_speed = DIFFICULTIES[self.difficulty]['fall_speed']
-
-    def new_piece(self) -> Piece:
-        piece_type = random.choice(list(SHAPES.keys()))
-        shape = SHAPES[piece_type]
-        return Piece(
-            shape=shape,
-            x=GRID_WIDTH // 2 - len(shape[0]) // 2,
-            y=0,
-            type=piece_type
-        )
-
-    def rotate_piece(self):
-        shape = self.current_piece.shape
-        rotated = list(zip(*shape[::-1]))
-        if self.is_valid_move(rotated, self.current_piece.x, self.current_piece.y):
-            self.current_piece.shape = [list(row) for row in rotated]
-
-    def is_valid_move(self, shape, x, y):
-        for i, row in enumerate(shape):
-            for j, cell in enumerate(row):
-                if cell:
-                    if (y + i >= GRID_HEIGHT or 
-                        x + j < 0 or 
-                        x + j >= GRID_WIDTH or 
-                        (y + i >= 0 and self.grid[y + i][x + j])):
-                        return False
-        return True
-
-    def place_piece(self):
-        for i, row in enumerate(self.current_piece.shape):
-            for j, cell in enumerate(row):
-                if cell:
-                    self.grid[self.current_piece.y + i][self.current_piece.x + j] = \
-                        self.current_piece.type
-        
-        self.clear_lines()
-        self.current_piece = self.next_piece
-        self.next_piece = self.new_piece()
-        
-        if not self.is_valid_move(self.current_piece.shape, 
-                                  self.current_piece.x, 
-                                  self.current_piece.y):
-            self.game_over = True
+        super().reset_game()
+        self.save_folder = SAVE_FOLDER
+        self.save_status = None  # (texte, fin d'affichage) de la dernière sauvegarde terminée
+        self.recorder = ReplayRecorder(self)
+        self.input.reset()
+        if self.place_listener is not None:
+            self.place_listener.game = int(time.time())  # identifiant de partie
+
+    def on_event(self, name):
+        ASSETS.play(name)
+
+    def stop_ai(self):
+        # Arrête le jeu automatique et les processus de la recherche parallèle
+        if self.ai is not None:
+            self.ai.close()
+            self.ai = None
+
+    # Toute action acceptée par le moteur (touches, IA, gravité) entre dans le replay
+
+    def apply_action(self, action):
+        if not self.paused and not self.game_over:
+            self.recorder.record(action)
+        return super().apply_action(action)
+
+    def tick(self):
+        if not self.paused and not self.game_over:
+            self.recorder.record('tick')
+        return super().tick()
+
+    def simulate_step(self):
+        # Un pas de simulation fixe : l'IA joue une action, puis la gravité
+        if self.game_over:
+            return
+        if self.ai:
+            self.ai.play(self)
+        self.update(self.timestep.dt)
+        self.recorder.next_frame(self)
+
+    def save_replay(self):
+        file_path = os.path.join(self.save_folder, os.path.basename(REPLAY_FILE))
+        SAVES.save(file_path, self.recorder.finish(self), self._on_saved)
+
+    def _on_saved(self, file_path, error):
+        # Appelé depuis le thread de sauvegarde une fois le fichier écrit : le
+        # résultat est relu par la boucle de jeu (poll_saves)
+        self._save_results.put((file_path, error))
+
+    def poll_saves(self, now):
+        # Résultats des sauvegardes terminées, affichés SAVE_STATUS_SECONDS
+        while True:
+            try:
+                file_path, error = self._save_results.get_nowait()
+            except queue.Empty:
+                break
+            if error is None:
+                text = f'Saved {os.path.basename(file_path)}'
+            else:
+                text = f'Save failed ({type(error).__name__})'
+            self.save_status = (text, now + SAVE_STATUS_SECONDS)
+        if self.save_status is not None and now >= self.save_status[1]:
+            self.save_status = None
+
+    def save_game(self, file_path=None):
+        # Non bloquant : l'instantané est écrit par SAVES sur un thread de fond
+        file_path = file_path or os.path.join(self.save_folder, 'game_save.bin')
+        SAVES.save(file_path, encode_snapshot(self), self._on_saved)
 
-    def save_game(self,file_path="game_save.json"):
+    def load_game(self):
+        save_file = os.path.join(self.save_folder, 'game_save.bin')
+        SAVES.flush()  # une sauvegarde encore en attente doit être relue
         try:
-            player_data = {
-                'score': self.score,
-                'level': self.level,
-                'lines': self.lines,
-                'grid': self.grid,
-                'difficulty': self.difficulty,
-                'fall_speed': self.fall_speed,
-                'paused' : False,
-            }
-
-            with open(file_path,'w') as save_file:
-                json.dump(player_data, save_file,indent=4)
-            print(f"Jeu sauvegardé avec succès dans ")
+            save_data = load_save(save_file)
+            if save_data is None:
+                print("Aucune sauvegarde trouvée.")
+                return False
+            if isinstance(save_data, dict):
+                # Ancienne sauvegarde JSON : grille et compteurs seulement
+                save_data = snapshot_from_json(save_data)
+            restore_snapshot(self, save_data)
         except Exception as e:
-            print(f"Erreur lors de la sauvegarde du jeu : {e}")
-
-    
-
-    def load_game(self):
-        save_file = os.path.join(self.save_folder, 'game_save.json')
-        if os.path.exists(save_file):
-            try:
-                with open(save_file, 'r') as f:
-                    save_data = json.load(f)
-                    self.score = save_data.get('score', 0)
-                    self.level = save_data.get('level', 1)
-                    self.board = save_data.get('board', [[0] * 10 for _ in range(20)])
-                    self.player_position = save_data.get('player_position', (0, 0))
-                print(f"Jeu chargé avec succès depuis {save_file}")
-            except Exception as e:
-                print(f"Erreur lors du chargement du jeu : {e}")
-        else:
-            print("Aucune sauvegarde trouvée.")
+            print(f"Erreur lors du chargement du jeu : {e}")
+            return False
+        # Le replay repart de l'état chargé
+        self.recorder = ReplayRecorder(self)
+        self.ui.invalidate()
+        print(f"Jeu chargé avec succès depuis {self.save_folder}")
+        return True
 
     def game_loop(self):
         # Exemple de boucle de jeu
@@ -402,61 +611,41 @@ class Tetris:
 
             pygame.display.update()
     
-    # def clear_lines(self):
-    #     lines_cleared = 0
-    #     for i in range(GRID_HEIGHT):
-    #         if all(self.grid[i]):
-    #             del self.grid[i]
-    #             self.grid.insert(0, [0 for _ in range(GRID_WIDTH)])
-    #             lines_cleared += 1
-        
-    #     if lines_cleared:
-    #         self.lines += lines_cleared
-    #         self.score += lines_cleared * 100 * self.level
-            
-    #         # Level progression and speed increase
-    #         new_level = self.lines // 10 + 1
-    #         if new_level > self.level:
-    #             self.level = new_level
-    #             speed_increase = DIFFICULTIES[self.difficulty]['speed_increase']
-    #             self.fall_speed = max(0.1, self.fall_speed - speed_increase)
-
-    def clear_lines(self):
-        lines_cleared = 0
-        for i in range(GRID_HEIGHT):
-            if all(self.grid[i]):
-                del self.grid[i]
-                self.grid.insert(0, [0 for _ in range(GRID_WIDTH)])
-                lines_cleared += 1
-        
-        if lines_cleared:
-            self.lines += lines_cleared
-            self.score += lines_cleared * 100 * self.level
-            
-            # Augmenter le niveau et réduire `fall_speed`
-            new_level = self.lines // 1 + 1  # Nouveau niveau après chaque 1 lignes
-            if new_level > self.level:
-                self.level = new_level
-                speed_increase = DIFFICULTIES[self.difficulty]['speed_increase']
-                self.fall_speed = max(0.1, self.fall_speed - speed_increase)
-                SOUNDS['level_up'].play()  # Jouer le son de progression de niveau
-
     def run(self):
-        fall_time = 0
-        
+        # Entrées, puis les pas de simulation dus (tetris_loop.FixedTimestep),
+        # puis un rendu au rythme que permet l'affichage
+        self.timestep.reset()
+        profiler = self.profiler
+        profiler.sources['input'] = self.input.report
+        if os.environ.get('TETRIS_PROFILE'):
+            profiler.enable()
+        pygame.event.set_blocked(None)
+        pygame.event.set_allowed(GAME_EVENTS)
         while True:
-            self.clock.tick(60)
-            if not self.paused:
-                fall_time += self.clock.get_rawtime()
+            self.clock.tick(RENDER_FPS)
+            if profiler.enabled:
+                profiler.next_frame()
             
+            now = time.perf_counter()
+            self.input.read(now)
+            mouse_pos = None
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
+                    self.stop_ai()
+                    self.export_placements()
+                    profiler.disable()
                     pygame.quit()
                     return
                 
+                if event.type == pygame.VIDEOEXPOSE:
+                    self.ui.invalidate()
+                
+                if event.type == pygame.WINDOWFOCUSLOST:
+                    self.input.reset()
+                
                 if event.type == pygame.MOUSEMOTION:
-                    for button in self.ui.buttons.values():
-                        button.is_hovered(event.pos)
+                    # Seule la dernière position de la frame compte pour le survol
+                    mouse_pos = event.pos
                 
                 if event.type == pygame.MOUSEBUTTONDOWN:
                     for name, button in self.ui.buttons.items():
@@ -464,8 +653,13 @@ class Tetris:
                             if name == 'pause':
                                 self.paused = not self.paused
                             elif name == 'restart':
+                                self.stop_ai()
+                                self.export_placements()
                                 self.reset_game()
                             elif name == 'quit':
+                                self.stop_ai()
+                                self.export_placements()
+                                profiler.disable()
                                 pygame.quit()
                                 return
                             elif name == 'save':
@@ -531,57 +725,87 @@ class Tetris:
 
 
                 if event.type == pygame.KEYDOWN:
-                    if not self.paused and not self.game_over:
-                        # Contrôles du jeu
-                        if event.key == pygame.K_LEFT:
-                            if self.is_valid_move(self.current_piece.shape,
-                                                self.current_piece.x - 1,
-                                                self.current_piece.y):
-                                self.current_piece.x -= 1
-                                SOUNDS['lateral_move'].play()
-                        elif event.key == pygame.K_RIGHT:
-                            if self.is_valid_move(self.current_piece.shape,
-                                                self.current_piece.x + 1,
-                                                self.current_piece.y):
-                                self.current_piece.x += 1
-                                SOUNDS['lateral_move'].play()
-                        elif event.key == pygame.K_DOWN:
-                            if self.is_valid_move(self.current_piece.shape,
-                                                self.current_piece.x,
-                                                self.current_piece.y + 1):
-                                self.current_piece.y += 1
-                                SOUNDS['drop'].play()
-                        elif event.key == pygame.K_UP:
-                            self.rotate_piece()
-                            SOUNDS['rotate'].play()
-                        elif event.key == pygame.K_SPACE:
-                            while self.is_valid_move(self.current_piece.shape,
-                                                self.current_piece.x,
-                                                self.current_piece.y + 1):
-                                self.current_piece.y += 1
-                            self.place_piece()
-                            SOUNDS['drop'].play()
+                    if event.key == pygame.K_a:
+                        if self.ai:
+                            self.stop_ai()
+                        else:
+                            self.ai = make_ai(self.difficulty)
+                    elif event.key == pygame.K_t:
+                        # Turbo : la simulation enchaîne les pas sans attendre le temps réel
+                        self.timestep.turbo = not self.timestep.turbo
+                    elif event.key == pygame.K_F3:
+                        profiler.toggle()
+                    # Contrôles du jeu (ignorés par le moteur en pause ou game over)
+                    action = KEY_ACTIONS.get(event.key)
+                    if action:
+                        self.input.press(action, now)
+                
+                if event.type == pygame.KEYUP:
+                    action = KEY_ACTIONS.get(event.key)
+                    if action:
+                        self.input.release(action, now)
             
-            # Chute automatique si pas en pause et pas game over
-            if fall_time >= self.fall_speed * 1000 and not self.paused and not self.game_over:
-                fall_time = 0
-                if self.is_valid_move(self.current_piece.shape,
-                                self.current_piece.x,
-                                self.current_piece.y + 1):
-                    self.current_piece.y += 1
-                else:
-                    self.place_piece()
+            if mouse_pos is not None:
+                for button in self.ui.buttons.values():
+                    button.is_hovered(mouse_pos)
+            
+            # Entrées avant la simulation : appuis de la frame, puis répétitions
+            # (DAS/ARR) échues
+            for action in self.input.poll(time.perf_counter()):
+                self.apply_action(action)
+            if profiler.enabled:
+                profiler.mark('events')
+            
+            # Simulation à pas fixe (IA, gravité, replay)
+            self.timestep.run(self.simulate_step)
+            if profiler.enabled:
+                profiler.mark('simulation')
             
             # Dessiner l'interface
-            self.ui.draw()
+            self.poll_saves(now)
+            self.ui.draw(self.timestep.alpha * self.timestep.dt)
+            self.input.displayed(time.perf_counter())
+            if profiler.enabled:
+                profiler.mark('draw')
             
             # Game over
             if self.game_over:
-                SOUNDS['game_over'].play()
+                ASSETS.play('game_over')
+                self.stop_ai()
+                profiler.disable()
                 break
+        pygame.event.set_allowed(None)
         # Écran de Game Over avec option de redémarrage
         self.game_over_screen()
 
+    def export_placements(self):
+        # Poses de la partie ajoutées au fragment courant (TETRIS_DATASET) : en
+        # fin de partie, au redémarrage et en quittant ; main() ferme le fragment
+        if self.place_listener is None or not len(self.place_listener):
+            return
+        try:
+            get_dataset().write(self.place_listener.drain())
+        except Exception as e:
+            print(f"Erreur lors de l'export des poses : {e}")
+
+    def record_score(self):
+        # Enregistre la partie terminée ; renvoie les lignes du classement à afficher
+        try:
+            scores = get_scores()
+            player = player_name()
+            scores.record(player, self.score, self.lines, self.level, self.difficulty)
+            lines = [f'Top {LEADERBOARD_SIZE} ({self.difficulty})']
+            for position, (username, score, *_) in enumerate(
+                    scores.top(LEADERBOARD_SIZE, self.difficulty), 1):
+                lines.append(f'{position}. {username}  {score}')
+            rank = scores.rank(player, self.difficulty)
+            if rank is not None:
+                lines.append(f'{player} : {rank[0]}e sur {rank[2]} (record {rank[1]})')
+            return lines
+        except Exception as e:
+            print(f"Erreur lors de l'enregistrement du score : {e}")
+            return []
+
     def game_over_screen(self):
         screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
         pygame.display.set_caption('Game Over')
@@ -599,6 +823,12 @@ class Tetris:
             'Quit', COLORS['button_difficulty']['hard']
         )
         
+        # Sauvegarde finale et replay, une seule fois (écrits en arrière-plan)
+        self.save_game()
+        self.save_replay()
+        self.export_placements()
+        leaderboard = self.record_score()
+        
         running = True
         while running:
             screen.fill(COLORS['background'])
@@ -613,13 +843,21 @@ class Tetris:
             score_rect = score_text.get_rect(center=(SCREEN_WIDTH // 2, 300))
             screen.blit(score_text, score_rect)
             
-            if self.game_over:
-                self.save_game()
+            # Sauvegarde finale et replay, une fois écrits
+            self.poll_saves(time.perf_counter())
+            if self.save_status is not None:
+                text = get_font(28).render(self.save_status[0], True, COLORS['text'])
+                screen.blit(text, text.get_rect(center=(SCREEN_WIDTH // 2, 350)))
             
             # Dessiner les boutons
             restart_button.draw(screen)
             quit_button.draw(screen)
             
+            # Classement
+            for i, line in enumerate(leaderboard):
+                text = get_font(28).render(line, True, COLORS['text'])
+                screen.blit(text, text.get_rect(center=(SCREEN_WIDTH // 2, 580 + i * 30)))
+            
             pygame.display.flip()
 
             for event in pygame.event.get():
@@ -633,22 +871,45 @@ class Tetris:
                 
                 if event.type == pygame.MOUSEBUTTONDOWN:
                     if restart_button.is_hovered(event.pos):
-                        SOUNDS['start'].play()
+                        ASSETS.play('start')
                         return main()
                     if quit_button.is_hovered(event.pos):
                         pygame.quit()
                         return
 
+# Profileur de frames (F3, ou TETRIS_PROFILE=1 / TETRIS_PROFILE=fichier.json au
+# lancement) : phases de Tetris.run, méthodes de rendu, IA, sons et compteurs.
+# Les métriques sont exportées toutes les 10 s par le thread de sauvegarde.
+_profile_path = os.environ.get('TETRIS_PROFILE')
+PROFILER = FrameProfiler(export_path=_profile_path if _profile_path not in (None, '', '1') else METRICS_FILE,
+                         writer=SAVES.save)
+for _method in ('_draw_grid', '_draw_ghost_piece', '_draw_current_piece', '_draw_falling_piece',
+                '_draw_next_piece', '_draw_stats', '_draw_game_messages'):
+    PROFILER.instrument(TetrisUI, _method)
+PROFILER.instrument(TetrisUI, '_text', 'font')
+PROFILER.instrument(Tetris, 'on_event', 'sound')
+PROFILER.instrument(TetrisAI, 'choose_move', 'ai')
+PROFILER.instrument(ParallelSearchAI, 'play', 'ai')
+PROFILER.instrument(Board, 'fits', 'collision_checks', count_only=True)
+PROFILER.instrument(Board, 'collides', 'collision_checks', count_only=True)
+PROFILER.instrument(pygame.draw, 'rect', 'draw_calls', count_only=True)
+PROFILER.instrument(pygame.display, 'update', 'display_updates', count_only=True)
+PROFILER.instrument(pygame.display, 'flip', 'display_updates', count_only=True)
+
 def main():
-    # Écran de sélection de difficulté
+    # Écran de sélection de difficulté ; les sons se chargent pendant ce temps
+    ASSETS.init_display()
+    ASSETS.preload()
     difficulty_select = DifficultySelect()
     difficulty = difficulty_select.run()
     
     if difficulty:
-        SOUNDS['start'].play()
+        ASSETS.play('start')
         game = Tetris(difficulty)
         game.run()
     
+    if DATASET is not None:
+        DATASET.close()
     pygame.quit()
 
 if __name__ == '__main__':
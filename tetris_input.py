@@ -0,0 +1,167 @@
+import argparse
+import os
+import time
+from collections import deque
+
+from tetris_loop import SIM_HZ
+from tetris_profiler import percentile
+
+# Entrées clavier du jeu, sans pygame : la boucle de jeu transmet les appuis
+# et relâchements avec leur date (time.perf_counter), puis demande à chaque
+# tour les actions dues. Une touche de déplacement maintenue se répète :
+#   - gauche / droite : délai avant répétition (DAS) puis une action toutes
+#     les ARR secondes ; la dernière direction appuyée l'emporte, et relâcher
+#     celle-ci rend la main à l'autre si elle est encore tenue (DAS relancé) ;
+#   - bas : répétition immédiate toutes les SOFT_DROP secondes.
+# Les répétitions sont datées à leur échéance exacte : une frame longue en
+# rattrape plusieurs d'un coup.
+#
+# Latence : chaque action renvoyée garde la date de lecture de l'événement qui
+# l'a produite (l'échéance pour une répétition) ; `displayed(t)` est appelé
+# après l'envoi de la frame à l'écran.
+# La borne haute ajoute le temps depuis la lecture précédente des événements :
+# un appui arrivé juste après celle-ci attend le tour suivant.
+
+DAS = 0.167  # 10 frames à 60 Hz
+ARR = 0.033  # 2 frames ; 0 : jusqu'au mur d'un coup
+SOFT_DROP = 0.033
+LATENCY_WINDOW = 600  # actions gardées pour les percentiles
+_WALL_MOVES = 20  # ARR nul : assez de décalages pour traverser la grille
+
+REPEATS = {'left': 'das', 'right': 'das', 'down': 'soft_drop'}
+
+def env_seconds(name, default):
+    # Réglage en millisecondes par variable d'environnement (TETRIS_DAS_MS...)
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    try:
+        return float(value) / 1000
+    except ValueError:
+        print(f"{name} ignoré : {value!r} n'est pas un nombre de millisecondes")
+        return default
+
+class InputHandler:
+    def __init__(self, das=DAS, arr=ARR, soft_drop=SOFT_DROP):
+        self.das = das
+        self.arr = arr
+        self.soft_drop = soft_drop
+        self._queue = []  # (action, date de lecture)
+        self._held = {}  # action répétable -> prochaine échéance
+        self._horizontal = []  # directions tenues, la plus récente en dernier
+        self._read_at = None  # dernière lecture des événements
+        self._previous_read = None
+        self._shown = []  # dates des actions pas encore affichées
+        self.latencies = deque(maxlen=LATENCY_WINDOW)  # lecture -> écran (s)
+        self.bounds = deque(maxlen=LATENCY_WINDOW)  # appui au plus tôt -> écran (s)
+
+    def reset(self):
+        # Touches oubliées (nouvelle partie, perte du focus)
+        self._queue.clear()
+        self._held.clear()
+        self._horizontal.clear()
+
+    def read(self, now):
+        # Début d'une lecture des événements de la frame
+        self._previous_read, self._read_at = self._read_at, now
+
+    def press(self, action, now):
+        self._queue.append((action, now))
+        kind = REPEATS.get(action)
+        if kind == 'das':
+            if action in self._horizontal:
+                self._horizontal.remove(action)
+            self._horizontal.append(action)
+            other = 'right' if action == 'left' else 'left'
+            self._held.pop(other, None)
+            self._held[action] = now + self.das
+        elif kind == 'soft_drop':
+            self._held[action] = now + self.soft_drop
+
+    def release(self, action, now):
+        self._held.pop(action, None)
+        if action in self._horizontal:
+            self._horizontal.remove(action)
+            if self._horizontal and self._horizontal[-1] not in self._held:
+                # L'autre direction encore tenue reprend, après un nouveau DAS
+                self._held[self._horizontal[-1]] = now + self.das
+
+    def poll(self, now):
+        # Actions dues à `now`, dans l'ordre : appuis lus puis répétitions échues
+        actions = [action for action, _ in self._queue]
+        stamps = [stamp for _, stamp in self._queue]
+        self._queue.clear()
+        for action, due in self._held.items():
+            interval = self.soft_drop if action == 'down' else self.arr
+            while due <= now:
+                if interval <= 0:
+                    actions.extend([action] * _WALL_MOVES)
+                    stamps.extend([due] * _WALL_MOVES)
+                    due = float('inf')
+                    break
+                actions.append(action)
+                stamps.append(due)
+                due += interval
+            self._held[action] = due
+        self._shown.extend(stamps)
+        return actions
+
+    def displayed(self, now):
+        # Appelé juste après l'envoi de la frame à l'écran
+        if not self._shown:
+            return
+        since = self._previous_read if self._previous_read is not None else self._read_at
+        for stamp in self._shown:
+            self.latencies.append(now - stamp)
+            self.bounds.append(now - min(stamp, since))
+        self._shown.clear()
+
+    def report(self):
+        # Percentiles et maximum en millisecondes
+        def stats(values):
+            return {
+                'p50': round(percentile(values, 50) * 1000, 3),
+                'p99': round(percentile(values, 99) * 1000, 3),
+                'max': round(max(values, default=0.0) * 1000, 3)
+            }
+        return {'actions': len(self.latencies), 'latency_ms': stats(self.latencies),
+                'worst_case_ms': stats(self.bounds)}
+
+    def summary_line(self):
+        report = self.report()
+        if not report['actions']:
+            return "entrées : aucune action mesurée"
+        latency, bound = report['latency_ms'], report['worst_case_ms']
+        return (f"entrées p99 {latency['p99']:.1f} ms, "
+                f"pire cas {bound['max']:.1f} ms / {1000 / SIM_HZ:.1f}")
+
+def main():
+    # Touche droite tenue `--hold` secondes, lue à la cadence d'affichage :
+    # dates des décalages produits
+    parser = argparse.ArgumentParser(description='Répétition des touches (DAS/ARR)')
+    parser.add_argument('--das', type=float, default=DAS * 1000, help='ms')
+    parser.add_argument('--arr', type=float, default=ARR * 1000, help='ms')
+    parser.add_argument('--hold', type=float, default=0.5, help='s')
+    parser.add_argument('--fps', type=float, default=144)
+    args = parser.parse_args()
+
+    handler = InputHandler(args.das / 1000, args.arr / 1000)
+    start = time.perf_counter()
+    handler.read(start)
+    handler.press('right', start)
+    moves = []
+    frame = 0
+    while True:
+        now = start + frame / args.fps
+        if now - start > args.hold:
+            break
+        handler.read(now)
+        moves += [round((now - start) * 1000, 1) for _ in handler.poll(now)]
+        frame += 1
+    handler.release('right', start + args.hold)
+    print(f"{len(moves)} décalages en {args.hold * 1000:.0f} ms (DAS {args.das:.0f} ms, "
+          f"ARR {args.arr:.0f} ms, lecture à {args.fps:.0f} Hz) :")
+    print(' '.join(f'{t:g}' for t in moves))
+
+if __name__ == '__main__':
+    main()
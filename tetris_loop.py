@@ -0,0 +1,111 @@
+import argparse
+import time
+
+from tetris_engine import DIFFICULTIES, TetrisEngine
+from tetris_ai import Heuristic, TetrisAI, load_weights
+from tetris_book import load_book
+
+# Boucle à pas de simulation fixe : la simulation avance par pas de 1/60 s
+# quel que soit le rythme de l'affichage. Le temps réel s'accumule et est
+# consommé par pas entiers ; le reste (`alpha`) sert à interpoler le rendu.
+# Sans pygame : le même ordonnanceur sert au jeu et aux simulations headless.
+
+SIM_HZ = 60
+# Pas rattrapés au plus par frame affichée ; au-delà le retard est abandonné
+# plutôt que de geler l'affichage (fenêtre déplacée, machine chargée)
+MAX_CATCH_UP = 5
+
+class FixedTimestep:
+    def __init__(self, hz=SIM_HZ, max_steps=MAX_CATCH_UP, clock=time.perf_counter):
+        self.dt = 1.0 / hz
+        self.max_steps = max_steps
+        self.clock = clock
+        self.turbo = False  # pas enchaînés sans attendre le temps réel
+        self.turbo_budget = 0.75 / hz  # temps de calcul par frame en mode turbo
+        self.steps = 0  # pas simulés depuis le départ
+        self.dropped = 0  # pas abandonnés par la limite de rattrapage
+        self.reset()
+
+    def reset(self):
+        # À appeler après une pause longue hors de la boucle (chargement, menu)
+        self.accumulator = 0.0
+        self._last = None
+
+    def advance(self):
+        # Nombre de pas dus depuis l'appel précédent
+        now = self.clock()
+        if self._last is not None:
+            self.accumulator += now - self._last
+        self._last = now
+        steps = int(self.accumulator / self.dt)
+        if steps > self.max_steps:
+            self.dropped += steps - self.max_steps
+            steps = self.max_steps
+        self.accumulator -= steps * self.dt
+        if self.accumulator > self.dt:
+            self.accumulator = self.accumulator % self.dt
+        self.steps += steps
+        return steps
+
+    @property
+    def alpha(self):
+        # Fraction du pas suivant déjà écoulée, entre 0 et 1
+        return min(self.accumulator / self.dt, 1.0)
+
+    def run(self, step):
+        # Appelle step() pour chaque pas dû ; en turbo, enchaîne les pas jusqu'à
+        # épuiser le budget de la frame. Renvoie le nombre de pas exécutés.
+        if not self.turbo:
+            steps = self.advance()
+            for _ in range(steps):
+                step()
+            return steps
+        clock = self.clock
+        deadline = clock() + self.turbo_budget
+        steps = 0
+        while True:
+            step()
+            steps += 1
+            if clock() >= deadline:
+                break
+        self.steps += steps
+        self.reset()
+        return steps
+
+def simulate(engine, steps=None, controller=None, dt=1.0 / SIM_HZ):
+    # Mode turbo headless : pas de simulation aussi vite que le CPU le permet,
+    # jusqu'à `steps` pas ou la fin de la partie. `controller(engine)` joue
+    # avant chaque pas (ex. TetrisAI.play). Renvoie le nombre de pas.
+    count = 0
+    while not engine.game_over and (steps is None or count < steps):
+        if controller is not None:
+            controller(engine)
+        engine.update(dt)
+        count += 1
+    return count
+
+def main():
+    parser = argparse.ArgumentParser(description='Simulation headless en mode turbo')
+    parser.add_argument('--steps', type=int, default=100000, help='pas de simulation (1/60 s)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--difficulty', choices=sorted(DIFFICULTIES), default='hard')
+    parser.add_argument('--bag', action='store_true', help='générateur de pièces en sac de 7')
+    args = parser.parse_args()
+
+    engine = TetrisEngine(args.difficulty, seed=args.seed, bag=args.bag)
+    bot = TetrisAI(Heuristic(load_weights()), book=load_book())
+    start = time.perf_counter()
+    steps = simulate(engine, args.steps, bot.play)
+    elapsed = time.perf_counter() - start
+    print(f"{steps} pas ({steps / SIM_HZ:.0f} s de jeu) en {elapsed:.2f} s : "
+          f"{steps / elapsed:.0f} pas/s, x{steps / SIM_HZ / elapsed:.0f} temps réel, "
+          f"{engine.pieces_placed} pièces, {engine.lines} lignes, score {engine.score}")
+    if bot.table is not None:
+        stats = bot.table.stats()
+        print(f"Table de transposition : {stats['hits']} succès, {stats['misses']} échecs "
+              f"({stats['hit_rate']:.0%}), {stats['size']} entrées")
+    if bot.book is not None:
+        print(f"Livre d'ouvertures : {bot.book.hits} coups servis, {bot.book.misses} recherches")
+
+if __name__ == '__main__':
+    main()
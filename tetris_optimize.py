@@ -0,0 +1,202 @@
+import argparse
+import json
+import math
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from tetris_engine import DIFFICULTIES
+from tetris_ai import DEFAULT_WEIGHTS, WEIGHTS_FILE
+from tetris_save import write_atomic
+from tetris_selfplay import SelfPlayConfig, init_worker, play_batch
+
+# Optimisation des poids de l'heuristique par algorithme génétique : chaque
+# candidat joue le même jeu de graines en parallèle, la population est
+# sauvegardée à chaque génération pour pouvoir reprendre. Une fitness ne vaut
+# que pour ses réglages de partie (difficulté, limite de pièces, anticipation) :
+# ils font partie de la clé du cache, et un checkpoint n'est repris qu'avec
+# les mêmes réglages.
+
+FEATURES = tuple(DEFAULT_WEIGHTS)
+CHECKPOINT_FILE = 'optimize_checkpoint.json'
+
+def normalize(vector):
+    # L'heuristique est linéaire : seule la direction du vecteur de poids compte
+    norm = math.sqrt(sum(w * w for w in vector)) or 1.0
+    return [round(w / norm, 6) for w in vector]
+
+def to_weights(vector):
+    return dict(zip(FEATURES, vector))
+
+def cache_key(vector, seeds, difficulty, max_pieces, lookahead):
+    return json.dumps([vector, list(seeds), difficulty, max_pieces, lookahead])
+
+class GeneticOptimizer:
+    def __init__(self, seeds, population_size=24, difficulty='hard', max_pieces=500,
+                 lookahead=False, offspring_ratio=0.3, mutation_rate=0.05,
+                 checkpoint=CHECKPOINT_FILE, rng_seed=0):
+        self.seeds = list(seeds)
+        self.population_size = population_size
+        self.difficulty = difficulty
+        self.max_pieces = max_pieces
+        self.lookahead = lookahead
+        self.offspring_ratio = offspring_ratio
+        self.mutation_rate = mutation_rate
+        self.checkpoint = checkpoint
+        self.rng = random.Random(rng_seed)
+        self.generation = 0
+        self.cache = {}  # cache_key(poids, graines, réglages) -> fitness
+        self.population = []
+
+    @property
+    def settings(self):
+        return {'difficulty': self.difficulty, 'max_pieces': self.max_pieces,
+                'lookahead': self.lookahead}
+
+    def key(self, vector):
+        return cache_key(vector, self.seeds, self.difficulty, self.max_pieces, self.lookahead)
+
+    def random_vector(self):
+        return normalize([self.rng.uniform(-1, 1) for _ in FEATURES])
+
+    def initialize(self):
+        # La population part des poids par défaut et de vecteurs aléatoires
+        self.population = [normalize([DEFAULT_WEIGHTS[name] for name in FEATURES])]
+        while len(self.population) < self.population_size:
+            self.population.append(self.random_vector())
+
+    # Checkpoint
+
+    def save(self):
+        state = {
+            'generation': self.generation,
+            'seeds': self.seeds,
+            'settings': self.settings,
+            'population': self.population,
+            'cache': self.cache,
+            'rng_state': self.rng.getstate()
+        }
+        write_atomic(self.checkpoint, json.dumps(state))
+
+    def load(self):
+        if not os.path.exists(self.checkpoint):
+            return False
+        with open(self.checkpoint, 'r') as f:
+            state = json.load(f)
+        if state.get('settings') != self.settings:
+            raise ValueError(f"{self.checkpoint} : réglages différents "
+                             f"({state.get('settings')} au lieu de {self.settings})")
+        self.generation = state['generation']
+        self.seeds = state['seeds']
+        self.population = state['population']
+        self.cache = state['cache']
+        version, internal, gauss = state['rng_state']
+        self.rng.setstate((version, tuple(internal), gauss))
+        return True
+
+    # Évaluation
+
+    def fitness(self, vector):
+        return self.cache[self.key(vector)]
+
+    def evaluate(self, pool, batch_size=2):
+        # Seuls les candidats absents du cache sont rejoués
+        pending = {}
+        for vector in self.population:
+            key = self.key(vector)
+            if key in self.cache or key in pending:
+                continue
+            config = SelfPlayConfig(difficulty=self.difficulty, weights=to_weights(vector),
+                                    lookahead=self.lookahead, max_pieces=self.max_pieces)
+            pending[key] = [pool.submit(play_batch, self.seeds[i:i + batch_size], config)
+                            for i in range(0, len(self.seeds), batch_size)]
+        games = 0
+        for key, futures in pending.items():
+            results = [result for future in futures for result in future.result()]
+            games += len(results)
+            self.cache[key] = sum(result.lines for result in results) / len(results)
+        return games
+
+    # Reproduction
+
+    def tournament(self, size):
+        contenders = self.rng.sample(self.population, min(size, len(self.population)))
+        contenders.sort(key=self.fitness, reverse=True)
+        return contenders[0], contenders[1]
+
+    def crossover(self, a, b):
+        # Moyenne pondérée par la fitness des deux parents
+        fa, fb = self.fitness(a), self.fitness(b)
+        total = fa + fb
+        if total == 0:
+            fa = fb = total = 1.0
+        child = [(wa * fa + wb * fb) / total for wa, wb in zip(a, b)]
+        if self.rng.random() < self.mutation_rate:
+            i = self.rng.randrange(len(child))
+            child[i] += self.rng.uniform(-0.2, 0.2)
+        return normalize(child)
+
+    def next_generation(self):
+        count = max(1, int(self.population_size * self.offspring_ratio))
+        tournament_size = max(2, self.population_size // 10)
+        children = [self.crossover(*self.tournament(tournament_size)) for _ in range(count)]
+        self.population.sort(key=self.fitness, reverse=True)
+        self.population = self.population[:-count] + children
+        self.generation += 1
+
+    def best(self):
+        return max(self.population, key=self.fitness)
+
+def save_weights(vector, file_path=WEIGHTS_FILE):
+    # Écriture atomique : le jeu peut relire les poids pendant l'optimisation
+    write_atomic(file_path, json.dumps(to_weights(vector), indent=4))
+
+def main():
+    parser = argparse.ArgumentParser(description="Optimisation génétique des poids de l'IA")
+    parser.add_argument('--generations', type=int, default=20)
+    parser.add_argument('--population', type=int, default=24)
+    parser.add_argument('--games', type=int, default=8, help='parties par candidat')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--max-pieces', type=int, default=500)
+    parser.add_argument('--difficulty', choices=sorted(DIFFICULTIES), default='hard')
+    parser.add_argument('--lookahead', action='store_true',
+                        help='évaluer avec anticipation de la pièce suivante (plus lent)')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--checkpoint', default=CHECKPOINT_FILE)
+    parser.add_argument('--output', default=WEIGHTS_FILE)
+    args = parser.parse_args()
+
+    optimizer = GeneticOptimizer(range(args.seed, args.seed + args.games), args.population,
+                                 args.difficulty, args.max_pieces, args.lookahead,
+                                 checkpoint=args.checkpoint, rng_seed=args.seed)
+    try:
+        resumed = optimizer.load()
+    except ValueError as e:
+        print(f"{e} ; autre --checkpoint ou mêmes réglages pour reprendre")
+        return
+    if resumed:
+        print(f"Reprise à la génération {optimizer.generation}")
+    else:
+        optimizer.initialize()
+
+    with ProcessPoolExecutor(max_workers=args.workers or os.cpu_count(),
+                             initializer=init_worker, initargs=(SelfPlayConfig(),)) as pool:
+        while True:
+            start = time.perf_counter()
+            games = optimizer.evaluate(pool)
+            elapsed = time.perf_counter() - start
+            best = optimizer.best()
+            print(f"Génération {optimizer.generation} : meilleure fitness "
+                  f"{optimizer.fitness(best):.1f} lignes, {games} parties, "
+                  f"{games / elapsed if elapsed else 0:.2f} parties/s")
+            save_weights(best, args.output)
+            if optimizer.generation >= args.generations:
+                optimizer.save()
+                break
+            optimizer.next_generation()
+            optimizer.save()
+    print(f"Meilleurs poids : {to_weights(best)} -> {args.output}")
+
+if __name__ == '__main__':
+    main()
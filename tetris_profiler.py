@@ -0,0 +1,187 @@
+import functools
+import json
+import time
+from collections import deque
+
+from tetris_save import write_atomic
+
+# Profileur de frames optionnel : durées nommées (spans) par frame, histogramme
+# glissant des temps de frame et compteurs d'appels. Les méthodes mesurées ne
+# sont remplacées par des versions chronométrées que pendant l'activation :
+# profileur éteint, le code instrumenté tourne sans aucun surcoût.
+
+METRICS_FILE = 'profile_metrics.json'
+DEFAULT_WINDOW = 600  # frames gardées dans l'histogramme (~4 s à 144 FPS)
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))]
+
+class FrameProfiler:
+    def __init__(self, window=DEFAULT_WINDOW, export_path=None, export_interval=10.0,
+                 writer=None):
+        self.enabled = False
+        self.window = window
+        self.export_path = export_path
+        self.export_interval = export_interval
+        # writer(chemin, données) ; par défaut écriture JSON atomique synchrone
+        self.writer = writer or (lambda path, data: write_atomic(path, json.dumps(data)))
+        self._targets = []  # (cible, attribut, nom, compteur seul)
+        self.sources = {}  # nom -> fonction renvoyant des mesures ajoutées au rapport
+        self._patched = []  # (cible, attribut, valeur d'origine dans __dict__ ou None)
+        self.reset()
+
+    def reset(self):
+        self.frame_times = deque(maxlen=self.window)
+        self.span_times = {}  # nom -> deque des durées par frame
+        self.counters = {}  # nom -> deque des comptes par frame
+        self.totals = {}  # nom -> compte depuis l'activation
+        self.frames = 0
+        self._spans = {}
+        self._counts = {}
+        self._frame_start = None
+        self._last_mark = None
+        self._next_export = None
+
+    # Instrumentation
+
+    def instrument(self, target, attribute, name=None, count_only=False):
+        # Déclare une fonction ou méthode à mesurer (span) ou seulement à compter ;
+        # `target` est une classe ou un module, le remplacement se fait à l'activation
+        self._targets.append((target, attribute, name or attribute, count_only))
+        if self.enabled:
+            self._patch(*self._targets[-1])
+
+    def _patch(self, target, attribute, name, count_only):
+        original = getattr(target, attribute)
+        spans, counts = self._spans, self._counts
+        perf_counter = time.perf_counter
+        if count_only:
+            @functools.wraps(original)
+            def wrapper(*args, **kwargs):
+                counts[name] = counts.get(name, 0) + 1
+                return original(*args, **kwargs)
+        else:
+            @functools.wraps(original)
+            def wrapper(*args, **kwargs):
+                start = perf_counter()
+                try:
+                    return original(*args, **kwargs)
+                finally:
+                    spans[name] = spans.get(name, 0.0) + perf_counter() - start
+        self._patched.append((target, attribute, vars(target).get(attribute)))
+        setattr(target, attribute, wrapper)
+
+    def enable(self):
+        if self.enabled:
+            return
+        self.reset()
+        for target in self._targets:
+            self._patch(*target)
+        self.enabled = True
+
+    def disable(self):
+        # Dernier export des mesures, puis retour aux méthodes d'origine
+        if not self.enabled:
+            return
+        self.enabled = False
+        if self.export_path and self.frames:
+            self.export()
+        for target, attribute, original in reversed(self._patched):
+            if original is None:
+                delattr(target, attribute)
+            else:
+                setattr(target, attribute, original)
+        self._patched = []
+
+    def toggle(self):
+        if self.enabled:
+            self.disable()
+        else:
+            self.enable()
+        return self.enabled
+
+    # Mesures de la boucle (à n'appeler que si `enabled`)
+
+    def next_frame(self):
+        # Appelé une fois par tour de boucle, juste après l'attente de la frame :
+        # clôt la frame précédente (le temps depuis la dernière marque compte
+        # comme 'wait') et ouvre la suivante
+        now = time.perf_counter()
+        if self._frame_start is not None:
+            self._spans['wait'] = self._spans.get('wait', 0.0) + now - self._last_mark
+            self._close_frame(now - self._frame_start)
+            if self.export_path and now >= self._next_export:
+                self.export()
+                self._next_export = now + self.export_interval
+        elif self._next_export is None:
+            self._next_export = now + self.export_interval
+        self._frame_start = self._last_mark = now
+
+    def mark(self, name):
+        # Le temps écoulé depuis la marque précédente est attribué au span `name`
+        now = time.perf_counter()
+        self._spans[name] = self._spans.get(name, 0.0) + now - self._last_mark
+        self._last_mark = now
+
+    def _close_frame(self, duration):
+        self.frames += 1
+        self.frame_times.append(duration)
+        # Un span ou compteur absent de la frame y vaut 0
+        for name in self._spans.keys() | self.span_times.keys():
+            history = self.span_times.get(name)
+            if history is None:
+                history = self.span_times[name] = deque(maxlen=self.window)
+            history.append(self._spans.get(name, 0.0))
+        for name in self._counts.keys() | self.counters.keys():
+            history = self.counters.get(name)
+            if history is None:
+                history = self.counters[name] = deque(maxlen=self.window)
+            value = self._counts.get(name, 0)
+            history.append(value)
+            self.totals[name] = self.totals.get(name, 0) + value
+        self._spans.clear()
+        self._counts.clear()
+
+    # Rapports
+
+    def report(self):
+        # Percentiles en millisecondes sur la fenêtre glissante
+        def stats(values):
+            return {
+                'p50': round(percentile(values, 50) * 1000, 3),
+                'p95': round(percentile(values, 95) * 1000, 3),
+                'p99': round(percentile(values, 99) * 1000, 3)
+            }
+        elapsed = sum(self.frame_times)
+        report = {
+            'time': time.time(),
+            'frames': self.frames,
+            'fps': round(len(self.frame_times) / elapsed, 1) if elapsed else 0.0,
+            'frame_ms': stats(self.frame_times),
+            'spans_ms': {name: stats(values) for name, values in self.span_times.items()},
+            'counters_per_frame': {name: round(sum(values) / len(values), 1)
+                                   for name, values in self.counters.items() if values},
+            'counters_total': dict(self.totals)
+        }
+        for name, source in self.sources.items():
+            report[name] = source()
+        return report
+
+    def summary_lines(self):
+        # Lignes courtes pour l'overlay à l'écran
+        report = self.report()
+        frame = report['frame_ms']
+        lines = [f"{report['fps']:.0f} FPS  frame p50 {frame['p50']:.1f} "
+                 f"p95 {frame['p95']:.1f} p99 {frame['p99']:.1f} ms"]
+        spans = sorted(report['spans_ms'].items(), key=lambda item: -item[1]['p95'])
+        for name, values in spans[:3]:
+            lines.append(f"{name} p95 {values['p95']:.2f} ms")
+        for name, value in sorted(report['counters_per_frame'].items()):
+            lines.append(f"{name} {value:g}/frame")
+        return lines
+
+    def export(self, file_path=None):
+        self.writer(file_path or self.export_path, self.report())
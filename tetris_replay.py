@@ -0,0 +1,218 @@
+import argparse
+import hashlib
+import struct
+import sys
+import time
+from bisect import bisect_right
+from dataclasses import dataclass, field
+from typing import List, Tuple
+
+from tetris_engine import ACTIONS, PIECE_TYPES, TetrisEngine
+from tetris_snapshot import encode_snapshot, restore_snapshot
+
+# Enregistrement des parties sous forme de journal (frame, action) et relecture
+# headless à vitesse maximale. Le journal part d'un instantané de l'état initial
+# (tetris_snapshot.py) ; la gravité y figure comme une action 'tick'. Des
+# instantanés réguliers (keyframes) permettent de sauter à n'importe quelle frame.
+#
+# Format (version 1) : b'TRPL', version, instantané initial, événements
+# (varint (écart de frame << 3) | action), keyframes (frame, indice du premier
+# événement suivant, instantané), puis frame finale, score et hash du plateau.
+
+REPLAY_MAGIC = b'TRPL'
+REPLAY_VERSION = 1
+REPLAY_ACTIONS = ACTIONS + ('tick',)
+# Une keyframe toutes les 10 secondes à 60 FPS
+KEYFRAME_INTERVAL = 600
+
+_ACTION_CODES = {action: i for i, action in enumerate(REPLAY_ACTIONS)}
+_TYPE_CODES = {piece_type: i + 1 for i, piece_type in enumerate(PIECE_TYPES)}
+
+def board_hash(board) -> bytes:
+    # Empreinte de 8 octets du plateau (bitboard et couleurs)
+    digest = hashlib.blake2b(digest_size=8)
+    digest.update(struct.pack(f'<{len(board.rows)}H', *board.rows))
+    digest.update(bytes(_TYPE_CODES.get(cell, 0) for row in board.colors for cell in row))
+    return digest.digest()
+
+def _write_varint(out, value):
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+def _read_varint(data, offset):
+    value = shift = 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, offset
+        shift += 7
+
+@dataclass
+class Replay:
+    start: bytes  # instantané de l'état initial
+    events: List[Tuple[int, int]] = field(default_factory=list)  # (frame, code d'action)
+    keyframes: List[Tuple[int, int, bytes]] = field(default_factory=list)  # (frame, indice, instantané)
+    frames: int = 0
+    score: int = 0
+    board_hash: bytes = b''
+
+    def to_bytes(self) -> bytes:
+        out = bytearray(REPLAY_MAGIC)
+        out.append(REPLAY_VERSION)
+        _write_varint(out, len(self.start))
+        out += self.start
+        _write_varint(out, len(self.events))
+        previous = 0
+        for frame, code in self.events:
+            _write_varint(out, (frame - previous) << 3 | code)
+            previous = frame
+        _write_varint(out, len(self.keyframes))
+        for frame, index, snapshot in self.keyframes:
+            _write_varint(out, frame)
+            _write_varint(out, index)
+            _write_varint(out, len(snapshot))
+            out += snapshot
+        _write_varint(out, self.frames)
+        _write_varint(out, self.score)
+        out += self.board_hash
+        return bytes(out)
+
+    @classmethod
+    def from_bytes(cls, data):
+        if data[:4] != REPLAY_MAGIC:
+            raise ValueError("Ce fichier n'est pas un replay")
+        if data[4] != REPLAY_VERSION:
+            raise ValueError(f"Version de replay non prise en charge : {data[4]}")
+        size, offset = _read_varint(data, 5)
+        replay = cls(bytes(data[offset:offset + size]))
+        offset += size
+        count, offset = _read_varint(data, offset)
+        frame = 0
+        events = replay.events
+        for _ in range(count):
+            value, offset = _read_varint(data, offset)
+            frame += value >> 3
+            events.append((frame, value & 7))
+        count, offset = _read_varint(data, offset)
+        for _ in range(count):
+            frame, offset = _read_varint(data, offset)
+            index, offset = _read_varint(data, offset)
+            size, offset = _read_varint(data, offset)
+            replay.keyframes.append((frame, index, bytes(data[offset:offset + size])))
+            offset += size
+        replay.frames, offset = _read_varint(data, offset)
+        replay.score, offset = _read_varint(data, offset)
+        replay.board_hash = bytes(data[offset:offset + 8])
+        return replay
+
+class ReplayRecorder:
+    # Le frontend appelle record() pour chaque action acceptée par le moteur
+    # (touches, IA, gravité) puis next_frame() une fois par frame
+    def __init__(self, engine, keyframe_interval=KEYFRAME_INTERVAL):
+        self.replay = Replay(encode_snapshot(engine))
+        self.keyframe_interval = keyframe_interval
+        self.frame = 0
+        self._last_keyframe = 0
+
+    def record(self, action):
+        self.replay.events.append((self.frame, _ACTION_CODES[action]))
+
+    def next_frame(self, engine):
+        # L'état à la fin de la frame sert de keyframe à intervalle régulier
+        if self.frame - self._last_keyframe >= self.keyframe_interval:
+            self.replay.keyframes.append((self.frame, len(self.replay.events),
+                                          encode_snapshot(engine)))
+            self._last_keyframe = self.frame
+        self.frame += 1
+
+    def finish(self, engine) -> bytes:
+        replay = self.replay
+        replay.frames = self.frame
+        replay.score = engine.score
+        replay.board_hash = board_hash(engine.board)
+        return replay.to_bytes()
+
+class ReplayPlayer:
+    # Rejoue un journal dans un moteur headless, sans cadence d'affichage
+    def __init__(self, replay, engine=None):
+        self.replay = replay if isinstance(replay, Replay) else Replay.from_bytes(replay)
+        self.engine = engine or TetrisEngine()
+        self._keyframe_frames = [frame for frame, _, _ in self.replay.keyframes]
+        self.rewind()
+
+    def rewind(self):
+        restore_snapshot(self.engine, self.replay.start)
+        self.index = 0
+        self.frame = 0
+
+    def play_to(self, frame):
+        # Applique tous les événements jusqu'à la frame `frame` incluse
+        events = self.replay.events
+        engine = self.engine
+        index = self.index
+        while index < len(events) and events[index][0] <= frame:
+            action = REPLAY_ACTIONS[events[index][1]]
+            if action == 'tick':
+                engine.tick()
+            else:
+                engine.apply_action(action)
+            index += 1
+        self.index = index
+        self.frame = frame
+        return engine
+
+    def seek(self, frame):
+        # Repart de la dernière keyframe avant `frame` (ou du début) puis rejoue ;
+        # en avant, la position courante est gardée si elle est plus proche
+        i = bisect_right(self._keyframe_frames, frame) - 1
+        if i >= 0:
+            keyframe, index, snapshot = self.replay.keyframes[i]
+            if frame < self.frame or keyframe > self.frame:
+                restore_snapshot(self.engine, snapshot)
+                self.index = index
+                self.frame = keyframe
+        elif frame < self.frame:
+            self.rewind()
+        return self.play_to(frame)
+
+    def run(self):
+        return self.play_to(self.replay.frames)
+
+    def verify(self):
+        # Rejoue toute la partie et compare le score et le plateau enregistrés
+        engine = self.run()
+        return (engine.score == self.replay.score and
+                board_hash(engine.board) == self.replay.board_hash)
+
+def main():
+    parser = argparse.ArgumentParser(description="Relecture headless d'un replay")
+    parser.add_argument('replay', help='fichier de replay (saves/last_replay.bin)')
+    parser.add_argument('--seek', type=int, default=None, help="frame à atteindre au lieu de la fin")
+    args = parser.parse_args()
+
+    with open(args.replay, 'rb') as f:
+        player = ReplayPlayer(f.read())
+    replay = player.replay
+    start = time.perf_counter()
+    if args.seek is not None:
+        engine = player.seek(args.seek)
+        ok = True
+    else:
+        ok = player.verify()
+        engine = player.engine
+    elapsed = time.perf_counter() - start
+    print(f"{len(replay.events)} événements, {replay.frames} frames, {len(replay.keyframes)} keyframes "
+          f"rejoués en {elapsed * 1000:.1f} ms : frame {player.frame}, score {engine.score}, "
+          f"lignes {engine.lines}")
+    if not ok:
+        print(f"Replay non conforme : score attendu {replay.score} ou plateau différent")
+        sys.exit(1)
+    if args.seek is None:
+        print("Replay vérifié : score et plateau identiques")
+
+if __name__ == '__main__':
+    main()
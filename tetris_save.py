@@ -0,0 +1,123 @@
+import atexit
+import json
+import os
+import threading
+import time
+
+# Sauvegardes écrites sur un thread de fond : le thread de rendu ne touche
+# jamais le disque. Les demandes rapprochées pour un même fichier sont
+# regroupées, une sauvegarde identique à la précédente n'est pas réécrite,
+# et chaque fichier est remplacé atomiquement (fichier temporaire + rename).
+
+SAVE_FOLDER = 'saves'
+# Instantané binaire (tetris_snapshot.py)
+SAVE_FILE = os.path.join(SAVE_FOLDER, 'game_save.bin')
+# Ancienne sauvegarde JSON du répertoire courant, encore lue au chargement
+LEGACY_SAVE_FILE = 'game_save.json'
+# Replay de la dernière partie (tetris_replay.py)
+REPLAY_FILE = os.path.join(SAVE_FOLDER, 'last_replay.bin')
+
+def write_atomic(file_path, payload):
+    folder = os.path.dirname(file_path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    tmp_path = file_path + '.tmp'
+    mode = 'wb' if isinstance(payload, bytes) else 'w'
+    with open(tmp_path, mode) as f:
+        f.write(payload)
+    os.replace(tmp_path, file_path)
+
+class SaveManager:
+    def __init__(self, debounce=0.5):
+        self.debounce = debounce
+        self._pending = {}  # chemin -> [échéance, données, callbacks]
+        self._written = {}  # chemin -> dernier contenu écrit
+        self._writing = 0
+        self._closed = False
+        self._condition = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name='tetris-save', daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def save(self, file_path, data, callback=None):
+        # `data` doit être un instantané (copie) : il est sérialisé plus tard.
+        # callback(file_path, erreur ou None) est appelé depuis le thread de fond.
+        with self._condition:
+            entry = self._pending.get(file_path)
+            if entry is None:
+                entry = self._pending[file_path] = [time.monotonic() + self.debounce, None, []]
+            entry[1] = data
+            if callback is not None and callback not in entry[2]:
+                entry[2].append(callback)
+            self._condition.notify()
+
+    def flush(self, timeout=None):
+        # Écrit tout de suite ce qui est en attente et attend la fin des écritures
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            for entry in self._pending.values():
+                entry[0] = 0
+            self._condition.notify()
+            while self._pending or self._writing:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+        return True
+
+    def close(self):
+        if self._closed:
+            return
+        self.flush()
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while True:
+                    if self._closed and not self._pending:
+                        return
+                    now = time.monotonic()
+                    due = [path for path, entry in self._pending.items() if entry[0] <= now]
+                    if due:
+                        break
+                    timeout = min((entry[0] for entry in self._pending.values()),
+                                  default=now + 1.0) - now
+                    self._condition.wait(max(timeout, 0.001))
+                jobs = []
+                for path in due:
+                    _, data, callbacks = self._pending.pop(path)
+                    jobs.append((path, data, callbacks))
+                self._writing += 1
+            try:
+                for file_path, data, callbacks in jobs:
+                    error = None
+                    try:
+                        payload = data if isinstance(data, bytes) else json.dumps(data)
+                        if self._written.get(file_path) != payload:
+                            write_atomic(file_path, payload)
+                            self._written[file_path] = payload
+                    except Exception as e:
+                        error = e
+                    for callback in callbacks:
+                        callback(file_path, error)
+            finally:
+                with self._condition:
+                    self._writing -= 1
+                    self._condition.notify_all()
+
+def load_save(file_path=SAVE_FILE):
+    # Instantané (bytes), ancienne sauvegarde JSON (dict) à côté ou dans le
+    # répertoire courant, ou None
+    json_path = os.path.splitext(file_path)[0] + '.json'
+    for path in (file_path, json_path, LEGACY_SAVE_FILE):
+        if os.path.exists(path):
+            if path.endswith('.json'):
+                with open(path, 'r') as f:
+                    return json.load(f)
+            with open(path, 'rb') as f:
+                return f.read()
+    return None
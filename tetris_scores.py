@@ -0,0 +1,271 @@
+import argparse
+import getpass
+import json
+import os
+import random
+import sqlite3
+import tempfile
+import time
+from dataclasses import dataclass
+
+from tetris_engine import DIFFICULTIES
+from tetris_save import SAVE_FOLDER
+
+# Classement des parties terminées dans une base SQLite locale. Chaque partie
+# est une ligne de `games` (index sur le score, la difficulté et la date) ; la
+# table `bests` garde le record de chaque joueur par difficulté ('*' : toutes),
+# si bien que le rang d'un joueur se compte sur une table d'une ligne par
+# joueur. Les insertions sont mises en lot et écrites dans une seule
+# transaction. L'ancien `users.json` est importé une fois, à la création.
+
+SCORES_DB = os.path.join(SAVE_FOLDER, 'scores.db')
+USERS_FILE = 'users.json'
+ALL_DIFFICULTIES = '*'
+BATCH_SIZE = 64  # parties gardées en mémoire avant écriture
+DEFAULT_PLAYER = 'player'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY,
+    username TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS games (
+    id INTEGER PRIMARY KEY,
+    user_id INTEGER NOT NULL REFERENCES users(id),
+    score INTEGER NOT NULL,
+    lines INTEGER NOT NULL DEFAULT 0,
+    level INTEGER NOT NULL DEFAULT 1,
+    difficulty TEXT NOT NULL,
+    played_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS games_score ON games(score DESC);
+CREATE INDEX IF NOT EXISTS games_difficulty_score ON games(difficulty, score DESC);
+CREATE INDEX IF NOT EXISTS games_played_at ON games(played_at);
+CREATE INDEX IF NOT EXISTS games_user ON games(user_id, score DESC);
+CREATE TABLE IF NOT EXISTS bests (
+    user_id INTEGER NOT NULL REFERENCES users(id),
+    difficulty TEXT NOT NULL,
+    score INTEGER NOT NULL,
+    PRIMARY KEY (user_id, difficulty)
+);
+CREATE INDEX IF NOT EXISTS bests_difficulty_score ON bests(difficulty, score DESC);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+def player_name():
+    # TETRIS_USER, sinon le compte système ; getpass.getuser() échoue sans
+    # variable LOGNAME/USER ni entrée dans la base des comptes (conteneurs)
+    name = os.environ.get('TETRIS_USER')
+    if name:
+        return name
+    try:
+        return getpass.getuser() or DEFAULT_PLAYER
+    except (KeyError, OSError, ImportError):
+        return DEFAULT_PLAYER
+
+@dataclass
+class GameRecord:
+    username: str
+    score: int
+    lines: int = 0
+    level: int = 1
+    difficulty: str = 'medium'
+    played_at: float = 0.0
+
+class ScoreStore:
+    def __init__(self, path=SCORES_DB, users_file=USERS_FILE, batch_size=BATCH_SIZE):
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        self.path = path
+        self.batch_size = batch_size
+        self.conn = sqlite3.connect(path)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.executescript(SCHEMA)
+        self._pending = []
+        self._user_ids = {}
+        if users_file:
+            self.migrate_users(users_file)
+
+    def close(self):
+        self.flush()
+        self.conn.close()
+
+    # Écriture
+
+    def record(self, username, score, lines=0, level=1, difficulty='medium', played_at=None):
+        # Mise en lot ; écrite au prochain flush() ou quand le lot est plein
+        self._pending.append(GameRecord(username, int(score), int(lines), int(level),
+                                        difficulty, played_at or time.time()))
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        # Le lot ne quitte la mémoire qu'une fois la transaction validée
+        if not self._pending:
+            return 0
+        games = self._pending
+        self._write(games)
+        self._pending = []
+        return len(games)
+
+    def _write(self, games, meta=None, users=()):
+        # Une seule transaction pour tout le lot (joueurs sans partie et clé
+        # `meta` éventuels compris)
+        try:
+            with self.conn:
+                for username in users:
+                    self._user_id(username)
+                rows = [(self._user_id(game.username), game.score, game.lines, game.level,
+                         game.difficulty, game.played_at) for game in games]
+                self.conn.executemany(
+                    'INSERT INTO games (user_id, score, lines, level, difficulty, played_at) '
+                    'VALUES (?, ?, ?, ?, ?, ?)', rows)
+                bests = [(row[0], row[4], row[1]) for row in rows]
+                bests += [(row[0], ALL_DIFFICULTIES, row[1]) for row in rows]
+                self.conn.executemany(
+                    'INSERT INTO bests (user_id, difficulty, score) VALUES (?, ?, ?) '
+                    'ON CONFLICT(user_id, difficulty) DO UPDATE SET score = MAX(score, excluded.score)',
+                    bests)
+                if meta is not None:
+                    self.conn.execute('INSERT INTO meta (key, value) VALUES (?, ?)', meta)
+        except sqlite3.Error:
+            # Les joueurs créés dans la transaction annulée n'existent plus
+            self._user_ids.clear()
+            raise
+
+    def _user_id(self, username):
+        # À appeler dans une transaction
+        user_id = self._user_ids.get(username)
+        if user_id is None:
+            self.conn.execute('INSERT OR IGNORE INTO users (username) VALUES (?)', (username,))
+            user_id = self.conn.execute('SELECT id FROM users WHERE username = ?',
+                                        (username,)).fetchone()[0]
+            self._user_ids[username] = user_id
+        return user_id
+
+    def migrate_users(self, users_file):
+        # Import unique de l'ancien users.json ([{username, scores}]) ; les scores
+        # sont des entiers ou des objets {score, lines, level, difficulty, date}
+        done = self.conn.execute("SELECT 1 FROM meta WHERE key = 'users_json'").fetchone()
+        if done or not os.path.exists(users_file):
+            return 0
+        try:
+            with open(users_file, 'r') as f:
+                users = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Erreur lors de la lecture de {users_file} : {e}")
+            return 0
+        games = []
+        usernames = []
+        mtime = os.path.getmtime(users_file)
+        for user in users:
+            username = user.get('username')
+            if not username:
+                continue
+            usernames.append(username)
+            for entry in user.get('scores') or []:
+                if not isinstance(entry, dict):
+                    entry = {'score': entry}
+                games.append(GameRecord(
+                    username, int(entry.get('score', 0)), int(entry.get('lines', 0)),
+                    int(entry.get('level', 1)), entry.get('difficulty', 'medium'),
+                    float(entry.get('date', mtime))))
+        # Les parties importées et le marqueur sont validés ensemble : après un
+        # échec, l'import est refait à la prochaine ouverture
+        self._write(games, ('users_json', str(time.time())), usernames)
+        print(f"{len(users)} joueurs et {len(games)} scores importés depuis {users_file}")
+        return len(games)
+
+    # Lecture (les parties en attente sont écrites d'abord)
+
+    def top(self, n=10, difficulty=None):
+        # Meilleures parties : [(username, score, lines, level, difficulty, played_at)]
+        self.flush()
+        if difficulty:
+            query = ('SELECT u.username, g.score, g.lines, g.level, g.difficulty, g.played_at '
+                     'FROM games g JOIN users u ON u.id = g.user_id '
+                     'WHERE g.difficulty = ? ORDER BY g.score DESC LIMIT ?')
+            return self.conn.execute(query, (difficulty, n)).fetchall()
+        query = ('SELECT u.username, g.score, g.lines, g.level, g.difficulty, g.played_at '
+                 'FROM games g JOIN users u ON u.id = g.user_id '
+                 'ORDER BY g.score DESC LIMIT ?')
+        return self.conn.execute(query, (n,)).fetchall()
+
+    def rank(self, username, difficulty=None):
+        # (rang, record, joueurs classés) du joueur selon son record, ou None
+        self.flush()
+        difficulty = difficulty or ALL_DIFFICULTIES
+        row = self.conn.execute(
+            'SELECT b.score FROM bests b JOIN users u ON u.id = b.user_id '
+            'WHERE u.username = ? AND b.difficulty = ?', (username, difficulty)).fetchone()
+        if row is None:
+            return None
+        best = row[0]
+        above, total = self.conn.execute(
+            'SELECT (SELECT COUNT(*) FROM bests WHERE difficulty = ?1 AND score > ?2), '
+            '(SELECT COUNT(*) FROM bests WHERE difficulty = ?1)', (difficulty, best)).fetchone()
+        return above + 1, best, total
+
+def benchmark(games, players, queries=1000, seed=0):
+    # Base temporaire remplie de parties aléatoires ; temps d'insertion et des requêtes
+    rng = random.Random(seed)
+    with tempfile.TemporaryDirectory() as folder:
+        store = ScoreStore(os.path.join(folder, 'scores.db'), users_file=None, batch_size=1000)
+        usernames = [f'joueur-{i}' for i in range(players)]
+        start = time.perf_counter()
+        for _ in range(games):
+            store.record(rng.choice(usernames), int(rng.expovariate(1 / 5000)),
+                         rng.randrange(200), rng.randrange(1, 15), rng.choice(list(DIFFICULTIES)),
+                         time.time() - rng.random() * 3e7)
+        store.flush()
+        elapsed = time.perf_counter() - start
+        print(f"{games} parties insérées en {elapsed:.2f} s ({games / elapsed:.0f}/s)")
+        for name, query in (('top 10', lambda: store.top(10)),
+                            ('top 10 hard', lambda: store.top(10, 'hard')),
+                            ('rang', lambda: store.rank(rng.choice(usernames))),
+                            ('rang hard', lambda: store.rank(rng.choice(usernames), 'hard'))):
+            start = time.perf_counter()
+            for _ in range(queries):
+                query()
+            print(f"{name:<12} {(time.perf_counter() - start) / queries * 1e6:8.1f} µs")
+        store.close()
+
+def main():
+    parser = argparse.ArgumentParser(description='Classement des parties (SQLite)')
+    parser.add_argument('command', choices=('top', 'rank', 'bench'))
+    parser.add_argument('username', nargs='?', help='joueur (commande rank)')
+    parser.add_argument('--difficulty', choices=sorted(DIFFICULTIES), default=None)
+    parser.add_argument('-n', type=int, default=10, help='nombre de parties (commande top)')
+    parser.add_argument('--db', default=SCORES_DB)
+    parser.add_argument('--games', type=int, default=100000, help='parties générées (commande bench)')
+    parser.add_argument('--players', type=int, default=1000, help='joueurs générés (commande bench)')
+    args = parser.parse_args()
+
+    if args.command == 'bench':
+        benchmark(args.games, args.players)
+        return
+    store = ScoreStore(args.db)
+    if args.command == 'top':
+        for position, (username, score, lines, level, difficulty, played_at) in enumerate(
+                store.top(args.n, args.difficulty), 1):
+            date = time.strftime('%Y-%m-%d', time.localtime(played_at))
+            print(f"{position:>3}. {username:<16} {score:>8} {lines:>4} lignes  niveau {level:<3} "
+                  f"{difficulty:<7} {date}")
+    else:
+        if not args.username:
+            parser.error('rank : joueur manquant')
+        result = store.rank(args.username, args.difficulty)
+        if result is None:
+            print(f"Aucune partie pour {args.username}")
+        else:
+            position, best, total = result
+            print(f"{args.username} : {position}e sur {total} (record {best})")
+    store.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,403 @@
+import argparse
+import os
+import struct
+import time
+from concurrent.futures import ProcessPoolExecutor, wait
+from dataclasses import dataclass
+
+from tetris_engine import DIFFICULTIES, GRID_HEIGHT, Board, TetrisEngine, zobrist_hash
+from tetris_ai import (LINE_KEYS, Heuristic, Placement, TetrisAI, TranspositionTable,
+                       apply_placement, drop_placements, enumerate_placements, load_weights,
+                       placement_zobrist)
+from tetris_book import BOOK_FILE, load_book
+from tetris_profiler import percentile
+
+# Recherche parallèle d'un coup : les poses racines de la pièce courante sont
+# réparties entre les processus d'un pool persistant. Chaque processus reçoit
+# un instantané compact du plateau (20 lignes sur 16 bits) et la liste de ses
+# racines, puis renvoie la meilleure feuille sous chacune en posant, dans
+# l'ordre, la pièce suivante et les aperçus. La recherche s'approfondit d'une
+# pièce à la fois (profondeur 1 : pièce courante seule) tant que l'échéance
+# n'est pas atteinte ; le coup rendu est celui de la dernière profondeur
+# terminée. Les racines sont envoyées de la meilleure à la moins bonne selon
+# la profondeur précédente.
+#
+# Dans la boucle de jeu (play), seule la profondeur 1 est calculée sur place :
+# les profondeurs suivantes tournent dans le pool pendant que le jeu continue,
+# et leurs tâches sont relevées sans attente à chaque pas de simulation.
+#
+# L'échéance est une date time.monotonic() : la même horloge système dans
+# tous les processus.
+
+DEFAULT_DEPTH = 4  # pièce courante, suivante et deux aperçus
+DEADLINE_MARGIN = 0.8  # part de `fall_speed` accordée à la recherche
+CHUNKS_PER_WORKER = 2
+
+_ROWS = struct.Struct(f'<{GRID_HEIGHT}H')
+
+@dataclass
+class SearchReport:
+    depth: int  # dernière profondeur terminée
+    nodes: int  # poses générées, profondeurs abandonnées comprises
+    elapsed: float  # latence de la décision (s)
+    roots: int
+    timed_out: bool  # une profondeur a été abandonnée à l'échéance
+    book: bool = False  # coup du livre d'ouvertures, sans recherche
+
+    @property
+    def nodes_per_sec(self):
+        return self.nodes / self.elapsed if self.elapsed else 0.0
+
+# État propre à chaque processus de travail
+_worker = {}
+
+def init_worker(heuristic, table_size, subtrees=True):
+    _worker['heuristic'] = heuristic
+    _worker['table'] = TranspositionTable(table_size) if table_size else None
+    _worker['subtrees'] = subtrees
+
+def _ready(_):
+    return os.getpid()
+
+def search_roots(snapshot, piece_type, roots, pieces, deadline):
+    # Exécuté dans un processus de travail : meilleure feuille sous chaque racine
+    # (index, x, y, rotation) en posant `pieces` dans l'ordre. Renvoie
+    # ({index: score}, poses générées, terminé avant l'échéance).
+    # Un nœud de profondeur 1 (racine puis pièce suivante) est souvent atteint
+    # depuis plusieurs racines (~20 % des nœuds : mêmes cases par deux poses) :
+    # la valeur de son sous-arbre est gardée le temps de l'appel et un nœud
+    # déjà vu n'est pas redéveloppé : 25 à 30 % de nœuds en moins à trois ou
+    # quatre pièces (bench search_depth3).
+    heuristic = _worker['heuristic']
+    table = _worker['table']
+    subtrees = {} if _worker['subtrees'] else None  # clé du nœud -> meilleure feuille
+    rows = list(_ROWS.unpack(snapshot))
+    zobrist = zobrist_hash(rows)
+    last = len(pieces) - 1
+    scores = {}
+    nodes = 0
+    for index, x, y, rotation in roots:
+        placement = Placement(piece_type, x, y, rotation, ())
+        root_rows, cleared = apply_placement(rows, placement)
+        root_zobrist = placement_zobrist(zobrist, rows, placement)
+        if root_zobrist is None:
+            root_zobrist = zobrist_hash(root_rows)
+        best = float('-inf')
+        pending = {}  # clé -> indice dans le lot à noter
+        pending_rows, pending_lines = [], []
+        # Nœuds de profondeur 1 développés sous cette racine : clé -> sous-arbre ;
+        # par sous-arbre, meilleure feuille trouvée en table et indices de ses
+        # feuilles dans le lot
+        opened = {}
+        known, leaves = [], []
+        # Arbre de pur maximum : la valeur d'une racine est la meilleure de toutes
+        # ses feuilles, parcourues en profondeur puis notées en un seul lot
+        stack = [(root_rows, root_zobrist, cleared, 0, None)]
+        while stack:
+            if time.monotonic() > deadline:
+                return scores, nodes, False
+            node_rows, node_zobrist, lines, level, owner = stack.pop()
+            board = Board.from_rows(node_rows, node_zobrist)
+            for leaf in drop_placements(board, pieces[level]):
+                nodes += 1
+                next_zobrist = placement_zobrist(node_zobrist, node_rows, leaf)
+                next_rows = None
+                if level < last or next_zobrist is None:
+                    next_rows, next_cleared = apply_placement(node_rows, leaf)
+                    if next_rows is None:
+                        continue
+                    lines_after = lines + next_cleared
+                    if next_zobrist is None:
+                        next_zobrist = zobrist_hash(next_rows)
+                else:
+                    lines_after = lines
+                key = next_zobrist ^ LINE_KEYS[lines_after]
+                if level < last:
+                    if level or subtrees is None:
+                        stack.append((next_rows, next_zobrist, lines_after, level + 1, owner))
+                        continue
+                    value = subtrees.get(key)
+                    if value is not None:
+                        best = max(best, value)
+                    elif key not in opened:
+                        opened[key] = len(known)
+                        stack.append((next_rows, next_zobrist, lines_after, 1, len(known)))
+                        known.append(float('-inf'))
+                        leaves.append([])
+                    continue
+                i = pending.get(key)
+                if i is not None:
+                    if owner is not None:
+                        leaves[owner].append(i)
+                    continue
+                score = table.get(key) if table is not None else None
+                if score is not None:
+                    if owner is None:
+                        best = max(best, score)
+                    elif score > known[owner]:
+                        known[owner] = score
+                    continue
+                if next_rows is None:
+                    next_rows, _ = apply_placement(node_rows, leaf)
+                    if next_rows is None:
+                        continue
+                if owner is not None:
+                    leaves[owner].append(len(pending_rows))
+                pending[key] = len(pending_rows)
+                pending_rows.append(next_rows)
+                pending_lines.append(lines_after)
+        batch = []
+        if pending_rows:
+            batch = _score_batch(heuristic, pending_rows, pending_lines)
+            if table is not None:
+                for key, score in zip(pending, batch):
+                    table.put(key, score)
+            best = max(best, max(batch))
+        for key, owner in opened.items():
+            value = max([known[owner]] + [batch[i] for i in leaves[owner]])
+            subtrees[key] = value
+            best = max(best, value)
+        scores[index] = best
+    return scores, nodes, True
+
+def _score_batch(heuristic, rows_batch, lines):
+    if hasattr(heuristic, 'score_batch'):
+        return heuristic.score_batch(rows_batch, lines)
+    return [heuristic(rows, cleared) for rows, cleared in zip(rows_batch, lines)]
+
+class _Search:
+    # Recherche d'un coup en cours : racines, scores de la dernière profondeur
+    # terminée et tâches de la profondeur suivante dans le pool
+    def __init__(self, start, deadline):
+        self.start = start
+        self.deadline = deadline
+        self.roots = []
+        self.scores = []
+        self.depth = 0
+        self.nodes = 0
+        self.timed_out = False
+        self.futures = []
+        self.target = 1
+        self.done = False
+        self.result = None
+        self.pool = None
+        self.snapshot = None  # plateau d'origine sur 20 lignes de 16 bits
+        self.piece_type = None
+        self.ahead = []  # pièce suivante et aperçus
+
+class ParallelSearchAI(TetrisAI):
+    # Même interface que TetrisAI (choose_move, place, play) ; `time_budget`
+    # None : DEADLINE_MARGIN × fall_speed de la partie. `last_report` décrit la
+    # dernière décision. choose_move attend le résultat ; play (boucle de jeu)
+    # lance la recherche puis la relève à chaque pas sans bloquer.
+    # `table_size` > 0 : table de transposition des feuilles dans chaque
+    # processus (voir tetris_ai.TABLE_SIZE).
+    def __init__(self, heuristic=None, max_depth=DEFAULT_DEPTH, time_budget=None, workers=None,
+                 table_size=0, book=None):
+        super().__init__(heuristic, lookahead=True, table_size=0, book=book)
+        self.max_depth = max_depth
+        self.time_budget = time_budget
+        self.workers = workers or os.cpu_count()
+        self.table_size = table_size
+        self.last_report = None
+        self._pool = None
+        self._search = None
+
+    def _get_pool(self):
+        # Pool créé et démarré au premier coup, puis gardé pour toute la partie
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, initializer=init_worker,
+                                             initargs=(self.heuristic, self.table_size))
+            list(self._pool.map(_ready, range(self.workers)))
+        return self._pool
+
+    def start(self):
+        # Démarre le pool tout de suite plutôt qu'au premier coup
+        self._get_pool()
+        return self
+
+    def close(self):
+        self._search = None
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+
+    @property
+    def searching(self):
+        return self._search is not None
+
+    def choose_move(self, engine):
+        search = self._begin(engine)
+        while not search.done:
+            wait(search.futures, timeout=max(0.0, search.deadline - time.monotonic()))
+            self._advance(search, block=True)
+        return search.result
+
+    def play(self, engine):
+        # Comme TetrisAI.play, sans bloquer la boucle de jeu : tant que la
+        # recherche de la pièce tourne dans le pool, aucune action n'est jouée
+        # (la gravité continue)
+        if engine.paused or engine.game_over:
+            return None
+        if engine.pieces_placed != self._plan_piece:
+            self._plan = []
+            self._plan_piece = engine.pieces_placed
+            self._search = None
+        if self._search is None and not self._plan:
+            self._search = self._begin(engine)
+        if self._search is not None:
+            self._advance(self._search, block=False)
+            if not self._search.done:
+                return None
+            placement = self._search.result
+            self._search = None
+            self._plan = ['drop'] + list(reversed(placement.actions)) if placement else ['drop']
+        action = self._plan.pop()
+        if not engine.apply_action(action):
+            self._plan = []
+        return action
+
+    def _begin(self, engine):
+        # Profondeur 1 sur place (il y a toujours un coup à rendre), puis la
+        # profondeur 2 envoyée au pool
+        start = time.monotonic()
+        budget = self.time_budget
+        if budget is None:
+            budget = DEADLINE_MARGIN * engine.fall_speed
+        search = _Search(start, start + budget)
+        if self.book is not None:
+            placement = self.book.lookup(engine)
+            if placement is not None:
+                search.result = placement
+                search.done = True
+                self.last_report = SearchReport(0, 0, time.monotonic() - start, 0, False, True)
+                return search
+        pool = self._get_pool()
+
+        board = engine.board
+        piece = engine.current_piece
+        rows = board.rows
+        root_rows, root_lines = [], []
+        for placement in enumerate_placements(Board.from_rows(rows, board.zobrist, board.heights),
+                                              piece.type, piece.x, piece.y, piece.rotation):
+            new_rows, cleared = apply_placement(rows, placement)
+            if new_rows is not None:
+                search.roots.append(placement)
+                root_rows.append(new_rows)
+                root_lines.append(cleared)
+        if not search.roots:
+            search.done = True
+            self.last_report = SearchReport(0, 0, time.monotonic() - start, 0, False)
+            return search
+
+        search.scores = _score_batch(self.heuristic, root_rows, root_lines)
+        search.nodes = len(search.roots)
+        search.depth = 1
+        search.pool = pool
+        search.snapshot = _ROWS.pack(*rows)
+        search.piece_type = piece.type
+        search.ahead = [engine.next_piece.type] + list(engine.previews)
+        self._submit(search)
+        return search
+
+    def _submit(self, search):
+        # Tâches de la profondeur suivante, racines de la meilleure à la moins bonne
+        target = search.depth + 1
+        if target > min(self.max_depth, 1 + len(search.ahead)):
+            self._finish(search)
+            return
+        search.target = target
+        order = sorted(range(len(search.roots)), key=search.scores.__getitem__, reverse=True)
+        chunks = self.workers * CHUNKS_PER_WORKER
+        search.futures = []
+        for i in range(min(chunks, len(order))):
+            chunk = [(index, search.roots[index].x, search.roots[index].y,
+                      search.roots[index].rotation) for index in order[i::chunks]]
+            search.futures.append(search.pool.submit(search_roots, search.snapshot,
+                                                     search.piece_type, chunk,
+                                                     search.ahead[:target - 1], search.deadline))
+
+    def _advance(self, search, block):
+        # Relève la profondeur en cours si ses tâches sont terminées ; sans
+        # `block`, rend la main aussitôt tant qu'elles tournent avant l'échéance
+        if search.done:
+            return
+        if not all(future.done() for future in search.futures):
+            if block or time.monotonic() > search.deadline:
+                # Les tâches encore en cours s'arrêtent d'elles-mêmes à l'échéance
+                search.timed_out = True
+                self._finish(search)
+            return
+        new_scores = {}
+        complete = True
+        for future in search.futures:
+            chunk_scores, chunk_nodes, chunk_complete = future.result()
+            search.nodes += chunk_nodes
+            new_scores.update(chunk_scores)
+            complete = complete and chunk_complete
+        if not complete:
+            search.timed_out = True
+            self._finish(search)
+            return
+        if max(new_scores.values()) == float('-inf'):
+            self._finish(search)  # toutes les suites perdent : on garde la profondeur précédente
+            return
+        search.scores = [new_scores[index] for index in range(len(search.roots))]
+        search.depth = search.target
+        self._submit(search)
+
+    def _finish(self, search):
+        search.futures = []
+        search.done = True
+        best = max(range(len(search.roots)), key=search.scores.__getitem__)
+        search.result = search.roots[best]
+        self.last_report = SearchReport(search.depth, search.nodes,
+                                        time.monotonic() - search.start, len(search.roots),
+                                        search.timed_out)
+
+def main():
+    parser = argparse.ArgumentParser(description='Partie headless avec la recherche parallèle')
+    parser.add_argument('--pieces', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--difficulty', choices=sorted(DIFFICULTIES), default='hard')
+    parser.add_argument('--depth', type=int, default=DEFAULT_DEPTH,
+                        help='pièces posées par la recherche (courante comprise)')
+    parser.add_argument('--budget', type=float, default=None,
+                        help='temps par coup en secondes (défaut : 0,8 × fall_speed)')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--book', default=BOOK_FILE, help="livre d'ouvertures ('' : aucun)")
+    parser.add_argument('--quiet', action='store_true', help='pas de ligne par coup')
+    args = parser.parse_args()
+
+    engine = TetrisEngine(args.difficulty, seed=args.seed)
+    book = load_book(args.book) if args.book else None
+    bot = ParallelSearchAI(Heuristic(load_weights()), args.depth, args.budget, args.workers,
+                           book=book)
+    latencies, rates, depths = [], [], []
+    try:
+        while not engine.game_over and engine.pieces_placed < args.pieces:
+            bot.place(engine)
+            report = bot.last_report
+            latencies.append(report.elapsed)
+            if report.book:
+                if not args.quiet:
+                    print(f"pièce {engine.pieces_placed:>4} : livre en "
+                          f"{report.elapsed * 1e6:.0f} µs")
+                continue
+            rates.append(report.nodes_per_sec)
+            depths.append(report.depth)
+            if not args.quiet:
+                print(f"pièce {engine.pieces_placed:>4} : profondeur {report.depth}, "
+                      f"{report.nodes} nœuds en {report.elapsed * 1000:.1f} ms "
+                      f"({report.nodes_per_sec:.0f} nœuds/s){' échéance' if report.timed_out else ''}")
+    finally:
+        bot.close()
+    if rates:
+        print(f"{len(latencies)} coups ({len(latencies) - len(rates)} du livre), "
+              f"{bot.workers} processus : latence p50 {percentile(latencies, 50) * 1000:.1f} ms, "
+              f"p99 {percentile(latencies, 99) * 1000:.1f} ms, "
+              f"{sum(rates) / len(rates):.0f} nœuds/s en moyenne, profondeur moyenne "
+              f"{sum(depths) / len(depths):.2f} ; score {engine.score}, {engine.lines} lignes")
+
+if __name__ == '__main__':
+    main()
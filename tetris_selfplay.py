@@ -0,0 +1,149 @@
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, asdict
+
+from tetris_engine import DIFFICULTIES, TetrisEngine
+from tetris_ai import Heuristic, TetrisAI
+
+# Parties IA contre elle-même en masse, réparties sur tous les cœurs :
+# un moteur headless par processus, une graine par partie.
+
+# Au-delà, une partie est arrêtée (un bon bot ne perd presque jamais)
+DEFAULT_MAX_PIECES = 1000
+
+@dataclass
+class GameResult:
+    seed: int
+    difficulty: str
+    score: int
+    lines: int
+    level: int
+    pieces: int
+    actions: int  # longueur de la partie en actions moteur
+    elapsed: float  # secondes de simulation
+    game_over: bool
+
+@dataclass
+class SelfPlayConfig:
+    difficulty: str = 'hard'
+    weights: dict = None
+    lookahead: bool = True
+    max_pieces: int = DEFAULT_MAX_PIECES
+    bag: bool = False  # sac de 7 au lieu du tirage uniforme
+
+    def make_bot(self):
+        return TetrisAI(Heuristic(self.weights), lookahead=self.lookahead)
+
+# État propre à chaque processus de travail
+_worker = {}
+
+def init_worker(config):
+    _worker['config'] = config
+    _worker['engine'] = TetrisEngine(config.difficulty, bag=config.bag)
+    _worker['bot'] = config.make_bot()
+
+def worker_state(config=None):
+    # (config, moteur, bot) du processus de travail ; une config différente
+    # (autres poids) reconstruit le bot du processus
+    if config is not None and config != _worker.get('config'):
+        init_worker(config)
+    return _worker['config'], _worker['engine'], _worker['bot']
+
+def play_game(engine, bot, seed, max_pieces=DEFAULT_MAX_PIECES):
+    engine.pieces.seed(seed)
+    engine.reset_game()
+    actions = 0
+    start = time.perf_counter()
+    while not engine.game_over and engine.pieces_placed < max_pieces:
+        placement = bot.place(engine)
+        actions += 1 + (len(placement.actions) if placement else 0)
+    return GameResult(
+        seed=seed,
+        difficulty=engine.difficulty,
+        score=engine.score,
+        lines=engine.lines,
+        level=engine.level,
+        pieces=engine.pieces_placed,
+        actions=actions,
+        elapsed=time.perf_counter() - start,
+        game_over=engine.game_over
+    )
+
+def play_batch(seeds, config=None):
+    # Exécuté dans un processus de travail (voir worker_state)
+    config, engine, bot = worker_state(config)
+    return [play_game(engine, bot, seed, config.max_pieces) for seed in seeds]
+
+class SelfPlayStats:
+    def __init__(self):
+        self.games = 0
+        self.pieces = 0
+        self.lines = 0
+        self.score = 0
+        self.start = time.perf_counter()
+
+    def add(self, results):
+        for result in results:
+            self.games += 1
+            self.pieces += result.pieces
+            self.lines += result.lines
+            self.score += result.score
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.start
+
+    @property
+    def pieces_per_sec(self):
+        return self.pieces / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def games_per_sec(self):
+        return self.games / self.elapsed if self.elapsed else 0.0
+
+    def summary(self):
+        mean_score = self.score / self.games if self.games else 0
+        mean_lines = self.lines / self.games if self.games else 0
+        return (f"{self.games} parties, score moyen {mean_score:.0f}, "
+                f"lignes moyennes {mean_lines:.1f}, {self.pieces_per_sec:.0f} pièces/s, "
+                f"{self.games_per_sec:.2f} parties/s")
+
+def run_selfplay(seeds, config=None, workers=None, batch_size=4, stats=None):
+    # Générateur : renvoie les résultats par lots, dans l'ordre où ils terminent
+    config = config or SelfPlayConfig()
+    seeds = list(seeds)
+    batches = [seeds[i:i + batch_size] for i in range(0, len(seeds), batch_size)]
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count(),
+                             initializer=init_worker, initargs=(config,)) as pool:
+        futures = [pool.submit(play_batch, batch) for batch in batches]
+        for future in as_completed(futures):
+            results = future.result()
+            if stats is not None:
+                stats.add(results)
+            yield results
+
+def main():
+    parser = argparse.ArgumentParser(description='Parties IA headless en parallèle')
+    parser.add_argument('--games', type=int, default=100)
+    parser.add_argument('--seed', type=int, default=0, help='graine de la première partie')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--batch-size', type=int, default=4)
+    parser.add_argument('--difficulty', choices=sorted(DIFFICULTIES), default='hard')
+    parser.add_argument('--max-pieces', type=int, default=DEFAULT_MAX_PIECES)
+    parser.add_argument('--no-lookahead', action='store_true')
+    parser.add_argument('--bag', action='store_true', help='générateur de pièces en sac de 7')
+    args = parser.parse_args()
+
+    config = SelfPlayConfig(difficulty=args.difficulty, lookahead=not args.no_lookahead,
+                            max_pieces=args.max_pieces, bag=args.bag)
+    stats = SelfPlayStats()
+    seeds = range(args.seed, args.seed + args.games)
+    for results in run_selfplay(seeds, config, args.workers, args.batch_size, stats):
+        for result in results:
+            print(asdict(result))
+    print(stats.summary())
+
+if __name__ == '__main__':
+    main()
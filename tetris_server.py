@@ -0,0 +1,305 @@
+import argparse
+import asyncio
+import json
+import random
+import time
+
+from tetris_engine import ACTIONS, DIFFICULTIES, GRID_HEIGHT, TetrisEngine
+from tetris_loop import FixedTimestep
+from tetris_profiler import percentile
+
+# Serveur de parties : un seul processus asyncio héberge des milliers de
+# sessions indépendantes (un TetrisEngine chacune). Un ordonnanceur unique
+# tourne à 60 Hz ; la gravité passe par une roue temporelle partagée, si bien
+# qu'une session inactive ne coûte rien tant que son pas de gravité n'est pas dû.
+# Les clients ne reçoivent que les différences d'état (deltas compacts).
+#
+# Protocole : un message JSON par ligne, dans les deux sens (même découpage en
+# messages qu'une WebSocket).
+#   client -> serveur  {"type": "new", "difficulty": "hard", "seed": 1}
+#                      {"type": "action", "action": "left"}   (ACTIONS du moteur)
+#                      {"type": "restart"}  {"type": "close"}
+#   serveur -> client  {"id": 1, "f": 120, "r": {"19": "IIII..OO.."}, "p": ["T", 4, 3, 1],
+#                       "n": "S", "s": 100, "l": 1, "v": 2, "o": 1}
+# "f" est la frame du serveur ; les autres champs n'apparaissent que s'ils ont
+# changé ("r" : lignes modifiées, "." = case vide ; "o" : partie terminée).
+
+SERVER_HZ = 60
+WHEEL_SIZE = 256  # > plus long délai de gravité (0,7 s = 42 frames)
+MAX_WRITE_BUFFER = 1 << 20  # client trop lent : la session est fermée
+
+class TimerWheel:
+    # Roue temporelle : un emplacement par frame, parcouru une fois par tour.
+    # Une frame sans échéance ne coûte qu'un accès à une liste vide.
+    def __init__(self, size=WHEEL_SIZE):
+        self.size = size
+        self.slots = [[] for _ in range(size)]
+        self.frame = 0
+        self._spare = []
+
+    def schedule(self, item, delay):
+        # Renvoie la frame d'échéance
+        delay = max(1, min(delay, self.size - 1))
+        self.slots[(self.frame + delay) % self.size].append(item)
+        return self.frame + delay
+
+    def advance(self):
+        # Éléments échus à la nouvelle frame ; la liste rendue est réutilisée
+        # au tour suivant (aucune allocation par frame)
+        self.frame += 1
+        index = self.frame % self.size
+        due = self.slots[index]
+        if due:
+            spare = self._spare
+            spare.clear()
+            self.slots[index] = spare
+            self._spare = due
+        return due
+
+class Session:
+    def __init__(self, session_id, difficulty='medium', seed=None, writer=None):
+        self.id = session_id
+        self.engine = TetrisEngine(difficulty, seed)
+        self.writer = writer  # asyncio.StreamWriter, ou None (benchmark)
+        self.dirty = False
+        self.closed = False
+        self.due = None  # frame du prochain pas de gravité
+        self.bytes_sent = 0
+        self._rows = None  # dernier état envoyé
+        self._piece = None
+        self._next = None
+        self._counters = None
+        self._lines = None
+
+    def delta(self, frame):
+        # Message des champs modifiés depuis le dernier envoi (état complet au premier)
+        engine = self.engine
+        message = {'id': self.id, 'f': frame}
+        rows, colors = engine.board.rows, engine.board.colors
+        sent = self._rows
+        if sent is None or engine.lines != self._lines:
+            # Un effacement de lignes décale les couleurs : tout est renvoyé
+            changed = range(GRID_HEIGHT)
+        else:
+            changed = [r for r in range(GRID_HEIGHT) if rows[r] != sent[r]]
+        if changed:
+            message['r'] = {str(r): ''.join(cell or '.' for cell in colors[r]) for r in changed}
+            self._rows = rows[:]
+            self._lines = engine.lines
+        piece = engine.current_piece
+        state = (piece.type, piece.x, piece.y, piece.rotation)
+        if state != self._piece:
+            message['p'] = self._piece = state
+        if engine.next_piece.type != self._next:
+            message['n'] = self._next = engine.next_piece.type
+        counters = (engine.score, engine.lines, engine.level)
+        if counters != self._counters:
+            message['s'], message['l'], message['v'] = self._counters = counters
+        if engine.game_over:
+            message['o'] = 1
+        return message
+
+    def reset_delta(self):
+        self._rows = self._piece = self._next = self._counters = self._lines = None
+
+class TetrisServer:
+    def __init__(self, hz=SERVER_HZ):
+        self.hz = hz
+        self.sessions = {}
+        self.wheel = TimerWheel()
+        self.frame = 0
+        self._dirty = []
+        self._next_id = 1
+        self.tick_times = []  # durées des frames récentes (s)
+        self.messages = 0
+
+    # Sessions
+
+    def open_session(self, difficulty='medium', seed=None, writer=None):
+        if difficulty not in DIFFICULTIES:
+            raise ValueError(f"Difficulté inconnue : {difficulty}")
+        session = Session(self._next_id, difficulty, seed, writer)
+        self._next_id += 1
+        self.sessions[session.id] = session
+        # Premier pas de gravité décalé selon l'id : les sessions ouvertes
+        # ensemble ne tombent pas toutes à la même frame
+        delay = self._gravity_delay(session)
+        session.due = self.wheel.schedule(session, 1 + session.id % delay)
+        self.mark_dirty(session)
+        return session
+
+    def close_session(self, session):
+        # Les entrées restées dans la roue sont ignorées à leur échéance
+        session.closed = True
+        self.sessions.pop(session.id, None)
+
+    def restart_session(self, session):
+        session.engine.reset_game()
+        session.reset_delta()
+        self._schedule_gravity(session)
+        self.mark_dirty(session)
+
+    def _gravity_delay(self, session):
+        return max(1, round(session.engine.fall_speed * self.hz))
+
+    def _schedule_gravity(self, session):
+        # Une entrée plus ancienne restée dans la roue (partie relancée) n'est plus due
+        session.due = self.wheel.schedule(session, self._gravity_delay(session))
+
+    def mark_dirty(self, session):
+        if not session.dirty:
+            session.dirty = True
+            self._dirty.append(session)
+
+    def handle_action(self, session, action):
+        if session.closed or session.engine.game_over:
+            return False
+        if session.engine.apply_action(action):
+            self.mark_dirty(session)
+            return True
+        return False
+
+    # Ordonnanceur
+
+    def tick(self):
+        # Une frame : pas de gravité des sessions échues, puis envoi des deltas
+        start = time.perf_counter()
+        self.frame += 1
+        for session in self.wheel.advance():
+            if session.closed or session.due != self.wheel.frame:
+                continue
+            engine = session.engine
+            if engine.game_over:
+                continue
+            engine.tick()
+            self.mark_dirty(session)
+            if not engine.game_over:
+                self._schedule_gravity(session)
+        if self._dirty:
+            self.flush()
+        self.tick_times.append(time.perf_counter() - start)
+        if len(self.tick_times) > 10 * self.hz:
+            del self.tick_times[:5 * self.hz]
+
+    def flush(self):
+        frame = self.frame
+        for session in self._dirty:
+            session.dirty = False
+            if session.closed:
+                continue
+            payload = (json.dumps(session.delta(frame), separators=(',', ':')) + '\n').encode()
+            session.bytes_sent += len(payload)
+            self.messages += 1
+            writer = session.writer
+            if writer is None:
+                continue
+            if writer.transport.get_write_buffer_size() > MAX_WRITE_BUFFER:
+                self.close_session(session)
+                writer.close()
+                continue
+            writer.write(payload)
+        self._dirty.clear()
+
+    async def run(self):
+        timestep = FixedTimestep(self.hz)
+        while True:
+            for _ in range(timestep.advance()):
+                self.tick()
+            await asyncio.sleep(max(0.0, timestep.dt - timestep.accumulator))
+
+    # Connexions
+
+    async def handle_client(self, reader, writer):
+        session = None
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    message = json.loads(line)
+                    kind = message.get('type')
+                    if kind == 'new':
+                        if session is not None:
+                            self.close_session(session)
+                        session = self.open_session(message.get('difficulty', 'medium'),
+                                                    message.get('seed'), writer)
+                    elif kind == 'action' and session is not None:
+                        self.handle_action(session, message.get('action'))
+                    elif kind == 'restart' and session is not None:
+                        self.restart_session(session)
+                    elif kind == 'close':
+                        break
+                    else:
+                        raise ValueError(f"Message inattendu : {kind}")
+                except (ValueError, TypeError, AttributeError) as e:
+                    writer.write((json.dumps({'error': str(e)}) + '\n').encode())
+        except ConnectionError:
+            pass
+        finally:
+            if session is not None:
+                self.close_session(session)
+            writer.close()
+
+async def serve(host, port, unix=None):
+    server = TetrisServer()
+    if unix:
+        listener = await asyncio.start_unix_server(server.handle_client, unix)
+        print(f"Serveur Tetris sur {unix}")
+    else:
+        listener = await asyncio.start_server(server.handle_client, host, port)
+        print(f"Serveur Tetris sur {host}:{port}")
+    async with listener:
+        await server.run()
+
+def benchmark(sessions, seconds, actions_per_second=3.0, seed=0):
+    # Charge synthétique en process : `sessions` parties, chacune recevant en
+    # moyenne `actions_per_second` actions ; mesure le coût d'une frame
+    server = TetrisServer()
+    rng = random.Random(seed)
+    population = [server.open_session('medium', seed + i) for i in range(sessions)]
+    per_tick = sessions * actions_per_second / server.hz
+    frames = int(seconds * server.hz)
+    actions = 0
+    start = time.perf_counter()
+    for _ in range(frames):
+        count = int(per_tick) + (rng.random() < per_tick % 1)
+        for _ in range(count):
+            session = population[rng.randrange(sessions)]
+            if session.engine.game_over:
+                server.restart_session(session)
+            server.handle_action(session, rng.choice(ACTIONS[:-1] if rng.random() < 0.9 else ACTIONS))
+            actions += 1
+        server.tick()
+    elapsed = time.perf_counter() - start
+    budget = 1.0 / server.hz
+    times = server.tick_times
+    sent = sum(session.bytes_sent for session in population)
+    print(f"{sessions} sessions, {frames} frames, {actions} actions en {elapsed:.2f} s "
+          f"({frames / server.hz / elapsed:.1f}x temps réel)")
+    print(f"frame p50 {percentile(times, 50) * 1000:.2f} ms, p99 {percentile(times, 99) * 1000:.2f} ms "
+          f"({percentile(times, 50) / budget:.0%} du budget de {budget * 1000:.1f} ms) ; "
+          f"{server.messages} deltas, {sent / max(server.messages, 1):.0f} octets en moyenne")
+
+def main():
+    parser = argparse.ArgumentParser(description='Serveur multi-parties asyncio')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=7777)
+    parser.add_argument('--unix', default=None, help='socket Unix au lieu de TCP')
+    parser.add_argument('--bench', type=int, default=None, metavar='SESSIONS',
+                        help='mesurer le coût d\'une frame pour SESSIONS parties simulées')
+    parser.add_argument('--seconds', type=float, default=5.0, help='durée simulée du benchmark')
+    parser.add_argument('--actions', type=float, default=3.0,
+                        help='actions par seconde et par session pendant le benchmark')
+    args = parser.parse_args()
+
+    if args.bench:
+        benchmark(args.bench, args.seconds, args.actions)
+        return
+    try:
+        asyncio.run(serve(args.host, args.port, args.unix))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,226 @@
+import argparse
+import json
+import struct
+from dataclasses import dataclass, replace
+
+from tetris_engine import (GRID_WIDTH, GRID_HEIGHT, DIFFICULTIES, PIECE_TYPES, Board, Piece,
+                           TetrisEngine, spawn_piece)
+
+# Instantanés binaires compacts d'une partie complète (plateau, pièces,
+# générateur, compteurs) contre ~3,5 Ko pour l'ancien JSON. Sans pygame. La
+# taille dépend surtout de la pile : 25 octets pour un plateau vide, 30 à 70
+# en cours de partie ; au pire (20 lignes à 9 cases, gros compteurs) ~130
+# octets, dont 25 de lignes et 68 de couleurs.
+#
+# Format (version 1, petit-boutiste) :
+#   en-tête    version, drapeaux, pièce courante (type << 2 | rotation), x, y,
+#              type de la pièce suivante, état xorshift64* du générateur
+#   compteurs  score, lignes, niveau, pièces posées, fall_speed en µs (+ position
+#              dans la séquence pré-générée si utilisée), en varints
+#   file       tailles du sac et de la file d'aperçus, puis types sur 3 bits
+#   plateau    nombre de lignes depuis la plus haute ligne occupée, lignes sur
+#              10 bits, puis la couleur (type sur 3 bits) de chaque case occupée
+
+SNAPSHOT_VERSION = 1
+
+_HEADER = struct.Struct('<BBBbbBQ')
+_DIFFICULTIES = tuple(DIFFICULTIES)
+_TYPE_CODES = {piece_type: i for i, piece_type in enumerate(PIECE_TYPES)}
+
+# Drapeaux (bits 4-5 : indice de la difficulté)
+_GAME_OVER = 1
+_BAG = 2
+_SEQUENCE = 4
+
+@dataclass
+class Snapshot:
+    difficulty: str
+    board: Board
+    current_piece: Piece
+    next_type: str
+    generator_state: tuple  # PieceGenerator.getstate()
+    bag: bool
+    score: int
+    lines: int
+    level: int
+    pieces_placed: int
+    game_over: bool
+    fall_speed: float  # s ; dépend des montées de niveau, pas seulement du niveau
+
+def _write_varint(out, value):
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+def _read_varint(data, offset):
+    value = shift = 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, offset
+        shift += 7
+
+def _pack(values, bits):
+    # Entiers de `bits` bits concaténés dans un seul int puis en octets
+    packed = 0
+    for i, value in enumerate(values):
+        packed |= value << (i * bits)
+    return packed.to_bytes((len(values) * bits + 7) // 8, 'little')
+
+def _unpack(data, offset, count, bits):
+    size = (count * bits + 7) // 8
+    packed = int.from_bytes(data[offset:offset + size], 'little')
+    mask = (1 << bits) - 1
+    return [(packed >> (i * bits)) & mask for i in range(count)], offset + size
+
+def _estimated_fall_speed(difficulty, level):
+    # Sauvegardes JSON sans fall_speed : un niveau gagné par montée de niveau,
+    # faute de mieux (plusieurs niveaux d'un coup ne réduisent la vitesse qu'une fois)
+    settings = DIFFICULTIES[difficulty]
+    return max(0.1, settings['fall_speed'] - settings['speed_increase'] * (level - 1))
+
+def encode_snapshot(engine) -> bytes:
+    pieces = engine.pieces
+    state, position, bag, queue = pieces.getstate()
+    if len(bag) > 7 or len(queue) > 31:
+        raise ValueError("File de pièces trop longue pour un instantané")
+    piece = engine.current_piece
+    flags = _DIFFICULTIES.index(engine.difficulty) << 4
+    if engine.game_over:
+        flags |= _GAME_OVER
+    if pieces.bag:
+        flags |= _BAG
+    if pieces.sequence is not None:
+        flags |= _SEQUENCE
+
+    out = bytearray(_HEADER.pack(SNAPSHOT_VERSION, flags,
+                                 _TYPE_CODES[piece.type] << 2 | piece.rotation,
+                                 piece.x, piece.y, _TYPE_CODES[engine.next_piece.type], state))
+    for value in (engine.score, engine.lines, engine.level, engine.pieces_placed,
+                  round(engine.fall_speed * 1e6)):
+        _write_varint(out, value)
+    if pieces.sequence is not None:
+        _write_varint(out, position)
+    out.append(len(bag) | len(queue) << 3)
+    out += _pack(bag + queue, 3)
+
+    board = engine.board
+    rows = board.rows
+    top = 0
+    while top < GRID_HEIGHT and not rows[top]:
+        top += 1
+    out.append(GRID_HEIGHT - top)
+    out += _pack(rows[top:], GRID_WIDTH)
+    codes = []
+    for r in range(top, GRID_HEIGHT):
+        row, colors = rows[r], board.colors[r]
+        while row:
+            low = row & -row
+            codes.append(_TYPE_CODES[colors[low.bit_length() - 1]])
+            row ^= low
+    out += _pack(codes, 3)
+    return bytes(out)
+
+def decode_snapshot(data) -> Snapshot:
+    version, flags, current, x, y, next_code, state = _HEADER.unpack_from(data)
+    if version != SNAPSHOT_VERSION:
+        raise ValueError(f"Version d'instantané non prise en charge : {version}")
+    offset = _HEADER.size
+    score, offset = _read_varint(data, offset)
+    lines, offset = _read_varint(data, offset)
+    level, offset = _read_varint(data, offset)
+    pieces_placed, offset = _read_varint(data, offset)
+    fall_speed, offset = _read_varint(data, offset)
+    position = 0
+    if flags & _SEQUENCE:
+        position, offset = _read_varint(data, offset)
+    sizes = data[offset]
+    bag_size, queue_size = sizes & 0x7, sizes >> 3
+    codes, offset = _unpack(data, offset + 1, bag_size + queue_size, 3)
+
+    count = data[offset]
+    rows, offset = _unpack(data, offset + 1, count, GRID_WIDTH)
+    rows = [0] * (GRID_HEIGHT - count) + rows
+    board = Board.from_rows(rows)
+    board.colors = [[0] * GRID_WIDTH for _ in range(GRID_HEIGHT)]
+    cells = sum(row.bit_count() for row in rows)
+    colors, offset = _unpack(data, offset, cells, 3)
+    i = 0
+    for r in range(GRID_HEIGHT - count, GRID_HEIGHT):
+        row, color_row = rows[r], board.colors[r]
+        while row:
+            low = row & -row
+            color_row[low.bit_length() - 1] = PIECE_TYPES[colors[i]]
+            i += 1
+            row ^= low
+
+    return Snapshot(
+        difficulty=_DIFFICULTIES[flags >> 4],
+        board=board,
+        current_piece=Piece(PIECE_TYPES[current >> 2], x, y, current & 3),
+        next_type=PIECE_TYPES[next_code],
+        generator_state=(state, position, tuple(codes[:bag_size]), tuple(codes[bag_size:])),
+        bag=bool(flags & _BAG),
+        score=score,
+        lines=lines,
+        level=level,
+        pieces_placed=pieces_placed,
+        game_over=bool(flags & _GAME_OVER),
+        fall_speed=fall_speed / 1e6
+    )
+
+def restore_snapshot(engine, data):
+    # Remet `engine` (ou une sous-classe, ex. Tetris) dans l'état de l'instantané ;
+    # la séquence pré-générée éventuelle reste celle du générateur de l'engine
+    snapshot = data if isinstance(data, Snapshot) else decode_snapshot(data)
+    engine.difficulty = snapshot.difficulty
+    engine.board = snapshot.board.copy()
+    engine.current_piece = replace(snapshot.current_piece)
+    engine.next_piece = spawn_piece(snapshot.next_type)
+    engine.pieces.bag = snapshot.bag
+    engine.pieces.setstate(snapshot.generator_state)
+    engine.score = snapshot.score
+    engine.lines = snapshot.lines
+    engine.level = snapshot.level
+    engine.pieces_placed = snapshot.pieces_placed
+    engine.game_over = snapshot.game_over
+    engine.paused = False
+    engine.fall_time = 0.0
+    engine.fall_speed = snapshot.fall_speed
+    return engine
+
+def snapshot_from_json(save_data, seed=None) -> bytes:
+    # Import d'une sauvegarde JSON (game_save.json) : l'ancien format ne contient
+    # ni les pièces ni le générateur, qui repartent de `seed`
+    engine = TetrisEngine(save_data.get('difficulty', 'medium'), seed)
+    # Les anciennes sauvegardes nommaient la grille 'board'
+    grid = save_data.get('grid', save_data.get('board'))
+    if grid is not None:
+        engine.grid = grid
+    engine.score = save_data.get('score', 0)
+    engine.level = save_data.get('level', 1)
+    engine.lines = save_data.get('lines', 0)
+    fall_speed = save_data.get('fall_speed')
+    if fall_speed is None:
+        fall_speed = _estimated_fall_speed(engine.difficulty, engine.level)
+    engine.fall_speed = fall_speed
+    return encode_snapshot(engine)
+
+def main():
+    parser = argparse.ArgumentParser(description='Conversion des sauvegardes JSON en instantanés binaires')
+    parser.add_argument('source', help='sauvegarde JSON (game_save.json)')
+    parser.add_argument('destination', help='instantané binaire à écrire')
+    parser.add_argument('--seed', type=int, default=None, help='graine des pièces à venir')
+    args = parser.parse_args()
+
+    with open(args.source, 'r') as f:
+        payload = snapshot_from_json(json.load(f), args.seed)
+    with open(args.destination, 'wb') as f:
+        f.write(payload)
+    print(f"{args.source} -> {args.destination} ({len(payload)} octets)")
+
+if __name__ == '__main__':
+    main()
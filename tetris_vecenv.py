@@ -0,0 +1,379 @@
+import argparse
+import random
+import time
+from multiprocessing import Pool, shared_memory
+
+import numpy as np
+
+from tetris_engine import (ACTIONS, FULL_ROW, GRID_HEIGHT, GRID_WIDTH, KICKS, PIECE_TYPES,
+                           ROTATIONS, SPAWN_X, SPAWN_Y, X_MARGIN, TetrisEngine, seed_state)
+
+# Environnement vectorisé style Gym : N parties indépendantes avancent en même
+# temps, tout l'état tenant dans des tableaux NumPy (une ligne par partie).
+# Un pas applique un tableau (N,) d'actions en une passe vectorisée par type
+# d'action, avec les règles de TetrisEngine.step (action, puis un pas de
+# gravité) : mêmes collisions, rotations SRS, verrouillage, lignes, score et
+# même générateur de pièces, si bien que la partie i reproduit exactement un
+# TetrisEngine(seed=seed + i). Les parties terminées repartent d'elles-mêmes.
+# Les tableaux peuvent vivre en mémoire partagée : plusieurs processus
+# avancent chacun leur tranche du même lot.
+
+# Codes d'action : index dans ACTIONS, NOOP = pas de gravité seul (step(None))
+NOOP = len(ACTIONS)
+NUM_ACTIONS = len(ACTIONS) + 1
+
+_X_SPAN = GRID_WIDTH + 2 * X_MARGIN
+_DY = np.arange(4)
+# Chaque plateau est bordé de 4 lignes vides au-dessus et de 4 lignes pleines
+# en dessous : les 4 lignes couvertes par la boîte d'une pièce se lisent alors
+# comme un seul uint64 (16 bits par ligne), et un test de collision est un ET
+_PAD = 4
+_BOARD_HEIGHT = GRID_HEIGHT + 2 * _PAD
+
+# Tables précalculées : masques des 4 lignes de la boîte de chaque orientation
+# à chaque colonne, validité horizontale, wall kicks et positions d'apparition
+_MASKS = np.zeros((len(PIECE_TYPES), 4, _X_SPAN, 4), dtype=np.uint16)
+_VALID = np.zeros((len(PIECE_TYPES), 4, _X_SPAN), dtype=bool)
+for _p, _type in enumerate(PIECE_TYPES):
+    for _r, _orientation in enumerate(ROTATIONS[_type]):
+        for _xi, _placed in enumerate(_orientation.placed):
+            if _placed is not None:
+                _VALID[_p, _r, _xi] = True
+                for _i, _mask in _placed:
+                    _MASKS[_p, _r, _xi, _i] = _mask
+# (pièce, rotation de départ, sens, essai) -> (dx, dy) ; les listes plus courtes
+# (pièce O) sont complétées par leur dernier essai
+_KICKS = np.zeros((len(PIECE_TYPES), 4, 2, 5, 2), dtype=np.int16)
+for _p, _type in enumerate(PIECE_TYPES):
+    for _r in range(4):
+        for _turn in range(2):
+            _tests = KICKS[_type][_r][_turn]
+            for _k in range(5):
+                _KICKS[_p, _r, _turn, _k] = _tests[min(_k, len(_tests) - 1)]
+# Profil bas : dy de la case la plus basse de chaque colonne de la boîte (-1 : vide)
+_BOTTOM = np.full((len(PIECE_TYPES), 4, 4), -1, dtype=np.int16)
+for _p, _type in enumerate(PIECE_TYPES):
+    for _r, _orientation in enumerate(ROTATIONS[_type]):
+        for _dx, _dy in _orientation.bottom:
+            _BOTTOM[_p, _r, _dx] = _dy
+# Les 4 masques de ligne d'une orientation à une colonne, en un uint64
+_MASK64 = (_MASKS.astype(np.uint64) << (np.arange(4, dtype=np.uint64) * 16)).sum(
+    axis=3, dtype=np.uint64)
+# Bits des lignes de la boîte au-dessus de la grille, selon y (-4 à -1, puis >= 0)
+_ABOVE64 = np.array([(1 << (16 * min(max(-y, 0), 4))) - 1 for y in range(-_PAD, 1)],
+                    dtype=np.uint64)
+_BITS = np.arange(GRID_WIDTH, dtype=np.uint16)
+_SPAWN_X = np.array([SPAWN_X[t] for t in PIECE_TYPES], dtype=np.int16)
+_SPAWN_Y = np.array([SPAWN_Y[t] for t in PIECE_TYPES], dtype=np.int16)
+
+# Disposition de l'état dans un seul tampon : (nom, type, forme par partie)
+STATE_FIELDS = (
+    ('board', np.uint16, (_BOARD_HEIGHT,)),  # bitboards bordés (voir _PAD)
+    ('piece', np.int8, ()),
+    ('next', np.int8, ()),
+    ('x', np.int16, ()),
+    ('y', np.int16, ()),
+    ('rotation', np.int8, ()),
+    ('game_over', np.bool_, ()),
+    ('score', np.int64, ()),
+    ('lines', np.int32, ()),
+    ('level', np.int32, ()),
+    ('pieces_placed', np.int32, ()),
+    ('rng', np.uint64, ())  # état xorshift64* du PieceGenerator
+)
+
+def _layout(num_envs):
+    # (nom, type, forme, décalage) de chaque tableau, alignés sur 8 octets ; taille totale
+    layout = []
+    offset = 0
+    for name, dtype, shape in STATE_FIELDS:
+        shape = (num_envs,) + shape
+        layout.append((name, dtype, shape, offset))
+        offset += -(-int(np.prod(shape)) * np.dtype(dtype).itemsize // 8) * 8
+    return layout, offset
+
+def state_arrays(buffer, num_envs):
+    # Tableaux de l'état vus dans `buffer` (bytearray ou SharedMemory.buf), sans copie
+    layout, _ = _layout(num_envs)
+    return {name: np.ndarray(shape, dtype, buffer=buffer, offset=offset)
+            for name, dtype, shape, offset in layout}
+
+class VectorTetrisEnv:
+    def __init__(self, num_envs, seed=None, shared=False):
+        _, size = _layout(num_envs)
+        self._shm = shared_memory.SharedMemory(create=True, size=size) if shared else None
+        self._owner = shared
+        self._bind(state_arrays(self._shm.buf if shared else bytearray(size), num_envs))
+        self.reset(seed)
+
+    @classmethod
+    def attach(cls, name, num_envs, start=0, stop=None):
+        # Tranche [start, stop) d'un environnement partagé créé par un autre processus
+        env = cls.__new__(cls)
+        env._shm = shared_memory.SharedMemory(name=name)
+        env._owner = False
+        arrays = state_arrays(env._shm.buf, num_envs)
+        env._bind({name: array[start:stop] for name, array in arrays.items()})
+        return env
+
+    def _bind(self, arrays):
+        self.arrays = arrays
+        for name, array in arrays.items():
+            setattr(self, name, array)
+        board = self.board
+        self.num_envs = len(board)
+        self.rows = board[:, _PAD:_PAD + GRID_HEIGHT]
+        # Fenêtre de 4 lignes commençant à chaque ligne du plateau bordé
+        self._windows = np.ndarray((self.num_envs, _BOARD_HEIGHT - 3), np.uint64, buffer=board,
+                                   strides=(board.strides[0], board.strides[1]))
+
+    @property
+    def shm_name(self):
+        return self._shm.name if self._shm is not None else None
+
+    def close(self):
+        if self._shm is None:
+            return
+        self.arrays = {}
+        for name, _, _ in STATE_FIELDS:
+            setattr(self, name, None)
+        self.rows = self._windows = None
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
+        self._shm = None
+
+    # API Gym
+
+    def reset(self, seed=None):
+        # Graine `seed + i` pour la partie i (comme TetrisEngine(seed=seed + i))
+        if seed is None:
+            seed = random.getrandbits(32)
+        self.rng[:] = [seed_state(seed + i) for i in range(self.num_envs)]
+        self._reset(np.arange(self.num_envs))
+        return self.observation()
+
+    def step(self, actions):
+        # actions : (N,) codes dans [0, NUM_ACTIONS) ; renvoie (obs, récompenses,
+        # terminées, infos). La récompense est le gain de score du pas ; une
+        # partie terminée est relancée et ses totaux sont dans infos['final_*'].
+        actions = np.asarray(actions)
+        score_before = self.score.copy()
+        lines_before = self.lines.copy()
+        locked = np.zeros(self.num_envs, dtype=bool)
+        for code, action in enumerate(ACTIONS):
+            idx = np.flatnonzero(actions == code)
+            if not idx.size:
+                continue
+            if action == 'left':
+                self._shift(idx, -1, 0)
+            elif action == 'right':
+                self._shift(idx, 1, 0)
+            elif action == 'down':
+                self._shift(idx, 0, 1)
+            elif action == 'rotate':
+                self._rotate(idx, 0)
+            elif action == 'rotate_ccw':
+                self._rotate(idx, 1)
+            elif action == 'sonic_drop':
+                self._sonic_drop(idx)
+            else:  # 'drop'
+                self._sonic_drop(idx)
+                self._lock(idx)
+                locked[idx] = True
+
+        # Pas de gravité, sauf si l'action vient de verrouiller la pièce
+        idx = np.flatnonzero(~locked)
+        falls = self._fits(idx, self.rotation[idx], self.x[idx], self.y[idx] + 1)
+        self.y[idx[falls]] += 1
+        self._lock(idx[~falls])
+
+        rewards = (self.score - score_before).astype(np.float64)
+        dones = self.game_over.copy()
+        infos = {'lines_cleared': self.lines - lines_before}
+        if dones.any():
+            done = np.flatnonzero(dones)
+            infos['final_score'] = np.where(dones, self.score, 0)
+            infos['final_lines'] = np.where(dones, self.lines, 0)
+            infos['final_pieces'] = np.where(dones, self.pieces_placed, 0)
+            self._reset(done)
+        return self.observation(), rewards, dones, infos
+
+    def observation(self):
+        # Copies : l'état continue d'évoluer au pas suivant
+        return {
+            'rows': self.rows.copy(),
+            'piece': self.piece.copy(),
+            'next': self.next.copy(),
+            'x': self.x.copy(),
+            'y': self.y.copy(),
+            'rotation': self.rotation.copy()
+        }
+
+    # Règles vectorisées (sur le sous-ensemble `idx` des parties)
+
+    def _fits(self, idx, rotation, x, y):
+        # Même test que Board.fits : dans la grille et sans recouvrement
+        xi = x + X_MARGIN
+        inside = (xi >= 0) & (xi < _X_SPAN)
+        xi = np.clip(xi, 0, _X_SPAN - 1)
+        piece = self.piece[idx]
+        window = self._windows[idx, np.clip(y + _PAD, 0, _BOARD_HEIGHT - 4)]
+        return inside & _VALID[piece, rotation, xi] & ((window & _MASK64[piece, rotation, xi]) == 0)
+
+    def _shift(self, idx, dx, dy):
+        ok = self._fits(idx, self.rotation[idx], self.x[idx] + dx, self.y[idx] + dy)
+        idx = idx[ok]
+        self.x[idx] += dx
+        self.y[idx] += dy
+
+    def _rotate(self, idx, turn):
+        # Rotation SRS : premier wall kick qui passe, comme TetrisEngine.rotate_piece
+        rotation = self.rotation[idx]
+        target = (rotation + (1 if turn == 0 else -1)) % 4
+        for k in range(5):
+            if not idx.size:
+                break
+            kick = _KICKS[self.piece[idx], rotation, turn, k]
+            x = self.x[idx] + kick[:, 0]
+            y = self.y[idx] + kick[:, 1]
+            ok = self._fits(idx, target, x, y)
+            done = idx[ok]
+            self.x[done] = x[ok]
+            self.y[done] = y[ok]
+            self.rotation[done] = target[ok]
+            idx, rotation, target = idx[~ok], rotation[~ok], target[~ok]
+
+    def _sonic_drop(self, idx):
+        # Comme Board.drop_row : au-dessus du relief, la ligne d'arrivée se lit
+        # sur les hauteurs de colonnes ; sous un surplomb, descente ligne par ligne
+        if not idx.size:
+            return
+        covered = np.bitwise_or.accumulate(self.rows[idx], axis=1)
+        heights = ((covered[:, :, None] >> _BITS) & 1).sum(axis=1)
+        bottom = _BOTTOM[self.piece[idx], self.rotation[idx]]
+        columns = np.clip(self.x[idx].astype(np.int64)[:, None] + _DY, 0, GRID_WIDTH - 1)
+        top = GRID_HEIGHT - np.take_along_axis(heights, columns, axis=1)
+        used = bottom >= 0
+        y = self.y[idx].astype(np.int64)[:, None]
+        above = (~used | (y + bottom < top)).all(axis=1)
+        landing = np.where(used, top - 1 - bottom, GRID_HEIGHT).min(axis=1)
+        self.y[idx[above]] = landing[above]
+        idx = idx[~above]
+        while idx.size:
+            falls = self._fits(idx, self.rotation[idx], self.x[idx], self.y[idx] + 1)
+            idx = idx[falls]
+            self.y[idx] += 1
+
+    def _lock(self, idx):
+        # Board.lock, clear_lines et pièce suivante (TetrisEngine.place_piece)
+        if not idx.size:
+            return
+        y = self.y[idx]
+        mask = _MASK64[self.piece[idx], self.rotation[idx], self.x[idx] + X_MARGIN]
+        # Une case au-dessus de la grille termine la partie et n'est pas posée ;
+        # une boîte entièrement au-dessus (y < -_PAD) n'a aucune fenêtre à écrire
+        # (l'indice négatif reviendrait sur le bas du plateau)
+        above = _ABOVE64[np.clip(y, -_PAD, 0) + _PAD]
+        self.game_over[idx] |= (mask & above) != 0
+        inside = y >= -_PAD
+        self._windows[idx[inside], y[inside] + _PAD] |= (mask & ~above)[inside]
+
+        rows = self.rows[idx]
+        full = rows == FULL_ROW
+        cleared = full.sum(axis=1)
+        if cleared.any():
+            # Compaction stable : les lignes pleines passent en tête puis sont vidées
+            order = np.argsort(~full, axis=1, kind='stable')
+            rows = np.take_along_axis(rows, order, axis=1)
+            rows[np.arange(GRID_HEIGHT) < cleared[:, None]] = 0
+            self.rows[idx] = rows
+            self.score[idx] += cleared * 100 * self.level[idx]
+            self.lines[idx] += cleared
+            # Même règle que TetrisEngine.clear_lines : un niveau par ligne
+            self.level[idx] = np.maximum(self.level[idx], self.lines[idx] + 1)
+        self.pieces_placed[idx] += 1
+        self._spawn(idx, self.next[idx])
+        self.next[idx] = self._draw(idx)
+        spawn_fits = self._fits(idx, self.rotation[idx], self.x[idx], self.y[idx])
+        self.game_over[idx] |= ~spawn_fits
+
+    def _spawn(self, idx, piece):
+        self.piece[idx] = piece
+        self.x[idx] = _SPAWN_X[piece]
+        self.y[idx] = _SPAWN_Y[piece]
+        self.rotation[idx] = 0
+
+    def _draw(self, idx):
+        # PieceGenerator._randrange(7) vectorisé (xorshift64*, arithmétique modulo 2^64)
+        state = self.rng[idx]
+        state ^= state >> 12
+        state ^= state << 25
+        state ^= state >> 27
+        self.rng[idx] = state
+        return ((((state * np.uint64(0x2545F4914F6CDD1D)) >> 32) * len(PIECE_TYPES)) >> 32).astype(np.int8)
+
+    def _reset(self, idx):
+        # Comme TetrisEngine.reset_game : le générateur continue sa suite
+        self.rows[idx] = 0
+        self.board[idx, _PAD + GRID_HEIGHT:] = FULL_ROW
+        self.score[idx] = 0
+        self.lines[idx] = 0
+        self.level[idx] = 1
+        self.pieces_placed[idx] = 0
+        self.game_over[idx] = False
+        self._spawn(idx, self._draw(idx))
+        self.next[idx] = self._draw(idx)
+
+def _run_slice(name, num_envs, start, stop, steps, seed):
+    # Processus de travail : avance sa tranche de l'environnement partagé
+    env = VectorTetrisEnv.attach(name, num_envs, start, stop)
+    rng = np.random.default_rng(seed)
+    for _ in range(steps):
+        env.step(rng.integers(0, NUM_ACTIONS, env.num_envs))
+    env.close()
+    return (stop - start) * steps
+
+def main():
+    parser = argparse.ArgumentParser(description='Débit de l\'environnement vectorisé')
+    parser.add_argument('--envs', type=int, default=4096, help='parties avancées ensemble')
+    parser.add_argument('--steps', type=int, default=500)
+    parser.add_argument('--workers', type=int, default=0,
+                        help='processus se partageant le lot (mémoire partagée)')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    # Référence : des TetrisEngine avancés un par un
+    engines = [TetrisEngine(seed=args.seed + i) for i in range(min(args.envs, 256))]
+    rng = random.Random(args.seed)
+    choices = ACTIONS + (None,)
+    start = time.perf_counter()
+    for _ in range(20):
+        for engine in engines:
+            engine.step(rng.choice(choices))
+            if engine.game_over:
+                engine.reset_game()
+    reference = len(engines) * 20 / (time.perf_counter() - start)
+
+    env = VectorTetrisEnv(args.envs, args.seed, shared=args.workers > 0)
+    start = time.perf_counter()
+    if args.workers:
+        bounds = np.linspace(0, args.envs, args.workers + 1).astype(int)
+        with Pool(args.workers) as pool:
+            steps = sum(pool.starmap(_run_slice, [
+                (env.shm_name, args.envs, bounds[i], bounds[i + 1], args.steps, args.seed + i)
+                for i in range(args.workers)]))
+    else:
+        actions = np.random.default_rng(args.seed)
+        for _ in range(args.steps):
+            env.step(actions.integers(0, NUM_ACTIONS, args.envs))
+        steps = args.envs * args.steps
+    elapsed = time.perf_counter() - start
+    print(f"{steps} pas en {elapsed:.2f} s : {steps / elapsed:.0f} pas/s "
+          f"(TetrisEngine un par un : {reference:.0f} pas/s, x{steps / elapsed / reference:.1f})")
+    print(f"pièces posées dans le lot : {int(env.pieces_placed.sum())}, "
+          f"score moyen en cours : {env.score.mean():.0f}")
+    env.close()
+
+if __name__ == '__main__':
+    main()